@@ -0,0 +1,46 @@
+"""Сравнение двух файлов результатов benchmarks.run.
+
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/current.json
+"""
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+# Метрика этапа и направление: True — больше лучше
+METRICS = {"items_per_sec": True, "median_ms": False, "peak_rss_kb": False}
+
+
+def load_results(path: str) -> Dict[Tuple, Dict[str, Any]]:
+    """Читает результаты и индексирует их по (этап, запрос, размер)."""
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return {(r["stage"], r.get("query", ""), r["size"]): r for r in report["results"]}
+
+
+def compare(baseline: Dict[Tuple, Dict[str, Any]], current: Dict[Tuple, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Строки сравнения для совпадающих этапов: значения метрик и их отношение."""
+    rows = []
+    for key in sorted(baseline.keys() & current.keys(), key=lambda k: (k[2], k[0], k[1])):
+        for metric, higher_is_better in METRICS.items():
+            before, after = baseline[key].get(metric), current[key].get(metric)
+            if before is None or after is None:
+                continue
+            ratio = after / before if before else float("inf")
+            improved = ratio > 1 if higher_is_better else ratio < 1
+            rows.append({"stage": key[0], "query": key[1], "size": key[2], "metric": metric,
+                         "baseline": before, "current": after, "ratio": ratio, "improved": improved})
+    return rows
+
+
+def main(argv: List[str]) -> None:
+    if len(argv) != 2:
+        sys.exit("Использование: python -m benchmarks.compare BASELINE.json CURRENT.json")
+    for row in compare(load_results(argv[0]), load_results(argv[1])):
+        stage = f"{row['stage']}:{row['query']}" if row["query"] else row["stage"]
+        mark = "+" if row["improved"] else "-"
+        print(f"{mark} {stage:45} {row['size']:>8} {row['metric']:14} "
+              f"{row['baseline']:>12.1f} → {row['current']:>12.1f} (x{row['ratio']:.2f})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,228 @@
+"""Сквозной бенчмарк загрузки: API → снапшот → БД → запросы.
+
+Пример запуска из корня проекта (параметры БД берутся из .env, как в main.py):
+
+    python -m benchmarks.run --sizes 1000 10000 100000 --output benchmarks/results/current.json
+    python -m benchmarks.compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+Каждый этап выполняется в отдельном процессе, чтобы пиковое потребление памяти (RSS)
+относилось только к нему. Для БД используется отдельная база (--dbname), её таблицы
+пересоздаются.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List
+
+from dotenv import load_dotenv
+
+from benchmarks import synthetic
+from benchmarks.stand_in import HhStandIn
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+QUERY_ROW_LIMIT = 100
+
+
+def peak_rss_kb() -> int:
+    """Пиковый RSS текущего процесса в килобайтах."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage // 1024 if sys.platform == "darwin" else usage  # macOS сообщает байты
+
+
+def bench_fetch(url: str, size: int, max_workers: int) -> Dict[str, Any]:
+    """Загрузка работодателей и всех страниц их вакансий клиентом HhApi."""
+    from src.hh_api import HhApi
+
+    api = HhApi(base_url=url, max_workers=max_workers, backoff_factor=0)
+    ids = synthetic.employer_ids(size)
+    start = time.perf_counter()
+    employers = api.get_employers(ids)
+    items = sum(len(api.get_vacancies(emp_id, all_pages=True)[1]) for emp_id in ids)
+    seconds = time.perf_counter() - start
+    limiter = api.limiter.stats()
+    api.close()
+    # missing > 0 означает страницы, потерянные после исчерпания повторов;
+    # concurrency — лимит запросов в полёте, на котором остановился адаптивный ограничитель
+    return {"items": items, "employers": len(employers), "missing": size - items, "seconds": seconds,
+            "concurrency": limiter["limit"], "overloaded": limiter["overloaded"]}
+
+
+def bench_save_to_json(size: int, directory: str) -> Dict[str, Any]:
+    """Запись снапшота вакансий save_to_json (JSON-массив с отступами)."""
+    from src.data_processor import save_to_json
+
+    data = list(synthetic.vacancies(size))
+    path = os.path.join(directory, "vacancies.json")
+    start = time.perf_counter()
+    save_to_json(data, path)
+    seconds = time.perf_counter() - start
+    return {"items": len(data), "seconds": seconds, "bytes": os.path.getsize(path)}
+
+
+def bench_write_snapshot(size: int, directory: str) -> Dict[str, Any]:
+    """Потоковая запись компактного снапшота (NDJSON + gzip) для сравнения с save_to_json."""
+    from src.data_processor import VACANCY_COLUMNS, vacancy_row
+    from src.snapshot import write_snapshot
+
+    path = os.path.join(directory, "vacancies.ndjson.gz")
+    start = time.perf_counter()
+    items = write_snapshot(path, "vacancies", VACANCY_COLUMNS, map(vacancy_row, synthetic.vacancies(size)))
+    seconds = time.perf_counter() - start
+    return {"items": items, "seconds": seconds, "bytes": os.path.getsize(path)}
+
+
+def bench_load_to_db(db_params: Dict[str, str], size: int) -> Dict[str, Any]:
+    """Загрузка набора в пустую БД функцией load_to_db."""
+    from src.data_processor import load_to_db
+    from src.db_setup import create_database, create_tables, drop_tables
+
+    create_database(db_params)
+    drop_tables(db_params)
+    create_tables(db_params)
+    employers = synthetic.employers(size)
+    data = list(synthetic.vacancies(size))
+    start = time.perf_counter()
+    load_to_db(db_params, employers, data, found=synthetic.found_counts(size))
+    seconds = time.perf_counter() - start
+    return {"items": len(employers) + len(data), "seconds": seconds}
+
+
+def bench_queries(db_params: Dict[str, str], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Задержка каждого запроса DBManager на загруженных данных."""
+    from src.db_manager import DBManager
+
+    db_manager = DBManager(db_params)
+    queries: Dict[str, Callable[[], Any]] = {
+        "get_companies_and_vacancies_count": db_manager.get_companies_and_vacancies_count,
+        "get_all_vacancies": db_manager.get_all_vacancies,
+        "iter_all_vacancies": lambda: sum(1 for _ in db_manager.iter_all_vacancies()),
+        "get_all_vacancies_page": lambda: db_manager.get_all_vacancies_page(limit=QUERY_ROW_LIMIT),
+        "get_avg_salary": db_manager.get_avg_salary,
+        "get_vacancies_with_higher_salary": db_manager.get_vacancies_with_higher_salary,
+        "get_vacancies_with_keyword": lambda: db_manager.get_vacancies_with_keyword("Python"),
+        "search_vacancies": lambda: db_manager.search_vacancies("Python", limit=QUERY_ROW_LIMIT),
+        "get_salary_stats": db_manager.get_salary_stats
+    }
+    results = {}
+    for name, query in queries.items():
+        timings = []
+        rows = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = query()
+            timings.append((time.perf_counter() - start) * 1000)
+            rows = result if isinstance(result, int) else len(result) if isinstance(result, list) else 1
+        timings.sort()
+        results[name] = {
+            "rows": rows,
+            "min_ms": timings[0],
+            "median_ms": statistics.median(timings),
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        }
+    return results
+
+
+def _isolated(func: Callable, *args) -> Dict[str, Any]:
+    """Выполняет этап в новом процессе и добавляет к результату его пиковый RSS."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(_measure, func, *args).result()
+
+
+def _measure(func: Callable, *args) -> Dict[str, Any]:
+    """Обёртка этапа, выполняемая в дочернем процессе."""
+    result = func(*args)
+    return {"result": result, "peak_rss_kb": peak_rss_kb()}
+
+
+def _record(stage: str, size: int, measured: Dict[str, Any]) -> Dict[str, Any]:
+    """Строка результатов этапа с пропускной способностью."""
+    result = measured["result"]
+    seconds = result["seconds"]
+    record = {"stage": stage, "size": size, **result, "peak_rss_kb": measured["peak_rss_kb"]}
+    record["items_per_sec"] = result["items"] / seconds if seconds > 0 else 0.0
+    return record
+
+
+def run(sizes: List[int], db_params: Dict[str, str], latency: float, error_rate: float, max_workers: int,
+        repeat: int, skip_db: bool) -> List[Dict[str, Any]]:
+    """Выполняет все этапы для каждого размера набора и возвращает строки результатов."""
+    records = []
+    for size in sizes:
+        with HhStandIn(size, latency=latency, error_rate=error_rate) as stand_in:
+            measured = _isolated(bench_fetch, stand_in.url, size, max_workers)
+            record = _record("hh_api", size, measured)
+            record.update(requests=stand_in.requests, throttled=stand_in.throttled)
+            records.append(record)
+        with tempfile.TemporaryDirectory() as directory:
+            records.append(_record("save_to_json", size, _isolated(bench_save_to_json, size, directory)))
+            records.append(_record("write_snapshot", size, _isolated(bench_write_snapshot, size, directory)))
+        if not skip_db:
+            records.append(_record("load_to_db", size, _isolated(bench_load_to_db, db_params, size)))
+            measured = _isolated(bench_queries, db_params, repeat)
+            for name, timing in measured["result"].items():
+                records.append({"stage": "query", "query": name, "size": size, **timing,
+                                "peak_rss_kb": measured["peak_rss_kb"]})
+        print(f"Размер {size}: готово", flush=True)
+    return records
+
+
+def _git_commit() -> str:
+    """Текущий коммит репозитория, чтобы результаты можно было сопоставить с версией кода."""
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк загрузки вакансий")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="размеры синтетических наборов (число вакансий), от 1000 до 1000000")
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа заглушки API, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--max-workers", type=int, default=5, help="параллельные страницы в HhApi")
+    parser.add_argument("--repeat", type=int, default=5, help="повторы каждого запроса DBManager")
+    parser.add_argument("--dbname", default="hh_benchmark", help="база данных для бенчмарка")
+    parser.add_argument("--skip-db", action="store_true", help="не выполнять этапы с БД")
+    parser.add_argument("--output", default="benchmarks/results/latest.json", help="файл результатов (JSON)")
+    args = parser.parse_args(argv)
+
+    db_params = {}
+    if not args.skip_db:
+        from src.config import Config
+
+        load_dotenv()
+        db_params = {**Config().get_db_params(), "dbname": args.dbname}
+
+    started = time.time()
+    records = run(args.sizes, db_params, args.latency, args.error_rate, args.max_workers, args.repeat, args.skip_db)
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "started_at": started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"sizes": args.sizes, "latency": args.latency, "error_rate": args.error_rate,
+                       "max_workers": args.max_workers, "repeat": args.repeat}
+        },
+        "results": records
+    }
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
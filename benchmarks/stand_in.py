@@ -0,0 +1,114 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks import synthetic
+
+
+class HhStandIn:
+    """Локальная замена api.hh.ru на синтетических данных.
+
+    Отвечает на /employers/{id} и постраничные /vacancies?employer_id=&page=&per_page=
+    как настоящий API, включая ограничение в 2000 результатов на запрос. Ответы
+    задерживаются на latency секунд, а доля error_rate запросов получает 429 с Retry-After,
+    чтобы проверить повторы клиента под нагрузкой.
+    """
+
+    def __init__(self, total: int, per_employer: int = synthetic.MAX_PER_EMPLOYER, latency: float = 0.0,
+                 error_rate: float = 0.0, retry_after: float = 0, seed: int = 0):
+        self.total = total
+        self.per_employer = per_employer
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._known = set(synthetic.employer_ids(total, per_employer))
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self._thread = None
+
+    def start(self) -> "HhStandIn":
+        """Запускает сервер в фоновом потоке."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "HhStandIn":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def route(self, path: str):
+        """Возвращает статус и тело ответа для пути запроса."""
+        url = urlparse(path)
+        if url.path.startswith("/employers/"):
+            emp_id = url.path.rsplit("/", 1)[1]
+            if emp_id not in self._known:
+                return 404, {"errors": [{"type": "not_found"}]}
+            return 200, synthetic.employer(emp_id)
+        if url.path == "/vacancies":
+            query = parse_qs(url.query)
+            emp_id = query.get("employer_id", [""])[0]
+            page = int(query.get("page", ["0"])[0])
+            per_page = int(query.get("per_page", ["20"])[0])
+            found = synthetic.vacancy_count(emp_id, self.total, self.per_employer) if emp_id in self._known else 0
+            pages = min(-(-found // per_page), synthetic.MAX_PER_EMPLOYER // per_page)
+            if page * per_page >= synthetic.MAX_PER_EMPLOYER:
+                return 400, {"errors": [{"type": "bad_argument", "value": "page"}]}
+            stop = min(found, (page + 1) * per_page)
+            items = [synthetic.vacancy(emp_id, i) for i in range(page * per_page, stop)]
+            return 200, {"found": found, "pages": pages, "page": page, "per_page": per_page, "items": items}
+        return 404, {}
+
+    def _throttle(self) -> bool:
+        """Решает, ответить ли на запрос 429."""
+        with self._lock:
+            self.requests += 1
+            throttled = self.error_rate > 0 and self._random.random() < self.error_rate
+            self.throttled += throttled
+            return throttled
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело уходят отдельными сегментами: без TCP_NODELAY keep-alive запросы
+            # ждут отложенного ACK (~40 мс), и бенчмарк измерял бы эту задержку, а не клиента
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+                headers = {}
+                if stand_in._throttle():
+                    status, data = 429, {"errors": [{"type": "too_many_requests"}]}
+                    headers["Retry-After"] = str(stand_in.retry_after)
+                else:
+                    status, data = stand_in.route(self.path)
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
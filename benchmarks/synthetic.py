@@ -0,0 +1,62 @@
+from typing import Any, Dict, Iterator, List
+
+# Столько вакансий hh.ru отдаёт по одному поисковому запросу, поэтому и на работодателя не больше
+MAX_PER_EMPLOYER = 2000
+FIRST_EMPLOYER_ID = 100000
+VACANCY_NAMES = ["Программист Python", "Аналитик данных", "Python developer", "Тестировщик", "DevOps-инженер",
+                 "Менеджер проекта", "Data engineer", "Разработчик Java", "Системный администратор", "Дизайнер"]
+
+
+def employer_ids(total: int, per_employer: int = MAX_PER_EMPLOYER) -> List[str]:
+    """Идентификаторы работодателей, на которых делится total вакансий."""
+    count = max(1, -(-total // per_employer))
+    return [str(FIRST_EMPLOYER_ID + i) for i in range(count)]
+
+
+def vacancy_count(emp_id: str, total: int, per_employer: int = MAX_PER_EMPLOYER) -> int:
+    """Число вакансий работодателя: все заполнены по per_employer, остаток у последнего."""
+    index = int(emp_id) - FIRST_EMPLOYER_ID
+    return max(0, min(per_employer, total - index * per_employer))
+
+
+def employer(emp_id: str) -> Dict[str, Any]:
+    """Ответ /employers/{id} для синтетического работодателя."""
+    return {"id": emp_id, "name": f"Компания {emp_id}", "alternate_url": f"https://hh.ru/employer/{emp_id}",
+            "description": "Синтетический работодатель для нагрузочного тестирования", "open_vacancies": 0}
+
+
+def vacancy(emp_id: str, index: int) -> Dict[str, Any]:
+    """Элемент ответа /vacancies. Значения детерминированы, чтобы прогоны были сравнимы."""
+    h = (index * 2654435761 + int(emp_id) * 40503) % 4294967296
+    salary = None
+    if h % 4:  # у четверти вакансий зарплата не указана
+        salary_from = 30000 + h % 300 * 1000 if h % 3 else None
+        salary_to = (salary_from or 60000) + 20000 + (h >> 8) % 50 * 1000 if h % 5 or not salary_from else None
+        salary = {"from": salary_from, "to": salary_to, "currency": "RUR", "gross": bool(h % 2)}
+    vacancy_id = f"{emp_id}{index:06d}"
+    return {
+        "id": vacancy_id,
+        "name": VACANCY_NAMES[h % len(VACANCY_NAMES)],
+        "employer": {"id": emp_id, "name": f"Компания {emp_id}", "url": f"https://api.hh.ru/employers/{emp_id}"},
+        "salary": salary,
+        "area": {"id": "1", "name": "Москва"},
+        "alternate_url": f"https://hh.ru/vacancy/{vacancy_id}",
+        "snippet": {"requirement": "Опыт работы от года, знание SQL", "responsibility": "Разработка и поддержка"}
+    }
+
+
+def employers(total: int, per_employer: int = MAX_PER_EMPLOYER) -> List[Dict[str, Any]]:
+    """Работодатели набора из total вакансий."""
+    return [employer(emp_id) for emp_id in employer_ids(total, per_employer)]
+
+
+def vacancies(total: int, per_employer: int = MAX_PER_EMPLOYER) -> Iterator[Dict[str, Any]]:
+    """Лениво порождает total вакансий, от 1 тыс. до миллионов без затрат памяти на весь набор."""
+    for emp_id in employer_ids(total, per_employer):
+        for index in range(vacancy_count(emp_id, total, per_employer)):
+            yield vacancy(emp_id, index)
+
+
+def found_counts(total: int, per_employer: int = MAX_PER_EMPLOYER) -> Dict[str, int]:
+    """Число вакансий по работодателям, как его сообщил бы API (поле found)."""
+    return {emp_id: vacancy_count(emp_id, total, per_employer) for emp_id in employer_ids(total, per_employer)}
@@ -1,88 +1,179 @@
 from dotenv import load_dotenv
+import argparse
 import os
+import sys
 import traceback
-from src.hh_api import HhApi
-from src.db_setup import create_database, create_tables, drop_tables
+from typing import Any, Dict, List, Optional
+from src.columnar import ColumnarVacancies
+from src.db_setup import create_database, create_tables, drop_tables, get_data_age
 from src.db_manager import DBManager
-from src.data_processor import save_to_json, load_to_db
+from src.db_pool import close_all
+from src.metrics import metrics
 from src.config import Config
 from src.utils import format_salary
 
 load_dotenv()
 
+COMPANIES_SNAPSHOT = "data/companies.ndjson.gz"
+VACANCIES_SNAPSHOT = "data/vacancies.ndjson.gz"
 
-def main():
-    try:
-        config = Config()
-        db_params = config.get_db_params()
-        print("Подключено", flush=True)
-        create_database(db_params)
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(description="Поиск вакансий с подключением БД")
+    parser.add_argument("--replay", action="store_true",
+                        help="восстановить БД из сохранённых снапшотов без обращения к hh.ru")
+    parser.add_argument("--companies", default=COMPANIES_SNAPSHOT, help="снапшот работодателей")
+    parser.add_argument("--vacancies", default=VACANCIES_SNAPSHOT, help="снапшот вакансий")
+    parser.add_argument("--discover", metavar="TEXT",
+                        help="загружать работодателей, найденных поиском hh.ru по TEXT, вместо примера компаний")
+    parser.add_argument("--area", help="регион поиска работодателей (идентификатор из справочника /areas)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="загрузить данные заново, даже если загруженные ещё не устарели (MAX_DATA_AGE)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="держать вакансии в памяти: средняя зарплата, отбор выше средней и поиск "
+                             "по подстроке названия без запросов к БД")
+    return parser.parse_args(argv)
+
+
+def load_data(args: argparse.Namespace, config: Config, db_params: Dict[str, str]) -> Dict[str, int]:
+    """Создаёт БД и схему и загружает данные из API или снапшотов; возвращает {employer_id: found}.
+
+    Модули загрузки (и requests) импортируются только здесь: запуск со свежими данными их не загружает.
+    """
+    create_database(db_params)
+    incremental = config.sync_mode == "incremental" and not args.replay
+    if not incremental and not args.replay:
         drop_tables(db_params)
-        create_tables(db_params)
+    # Воспроизведение заменяет данные в своей транзакции: неудачное чтение снапшота не очищает БД
+    create_tables(db_params)
 
-        # Получение данных
-        hh_api = HhApi()
-        employer_ids = ["1740", "80", "15478", "3529", "78638", "2180", "39305", "4219", "676", "1455"]  # Пример компаний
-        employers = hh_api.get_employers(employer_ids)
-        vacancies = []
-        employer_vacancy_counts = {}
+    if args.replay:
+        from src.replay import replay_snapshots
+        employer_vacancy_counts, _ = replay_snapshots(db_params, args.companies, args.vacancies)
+        return employer_vacancy_counts
+
+    from src.hh_api import HhApi
+    from src.http_cache import ResponseCache
+    from src.pipeline import run_pipeline
+    from src.records import employer_row
+    from src.snapshot import is_compact_snapshot
+    # Получение данных
+    # Параллелизм запросов подстраивается под ответы API в пределах max_workers
+    cache = ResponseCache("data/http_cache.sqlite", offline=config.hh_offline, record=config.hh_record)
+    hh_api = HhApi(max_workers=16, cache=cache)
+    try:
+        employers = None
+        if args.discover:
+            # Работодатели из поиска hh.ru с открытыми вакансиями: их данные берутся из выдачи поиска
+            employers = hh_api.discover_employers(args.discover, args.area,
+                                                  records=is_compact_snapshot(args.companies))
+            employer_ids = [employer_row(emp).employer_id for emp in employers]
+            print(f"Найдено работодателей: {len(employer_ids)}", flush=True)
+        else:
+            # Пример компаний
+            employer_ids = ["1740", "80", "15478", "3529", "78638", "2180", "39305", "4219", "676", "1455"]
+        # Страницы вакансий потоково записываются в снапшоты и в БД по мере загрузки; крупные работодатели
+        # загружаются по срезам дат публикации в обход предела выдачи поиска
+        _, employer_vacancy_counts, _ = run_pipeline(
+            db_params, hh_api, employer_ids, args.companies, args.vacancies, incremental=incremental, partition=True,
+            employers=employers
+        )
+        limiter = hh_api.limiter.stats()
+        print(f"Запросов к API: {limiter['requests']}, в секунду: {round(limiter['rate'], 1)}, "
+              f"параллельно: {limiter['limit']}, ответов о перегрузке: {limiter['overloaded']}")
+    finally:
+        hh_api.close()  # закрывает и кеш, сохраняя время использования записей
+    return employer_vacancy_counts
 
-        for emp_id in employer_ids:
-            total_vacancies, emp_vacancies = hh_api.get_vacancies(emp_id)
-            employer_vacancy_counts[emp_id] = total_vacancies
-            vacancies.extend(emp_vacancies)  # Загружаем только первую страницу для БД
 
-        # Сохранение в JSON
-        save_to_json(employers, "data/companies.json")
-        save_to_json(vacancies, "data/vacancies.json")
+def vacancies_found(company: Dict[str, Any]) -> int:
+    """Число вакансий компании по данным API (found), а если оно неизвестно — число загруженных."""
+    return company["vacancies_count"] if company["found"] is None else company["found"]
 
-        # Загрузка в БД
-        load_to_db(db_params, employers, vacancies)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv or [])
+    config = None
+    try:
+        config = Config()
+        db_params = config.get_db_params()
+        print("Подключено", flush=True)
+        # Свежие данные актуальной схемы не перезагружаются: меню доступно сразу.
+        # Другой набор работодателей (--discover) загружается всегда
+        data_age = None if args.replay or args.refresh or args.discover else get_data_age(db_params)
+        if data_age is not None and data_age <= config.max_data_age:
+            print(f"Данные загружены {round(data_age / 60)} мин назад, загрузка пропущена "
+                  f"(--refresh для обновления)", flush=True)
+            employer_vacancy_counts = None
+        else:
+            employer_vacancy_counts = load_data(args, config, db_params)
 
         # Интерфейс пользователя
-        db_manager = DBManager(db_params)
+        # Данные меняются только при загрузке, поэтому повторные запросы меню берутся из кеша
+        db_manager = DBManager(db_params, cache_size=128)
+        # Снимок строится один раз после загрузки: данные до конца сеанса не меняются
+        columnar = ColumnarVacancies.load(db_params) if args.columnar else None
         while True:
             print("\n1. Список компаний и количество вакансий")
             print("2. Список всех вакансий")
             print("3. Средняя зарплата")
             print("4. Вакансии с зарплатой выше средней")
             print("5. Вакансии по ключевому слову")
+            print("6. Статистика зарплат по компаниям")
             print("0. Выход")
 
             choice = input("Выберите действие: ")
             if choice == "1":
-                for emp in employers:
-                    emp_id = emp["id"]
-                    total = employer_vacancy_counts.get(emp_id, 0)
-                    print(f"Компания: {emp['name']}, Вакансий: {total}")
+                for company in db_manager.get_companies_and_vacancies_count():
+                    print(f"Компания: {company['company']}, Вакансий: {vacancies_found(company)}")
             elif choice == "2":
-                for vac in db_manager.get_all_vacancies():
+                for vac in db_manager.iter_all_vacancies():
                     salary = format_salary(vac["salary_from"], vac["salary_to"])
                     print(
                         f"Компания: {vac['company']}, Вакансия: {vac['vacancy']}, Зарплата: {salary}, Ссылка: {vac['url']}")
                 # Подсчёт и вывод общего количества вакансий
-                total_all_vacancies = sum(employer_vacancy_counts.values())
+                if employer_vacancy_counts is None:  # загрузка пропущена — число вакансий по данным API из сводки
+                    total_all_vacancies = sum(
+                        vacancies_found(company) for company in db_manager.get_companies_and_vacancies_count()
+                    )
+                else:
+                    total_all_vacancies = sum(employer_vacancy_counts.values())
                 print(f"\nОбщее количество вакансий всех компаний: {total_all_vacancies}", flush=True)
             elif choice == "3":
-                avg_salary = db_manager.get_avg_salary()
+                avg_salary = (columnar or db_manager).get_avg_salary()
                 print(f"Средняя зарплата: {avg_salary:.2f}")
             elif choice == "4":
-                for vac in db_manager.get_vacancies_with_higher_salary():
+                higher = columnar.get_vacancies_with_higher_salary() if columnar \
+                    else db_manager.iter_vacancies_with_higher_salary()
+                for vac in higher:
                     salary = format_salary(vac["salary_from"], vac["salary_to"])
                     print(
                         f"Компания: {vac['company']}, Вакансия: {vac['vacancy']}, Зарплата: {salary}, Ссылка: {vac['url']}")
             elif choice == "5":
                 keyword = input("Введите ключевое слово: ")
-                for vac in db_manager.get_vacancies_with_keyword(keyword):
+                # Выводятся все найденные вакансии, как и до ранжированного поиска
+                found = columnar.get_vacancies_with_keyword(keyword) if columnar \
+                    else db_manager.search_vacancies(keyword, limit=None)
+                for vac in found:
                     salary = format_salary(vac["salary_from"], vac["salary_to"])
                     print(
                         f"Компания: {vac['company']}, Вакансия: {vac['vacancy']}, Зарплата: {salary}, Ссылка: {vac['url']}")
+            elif choice == "6":
+                for stats in db_manager.get_salary_stats():
+                    print(
+                        f"Компания: {stats['company']}, Средняя: {stats['avg_salary']:.0f}, "
+                        f"Медиана: {stats['median']:.0f}, P10: {stats['p10']:.0f}, P90: {stats['p90']:.0f}")
             elif choice == "0":
                 break
     except Exception as e:
         print("Произошла ошибка:")
         traceback.print_exc()
+    finally:
+        if config is not None and config.metrics_path:
+            metrics.write(config.metrics_path)
+        close_all()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,130 @@
+import math
+import sys
+import uuid
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.db_pool import connection
+from src.metrics import metrics
+
+# Отсутствующая зарплата в целочисленных столбцах (зарплаты неотрицательны)
+_MISSING = -1
+
+
+class ColumnarVacancies:
+    """Колоночный снимок вакансий в памяти процесса для интерактивных запросов.
+
+    Строится один раз после загрузки (load) и дальше не меняется. Каждое поле хранится
+    отдельным столбцом: числа — в массивах array, названия компаний и вакансий —
+    интернированными строками (повторяющиеся названия хранятся один раз). Средняя
+    зарплата и порядок вакансий по зарплате вычисляются при построении, поэтому отбор
+    выше средней — двоичный поиск; поиск по подстроке идёт по одной строке со всеми
+    названиями (str.find), без перебора вакансий в Python.
+
+    Результаты имеют тот же вид, что у DBManager; зарплаты сравниваются по salary_rub.
+    """
+
+    # Поля строки, из которой строится снимок
+    COLUMNS = ("vacancy_id", "company", "vacancy", "salary_from", "salary_to", "url", "salary_rub")
+    QUERY = """
+                SELECT v.vacancy_id, e.name, v.name, v.salary_from, v.salary_to, v.url, v.salary_rub
+                FROM vacancies v
+                JOIN employers e ON v.employer_id = e.employer_id
+                WHERE NOT v.archived
+                ORDER BY v.vacancy_id"""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        """Строит снимок из строк в порядке COLUMNS."""
+        self.companies: List[str] = []
+        self.company_index = array("i")
+        self.vacancy_ids: List[str] = []
+        self.names: List[str] = []
+        self.urls: List[str] = []
+        self.salary_from = array("q")
+        self.salary_to = array("q")
+        self.salary_rub = array("d")  # NaN — зарплата не указана или валюта неизвестна
+        companies: Dict[str, int] = {}
+        for vacancy_id, company, name, salary_from, salary_to, url, salary_rub in rows:
+            index = companies.get(company)
+            if index is None:
+                index = companies[company] = len(self.companies)
+                self.companies.append(sys.intern(company))
+            self.company_index.append(index)
+            self.vacancy_ids.append(vacancy_id)
+            self.names.append(sys.intern(name))
+            self.urls.append(url)
+            self.salary_from.append(_MISSING if salary_from is None else salary_from)
+            self.salary_to.append(_MISSING if salary_to is None else salary_to)
+            self.salary_rub.append(math.nan if salary_rub is None else salary_rub)
+
+        # Позиции вакансий с зарплатой, упорядоченные по salary_rub, и сами зарплаты в том же порядке
+        self._by_salary = array("i", sorted((i for i, s in enumerate(self.salary_rub) if s == s),
+                                            key=self.salary_rub.__getitem__))
+        self._sorted_salary = array("d", (self.salary_rub[i] for i in self._by_salary))
+        self.avg_salary = math.fsum(self._sorted_salary) / len(self._sorted_salary) if self._sorted_salary else 0.0
+        # Названия в нижнем регистре одной строкой через "\n" и смещения их начал для поиска подстроки
+        lowered = [name.lower() for name in self.names]  # lower() может изменить длину строки
+        self._text = "\n".join(lowered)
+        self._offsets = array("q")
+        position = 0
+        for name in lowered:
+            self._offsets.append(position)
+            position += len(name) + 1
+
+    @classmethod
+    def load(cls, db_params: Dict[str, str], batch_size: int = 10000) -> "ColumnarVacancies":
+        """Строит снимок по текущим данным БД, читая вакансии серверным курсором пачками по batch_size."""
+        with metrics.span("build_columnar_snapshot") as span:
+            with connection(db_params) as conn:
+                with conn.cursor(name=f"columnar_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = batch_size
+                    cursor.execute(cls.QUERY)
+                    snapshot = cls(cursor)
+            span["vacancies"] = len(snapshot)
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.vacancy_ids)
+
+    def get_avg_salary(self) -> float:
+        """Средняя зарплата по вакансиям с известной salary_rub."""
+        return self.avg_salary
+
+    def get_all_vacancies(self) -> List[Dict[str, Any]]:
+        """Все вакансии снимка."""
+        return self._vacancies(range(len(self)))
+
+    def get_vacancies_with_salary_above(self, threshold: float) -> List[Dict[str, Any]]:
+        """Вакансии с salary_rub больше threshold, в порядке vacancy_id."""
+        start = bisect_right(self._sorted_salary, threshold)
+        return self._vacancies(sorted(self._by_salary[start:]))
+
+    def get_vacancies_with_higher_salary(self) -> List[Dict[str, Any]]:
+        """Вакансии с зарплатой выше средней."""
+        return self.get_vacancies_with_salary_above(self.avg_salary)
+
+    def get_vacancies_with_keyword(self, keyword: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Вакансии, в названии которых встречается keyword без учёта регистра (как ILIKE '%keyword%')."""
+        keyword = keyword.lower()
+        if not keyword:
+            return self._vacancies(range(len(self) if limit is None else min(limit, len(self))))
+        if "\n" in keyword:  # разделитель названий не встречается в самих названиях
+            return []
+        positions = []
+        found = self._text.find(keyword)
+        while found != -1 and (limit is None or len(positions) < limit):
+            index = bisect_right(self._offsets, found) - 1
+            positions.append(index)
+            # Следующее совпадение ищется со следующего названия: каждая вакансия попадает один раз
+            found = self._text.find(keyword, self._offsets[index + 1] if index + 1 < len(self) else len(self._text))
+        return self._vacancies(positions)
+
+    def _vacancies(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """Собирает строки результата по позициям вакансий."""
+        return [
+            {"company": self.companies[self.company_index[i]], "vacancy": self.names[i],
+             "salary_from": None if self.salary_from[i] == _MISSING else self.salary_from[i],
+             "salary_to": None if self.salary_to[i] == _MISSING else self.salary_to[i], "url": self.urls[i]}
+            for i in positions
+        ]
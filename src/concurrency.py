@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from src.metrics import metrics
+
+
+class AdaptiveLimiter:
+    """Адаптивное ограничение числа запросов в полёте (AIMD).
+
+    Пока ответы успешны и задержка не превышает latency_tolerance минимальной среди
+    последних baseline_window успешных ответов, лимит растёт аддитивно — примерно на increase за «круг» из limit
+    запросов. На перегрузку (429, 5xx, ошибки соединения) лимит умножается на decrease,
+    но не чаще одного раза за среднюю длительность запроса: ответы, отправленные до
+    снижения, не должны снижать лимит повторно. Лимит держится в [min_limit, max_limit].
+    Базовая задержка считается по скользящему окну, а не за всё время: единичный быстрый
+    ответ (другой эндпоинт, первое соединение) не останавливает рост навсегда.
+
+    Один ограничитель можно разделять между потоками и клиентами: так загрузка
+    работодателей и страниц вакансий делит общий бюджет запросов к API.
+    """
+
+    def __init__(
+            self,
+            max_limit: int = 32,
+            min_limit: int = 1,
+            initial_limit: Optional[int] = None,
+            increase: float = 1.0,
+            decrease: float = 0.5,
+            latency_tolerance: float = 2.0,
+            baseline_window: int = 20,
+            name: str = "hh_api"
+    ):
+        """Инициализирует ограничитель.
+
+        :param max_limit: верхняя граница лимита (не больше числа рабочих потоков клиента).
+        :param min_limit: нижняя граница лимита.
+        :param initial_limit: начальный лимит (по умолчанию половина max_limit).
+        :param increase: прирост лимита за круг успешных запросов.
+        :param decrease: множитель лимита при перегрузке.
+        :param latency_tolerance: во сколько раз задержка может превышать минимальную без остановки роста.
+        :param baseline_window: число последних успешных ответов, по которым считается минимальная задержка.
+        :param name: метка ограничителя в метриках.
+        """
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit if initial_limit is not None else max(min_limit, max_limit // 2))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.name = name
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.overloaded = 0
+        self._recent_latencies = deque(maxlen=baseline_window)
+        self._avg_latency = 0.0
+        self._last_decrease = 0.0
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[Dict[str, bool]]:
+        """Занимает место для запроса; в возвращаемом словаре вызывающий отмечает перегрузку (overloaded)."""
+        self.acquire()
+        outcome = {"overloaded": False}
+        start = time.monotonic()
+        try:
+            yield outcome
+        except BaseException:
+            outcome["overloaded"] = True
+            raise
+        finally:
+            self.release(time.monotonic() - start, outcome["overloaded"])
+
+    def acquire(self) -> None:
+        """Ожидает, пока число запросов в полёте не станет меньше лимита."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+
+    def release(self, latency: float, overloaded: bool = False) -> None:
+        """Освобождает место и пересчитывает лимит по результату запроса."""
+        with self._condition:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.requests += 1
+            self._finished_at = now
+            self._avg_latency = latency if self.requests == 1 else 0.8 * self._avg_latency + 0.2 * latency
+            if overloaded:
+                self.overloaded += 1
+                if now - self._last_decrease >= self._avg_latency:
+                    self.limit = max(float(self.min_limit), self.limit * self.decrease)
+                    self._last_decrease = now
+            else:
+                self._recent_latencies.append(latency)
+                if latency <= min(self._recent_latencies) * self.latency_tolerance:
+                    self.limit = min(float(self.max_limit), self.limit + self.increase / self.limit)
+            limit = self.limit
+            self._condition.notify_all()
+        metrics.set("hh_api_concurrency_limit", limit, limiter=self.name)
+        if overloaded:
+            metrics.inc("hh_api_overloaded_total", limiter=self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Итог работы: текущий лимит, пик запросов в полёте, число запросов и перегрузок, запросов в секунду."""
+        with self._condition:
+            elapsed = (self._finished_at or 0.0) - (self._started_at or 0.0)
+            return {
+                "limit": int(self.limit),
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "overloaded": self.overloaded,
+                "rate": self.requests / elapsed if elapsed > 0 else 0.0
+            }
@@ -11,9 +11,21 @@ class Config:
         self.db_password: str = getenv("DB_PASSWORD")
         self.db_host: str = getenv("DB_HOST") or "localhost"
         self.db_port: str = getenv("DB_PORT") or "5432"
+        # incremental — обновление данных без пересоздания таблиц, full — полная перезагрузка
+        self.sync_mode: str = getenv("SYNC_MODE") or "incremental"
+        # Работа без сети: ответы API берутся только из локального кеша
+        self.hh_offline: bool = getenv("HH_OFFLINE") == "1"
+        # Запись в кеш всех ответов API, в том числе страниц вакансий, для последующей работы без сети
+        self.hh_record: bool = getenv("HH_RECORD") == "1"
+        # Файл метрик, записываемый при завершении: .prom — формат Prometheus, иначе JSON
+        self.metrics_path: Optional[str] = getenv("METRICS_PATH") or None
+        # Данные моложе MAX_DATA_AGE секунд при запуске не перезагружаются; 0 — загружать всегда
+        self.max_data_age: float = float(getenv("MAX_DATA_AGE") or 6 * 60 * 60)
 
         if not self.db_password:
             raise ValueError("Переменная окружения DB_PASSWORD обязательна и не задана")
+        if self.sync_mode not in ("incremental", "full"):
+            raise ValueError("Переменная окружения SYNC_MODE должна быть incremental или full")
 
     def get_db_params(self) -> dict[str, str]:
         """Возвращает параметры подключения к БД."""
@@ -0,0 +1,156 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.hh_api import HhApi
+from src.metrics import metrics
+from src.records import Vacancy
+
+# Окно дат публикации [начало, конец]; начало None — все вакансии до конца окна, None — запрос без фильтра
+Window = Optional[Tuple[Optional[datetime], datetime]]
+
+
+class PartitionedCrawler:
+    """Загрузка всех вакансий работодателя в обход ограничения глубины выдачи /vacancies.
+
+    Поиск hh.ru отдаёт не больше max_results первых результатов запроса, сколько бы
+    страниц ни запрашивалось, поэтому у крупных работодателей обычный обход страниц
+    теряет вакансии. Краулер делит запрос на срезы по окну дат публикации
+    (date_from/date_to): срез, в котором found больше max_results, делится пополам, пока
+    не поместится в выдачу или окно не сузится до min_window (такой срез загружается
+    частично и учитывается в truncated). Первый запрос идёт без фильтра: работодатели,
+    чьи вакансии помещаются в выдачу, загружаются без лишних запросов. Вакансии старше
+    окна window попадают в открытый слева срез (только date_to), который при переполнении
+    отодвигается ещё на одно окно назад, поэтому срезы покрывают все даты публикации.
+
+    Первые страницы срезов и их остальные страницы загружаются параллельно в пуле из
+    max_workers потоков клиента; число запросов в полёте определяет его limiter.
+    Вакансии на границах окон и переопубликованные во время обхода встречаются в
+    нескольких срезах и отбрасываются по id.
+    """
+
+    MAX_RESULTS = 2000
+
+    def __init__(
+            self,
+            hh_api: HhApi,
+            window: timedelta = timedelta(days=30),
+            min_window: timedelta = timedelta(minutes=1),
+            max_results: int = MAX_RESULTS
+    ):
+        """Инициализирует краулер.
+
+        :param hh_api: клиент API, через пул и ограничитель которого идут запросы.
+        :param window: окно дат публикации, которое делится при переполнении выдачи
+            (активная вакансия hh.ru опубликована не раньше 30 дней назад).
+        :param min_window: минимальная ширина окна; более узкие срезы не делятся.
+        :param max_results: предел выдачи поиска hh.ru.
+        """
+        self.hh_api = hh_api
+        self.window = window
+        self.min_window = min_window
+        self.max_results = max_results
+
+    def crawl(self, employer_id: str,
+              records: bool = False) -> Tuple[int, List[Union[Dict[str, Any], Vacancy]], Dict[str, Any]]:
+        """Загружает все вакансии работодателя, возвращает found, вакансии без повторов и покрытие."""
+        coverage = {}
+        vacancies = []
+        for page in self.iter_pages(employer_id, records, coverage):
+            vacancies.extend(page["items"])
+        return coverage["found"], vacancies, coverage
+
+    def iter_pages(self, employer_id: str, records: bool = False,
+                   coverage: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Генератор страниц вакансий работодателя по всем срезам в порядке завершения загрузки.
+
+        В items страницы — только ещё не встречавшиеся вакансии (записи Vacancy при records),
+        в found — общее число вакансий работодателя по первому запросу. По окончании обхода
+        в словарь coverage записывается покрытие:
+        found, vacancies (получено без повторов), duplicates, slices (загруженных срезов),
+        splits, truncated (срезов, не поместившихся в выдачу), failed_pages,
+        ratio (vacancies / found) и complete — все срезы загружены целиком и получено
+        не меньше found вакансий.
+        """
+        coverage = {} if coverage is None else coverage
+        seen = set()
+        found = 0
+        stats = {"duplicates": 0, "slices": 0, "splits": 0, "truncated": 0, "failed_pages": 0}
+        max_pages = self.max_results // self.hh_api.PER_PAGE
+        with ThreadPoolExecutor(max_workers=self.hh_api.max_workers) as executor:
+            def submit(window: Window, page: int) -> None:
+                future = executor.submit(self.hh_api._get_vacancies_page, employer_id, page, records,
+                                         self._filters(window))
+                pending[future] = (window, page)
+
+            pending = {}
+            submit(None, 0)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    window, page = pending.pop(future)
+                    data = future.result()
+                    if data is None:
+                        stats["failed_pages"] += 1
+                        continue
+                    if page == 0:
+                        if window is None:
+                            found = data.get("found", 0)
+                        if data.get("found", 0) > self.max_results:
+                            parts = self._split(window)
+                            if parts:
+                                # Страницы переполненного среза не загружаются: их вакансии есть в частях
+                                stats["splits"] += 1
+                                for part in parts:
+                                    submit(part, 0)
+                                continue
+                            stats["truncated"] += 1
+                        stats["slices"] += 1
+                        for number in range(1, min(data.get("pages", 1), max_pages)):
+                            submit(window, number)
+                    items = []
+                    for vac in data.get("items", []):
+                        vacancy_id = vac.vacancy_id if records else vac["id"]
+                        if vacancy_id in seen:
+                            stats["duplicates"] += 1
+                            continue
+                        seen.add(vacancy_id)
+                        items.append(vac)
+                    yield {"found": found, "items": items}
+
+        coverage.update(stats, found=found, vacancies=len(seen),
+                        ratio=len(seen) / found if found else 1.0,
+                        complete=not stats["truncated"] and not stats["failed_pages"] and len(seen) >= found)
+        metrics.inc("hh_crawl_slices_total", stats["slices"], result="loaded")
+        metrics.inc("hh_crawl_slices_total", stats["truncated"], result="truncated")
+        metrics.inc("hh_crawl_duplicates_total", stats["duplicates"])
+
+    def _split(self, window: Window) -> Optional[List[Tuple[Optional[datetime], datetime]]]:
+        """Делит срез на части, вместе покрывающие те же даты публикации.
+
+        Запрос без фильтра делится на открытый слева срез до начала окна window и половины
+        окна window до текущего момента; открытый слева срез — на такой же срез на окно
+        раньше и окно перед своей границей. None — окно уже не уже min_window и делить его нельзя.
+        """
+        if window is None:
+            end = datetime.now(timezone.utc).replace(microsecond=0)
+            return [(None, end - self.window)] + self._split((end - self.window, end))
+        start, end = window
+        if start is None:
+            return [(None, end - self.window), (end - self.window, end)]
+        if end - start <= self.min_window:
+            return None
+        middle = (start + (end - start) / 2).replace(microsecond=0)
+        # Границы включаются в оба среза: вакансии на стыке отбрасываются как повторы
+        return [(start, middle), (middle, end)]
+
+    @staticmethod
+    def _filters(window: Window) -> Optional[Dict[str, str]]:
+        """Параметры поиска для окна дат публикации (ISO 8601 с точностью до секунды)."""
+        if window is None:
+            return None
+        start, end = window
+        filters = {"date_to": end.strftime("%Y-%m-%dT%H:%M:%S%z")}
+        if start is not None:
+            filters["date_from"] = start.strftime("%Y-%m-%dT%H:%M:%S%z")
+        return filters
@@ -1,6 +1,63 @@
+import csv
+import io
 import json
-from typing import List, Dict, Any
-import psycopg2
+import time
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+
+from src.db_pool import connection
+from src.metrics import metrics
+from src.records import Employer, Vacancy, employer_row, vacancy_row
+
+EMPLOYER_COLUMNS = Employer._fields
+VACANCY_COLUMNS = Vacancy._fields
+
+# Обозначение NULL в CSV для COPY: пустое поле остаётся пустой строкой, как при вставке через INSERT
+COPY_NULL = "\\N"
+# Налог на доходы: зарплата «до вычета налогов» (gross) приводится к сумме на руки
+INCOME_TAX_RATE = 0.13
+# Эффективная зарплата в рублях на руки: salary_from (или salary_to) по курсу из currency_rates.
+# Вычисляется при переносе пачки из промежуточной таблицы; для неизвестной валюты — NULL
+SALARY_RUB = f"""ROUND(COALESCE(salary_from, salary_to)
+                / (SELECT rate FROM currency_rates WHERE code = COALESCE(currency, 'RUR'))
+                * CASE WHEN gross THEN {1 - INCOME_TAX_RATE} ELSE 1 END)::integer"""
+# Хеш содержимого вакансии: по нему определяется, изменилась ли строка с прошлой загрузки
+VACANCY_HASH = "md5(ROW(employer_id, name, salary_from, salary_to, url, currency, gross)::text)"
+VACANCY_UPSERT = """DO UPDATE SET
+                employer_id = EXCLUDED.employer_id,
+                name = EXCLUDED.name,
+                salary_from = EXCLUDED.salary_from,
+                salary_to = EXCLUDED.salary_to,
+                url = EXCLUDED.url,
+                currency = EXCLUDED.currency,
+                gross = EXCLUDED.gross,
+                salary_rub = EXCLUDED.salary_rub,
+                content_hash = EXCLUDED.content_hash,
+                archived = FALSE,
+                updated_at = now()
+            WHERE vacancies.content_hash IS DISTINCT FROM EXCLUDED.content_hash OR vacancies.archived"""
+EMPLOYER_UPSERT = """DO UPDATE SET name = EXCLUDED.name, url = EXCLUDED.url
+            WHERE (employers.name, employers.url) IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.url)"""
+# Пересчёт сводки только для переданных работодателей; found из API сохраняется, если не передан
+EMPLOYER_SUMMARY_REFRESH = """
+        INSERT INTO employer_summary
+            (employer_id, vacancies_count, found, min_salary, avg_salary, max_salary, refreshed_at)
+        SELECT e.employer_id, COUNT(v.vacancy_id), f.found,
+               MIN(v.salary_rub), AVG(v.salary_rub), MAX(v.salary_rub),
+               now()
+        FROM employers e
+        LEFT JOIN vacancies v ON v.employer_id = e.employer_id AND NOT v.archived
+        LEFT JOIN unnest(%s::varchar[], %s::integer[]) AS f(employer_id, found) ON f.employer_id = e.employer_id
+        WHERE e.employer_id = ANY(%s)
+        GROUP BY e.employer_id, f.found
+        ON CONFLICT (employer_id) DO UPDATE SET
+            vacancies_count = EXCLUDED.vacancies_count,
+            found = COALESCE(EXCLUDED.found, employer_summary.found),
+            min_salary = EXCLUDED.min_salary,
+            avg_salary = EXCLUDED.avg_salary,
+            max_salary = EXCLUDED.max_salary,
+            refreshed_at = EXCLUDED.refreshed_at
+    """
 
 
 def save_to_json(data: List[Dict[str, Any]], filename: str) -> None:
@@ -9,31 +66,251 @@ def save_to_json(data: List[Dict[str, Any]], filename: str) -> None:
         json.dump(data, f, ensure_ascii=False, indent=4)
 
 
-def load_to_db(db_params: Dict[str, str], employers: List[Dict[str, Any]], vacancies: List[Dict[str, Any]]) -> None:
-    """Загружает данные о работодателях и вакансиях в БД."""
-    conn = psycopg2.connect(**db_params)
-    cursor = conn.cursor()
+class JsonArrayWriter:
+    """Потоковая запись JSON-массива в файл: элементы пишутся по мере поступления."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._file = open(self.filename, "w", encoding="utf-8")
+        self._file.write("[")
+        return self
+
+    def write(self, item: Dict[str, Any]) -> None:
+        """Дописывает элемент в массив."""
+        self._file.write(",\n" if self.count else "\n")
+        json.dump(item, self._file, ensure_ascii=False)
+        self.count += 1
+
+    def __exit__(self, *exc) -> None:
+        self._file.write("\n]\n" if self.count else "]\n")
+        self._file.close()
+
+
+class BulkLoader:
+    """Пакетная загрузка строк в таблицу через COPY во временную промежуточную таблицу.
+
+    copy() передаёт строки пачками по batch_size, merge() переносит накопленное одним
+    INSERT ... ON CONFLICT и очищает промежуточную таблицу. Промежуточная таблица
+    удаляется при фиксации транзакции. При track_seen ключи перенесённых строк
+    сохраняются во временной таблице {table}_seen до конца транзакции.
+    """
+
+    def __init__(self, cursor, table: str, columns: Tuple[str, ...], key: str, batch_size: int = 5000,
+                 computed: Optional[Dict[str, str]] = None, on_conflict: str = "DO NOTHING",
+                 track_seen: bool = False):
+        self.cursor = cursor
+        self.table = table
+        self.stage = f"{table}_stage"
+        self.columns = ", ".join(columns)
+        self.key = key
+        self.batch_size = batch_size
+        self.computed = computed or {}
+        self.on_conflict = on_conflict
+        self.track_seen = track_seen
+        self.count = 0
+        cursor.execute(f"CREATE TEMP TABLE {self.stage} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+        if track_seen:
+            cursor.execute(f"CREATE TEMP TABLE {table}_seen ({key} VARCHAR(20) PRIMARY KEY) ON COMMIT DROP")
+
+    def copy(self, rows: Iterable[Tuple]) -> int:
+        """Копирует строки в промежуточную таблицу, возвращает их число."""
+        count = 0
+        for batch in _batches(rows, self.batch_size):
+            with metrics.timer("db_copy_duration_seconds", table=self.table):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(map(_copy_row, batch))
+                buffer.seek(0)
+                self.cursor.copy_expert(
+                    f"COPY {self.stage} ({self.columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", buffer
+                )
+            metrics.inc("db_copy_rows_total", len(batch), table=self.table)
+            count += len(batch)
+        self.count += count
+        return count
+
+    def merge(self) -> None:
+        """Переносит строки из промежуточной таблицы в основную."""
+        target_columns = ", ".join([self.columns, *self.computed])
+        select_columns = ", ".join([self.columns, *self.computed.values()])
+        with metrics.timer("db_query_duration_seconds", query=f"merge_{self.table}"):
+            # DISTINCT ON защищает от повторов ключа внутри пачки, которые запрещены для DO UPDATE
+            self.cursor.execute(f"""
+                INSERT INTO {self.table} ({target_columns})
+                SELECT DISTINCT ON ({self.key}) {select_columns} FROM {self.stage}
+                ON CONFLICT ({self.key}) {self.on_conflict}
+            """)
+            if self.track_seen:
+                self.cursor.execute(f"""
+                    INSERT INTO {self.table}_seen ({self.key})
+                    SELECT {self.key} FROM {self.stage}
+                    ON CONFLICT DO NOTHING
+                """)
+            self.cursor.execute(f"TRUNCATE {self.stage}")
+
+
+def load_to_db(
+        db_params: Dict[str, str],
+        employers: Iterable[Union[Dict[str, Any], Employer]],
+        vacancies: Iterable[Union[Dict[str, Any], Vacancy]],
+        batch_size: int = 5000,
+        found: Optional[Dict[str, int]] = None
+) -> Dict[str, float]:
+    """Загружает данные о работодателях и вакансиях в БД.
+
+    Принимает записи Employer и Vacancy (src.records) или исходные ответы API.
+
+    Строки передаются командой COPY во временные промежуточные таблицы пачками по
+    batch_size строк, после чего переносятся в основные таблицы одним
+    INSERT ... ON CONFLICT на таблицу. В той же транзакции пересчитывается сводка
+    employer_summary затронутых работодателей; found — число вакансий по данным API
+    {employer_id: found}. Возвращает статистику загрузки.
+    """
+    start = time.perf_counter()
+    employers = [employer_row(emp) for emp in employers]
+    employer_ids = {emp.employer_id for emp in employers}
+    with metrics.span("load_to_db"), connection(db_params) as conn:
+        with conn.cursor() as cursor:
+            # Работодатели загружаются первыми: на них ссылаются вакансии
+            with metrics.span("load_employers"):
+                employers_count = load_employers(cursor, employers, batch_size)
+            with metrics.span("load_vacancies"):
+                vacancy_loader = vacancy_bulk_loader(cursor, batch_size)
+                vacancy_loader.copy(_collect_employer_ids(map(vacancy_row, vacancies), employer_ids))
+                vacancy_loader.merge()
+            refresh_employer_summary(cursor, sorted(employer_ids), found)
+            bump_data_generation(cursor)
+
+    return load_stats(employers_count, vacancy_loader.count, time.perf_counter() - start)
+
+
+def load_employers(cursor, employers: Iterable[Union[Dict[str, Any], Employer]], batch_size: int = 5000) -> int:
+    """Загружает работодателей (записи или ответы API) в рамках открытой транзакции, возвращает число строк."""
+    return load_employer_rows(cursor, map(employer_row, employers), batch_size)
+
+
+def load_employer_rows(cursor, rows: Iterable[Tuple], batch_size: int = 5000) -> int:
+    """Загружает строки работодателей (в порядке EMPLOYER_COLUMNS) в рамках открытой транзакции."""
+    loader = BulkLoader(cursor, "employers", EMPLOYER_COLUMNS, "employer_id", batch_size, on_conflict=EMPLOYER_UPSERT)
+    loader.copy(rows)
+    loader.merge()
+    return loader.count
 
-    # Загрузка работодателей
-    for emp in employers:
+
+def vacancy_bulk_loader(cursor, batch_size: int = 5000, track_seen: bool = False) -> BulkLoader:
+    """Создаёт загрузчик вакансий для открытой транзакции.
+
+    Изменённые вакансии обновляются только при отличии хеша содержимого, поэтому
+    повторная загрузка неизменившихся данных не переписывает строки. Зарплата в рублях
+    (salary_rub) вычисляется для всей пачки одним запросом при переносе.
+    """
+    return BulkLoader(cursor, "vacancies", VACANCY_COLUMNS, "vacancy_id", batch_size,
+                      computed={"content_hash": VACANCY_HASH, "salary_rub": SALARY_RUB}, on_conflict=VACANCY_UPSERT,
+                      track_seen=track_seen)
+
+
+def archive_missing_vacancies(cursor, employer_ids: List[str]) -> int:
+    """Помечает архивными вакансии работодателей, не встретившиеся в текущей синхронизации.
+
+    Использует таблицу vacancies_seen загрузчика с track_seen=True, возвращает число строк.
+    """
+    if not employer_ids:
+        return 0
+    with metrics.timer("db_query_duration_seconds", query="archive_missing_vacancies"):
         cursor.execute("""
-            INSERT INTO employers (employer_id, name, url)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (employer_id) DO NOTHING
-        """, (emp["id"], emp["name"], emp["alternate_url"]))
-
-    # Загрузка вакансий
-    for vac in vacancies:
-        salary = vac.get("salary")
-        salary_from = salary["from"] if salary and salary.get("from") else None
-        salary_to = salary["to"] if salary and salary.get("to") else None
-        employer_id = vac["employer"]["id"]  # Извлекаем employer_id из вложенного словаря
+            UPDATE vacancies v
+            SET archived = TRUE, updated_at = now()
+            WHERE v.employer_id = ANY(%s) AND NOT v.archived
+              AND NOT EXISTS (SELECT 1 FROM vacancies_seen s WHERE s.vacancy_id = v.vacancy_id)
+        """, (list(employer_ids),))
+    return cursor.rowcount
+
+
+def refresh_employer_summary(cursor, employer_ids: List[str], found: Optional[Dict[str, int]] = None) -> None:
+    """Пересчитывает сводку employer_summary для указанных работодателей.
+
+    Агрегаты считаются только по строкам этих работодателей, поэтому стоимость
+    обновления не зависит от размера остальной таблицы.
+    """
+    if not employer_ids:
+        return
+    found = found or {}
+    with metrics.span("refresh_employer_summary", employers=len(employer_ids)):
+        cursor.execute(EMPLOYER_SUMMARY_REFRESH, (list(found), list(found.values()), list(employer_ids)))
+
+
+def update_currency_rates(cursor, rates: Dict[str, float]) -> int:
+    """Обновляет курсы валют {код: единиц валюты за рубль} (формат справочника hh.ru).
+
+    Для вакансий в валютах с изменившимся курсом пересчитывается salary_rub, а для их
+    работодателей — сводка employer_summary (включая не участвующих в текущей загрузке).
+    Возвращает число пересчитанных вакансий.
+    """
+    rates = {code: rate for code, rate in rates.items() if rate and rate > 0}
+    if not rates:
+        return 0
+    with metrics.timer("db_query_duration_seconds", query="update_currency_rates"):
         cursor.execute("""
-            INSERT INTO vacancies (vacancy_id, employer_id, name, salary_from, salary_to, url)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (vacancy_id) DO NOTHING
-        """, (vac["id"], employer_id, vac["name"], salary_from, salary_to, vac["alternate_url"]))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
\ No newline at end of file
+            INSERT INTO currency_rates (code, rate)
+            SELECT * FROM unnest(%s::varchar[], %s::numeric[])
+            ON CONFLICT (code) DO UPDATE SET rate = EXCLUDED.rate, updated_at = now()
+            WHERE currency_rates.rate IS DISTINCT FROM EXCLUDED.rate
+            RETURNING code
+        """, (list(rates), list(rates.values())))
+        changed = [row[0] for row in cursor.fetchall()]
+        if not changed:
+            return 0
+        cursor.execute(f"""
+            WITH updated AS (
+                UPDATE vacancies SET salary_rub = {SALARY_RUB}
+                WHERE COALESCE(currency, 'RUR') = ANY(%s)
+                RETURNING employer_id
+            )
+            SELECT employer_id, COUNT(*) FROM updated GROUP BY employer_id
+        """, (changed,))
+        updated = dict(cursor.fetchall())
+    refresh_employer_summary(cursor, list(updated))
+    return sum(updated.values())
+
+
+def bump_data_generation(cursor) -> None:
+    """Отмечает изменение данных: увеличивает поколение в sync_state.
+
+    Вызывается в транзакции загрузки, поэтому новое поколение становится видно вместе
+    с данными; по нему DBManager сбрасывает кеш результатов запросов.
+    """
+    cursor.execute("UPDATE sync_state SET generation = generation + 1, loaded_at = now() WHERE id = 1")
+
+
+def load_stats(employers_count: int, vacancies_count: int, seconds: float) -> Dict[str, float]:
+    """Печатает и возвращает статистику загрузки."""
+    rows = employers_count + vacancies_count
+    rows_per_sec = rows / seconds if seconds > 0 else 0.0
+    print(f"Загружено строк: {rows} за {seconds:.2f} с ({rows_per_sec:.0f} строк/с)")
+    return {"employers": employers_count, "vacancies": vacancies_count, "rows": rows,
+            "seconds": seconds, "rows_per_sec": rows_per_sec}
+
+
+def _copy_row(row: Tuple) -> Tuple:
+    """Строка для COPY: None заменяется на COPY_NULL, иначе пустое поле CSV тоже читалось бы как NULL."""
+    return tuple(COPY_NULL if value is None else value for value in row)
+
+
+def _batches(rows: Iterable[Tuple], batch_size: int) -> Iterator[List[Tuple]]:
+    """Разбивает поток строк на списки не длиннее batch_size."""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _collect_employer_ids(rows: Iterable[Tuple], employer_ids: set) -> Iterator[Tuple]:
+    """Пропускает строки вакансий, запоминая идентификаторы их работодателей."""
+    for row in rows:
+        employer_ids.add(row[1])
+        yield row
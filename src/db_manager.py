@@ -1,77 +1,355 @@
-import psycopg2
-from typing import List, Dict, Any, Optional
+import functools
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+from src.db_pool import connection
+from src.metrics import metrics, track_query
+
+
+def cached_query(func: Callable) -> Callable:
+    """Декоратор метода DBManager: результат берётся из кеша, если он включён (cache_size > 0).
+
+    Ключ — имя метода и аргументы. Поколение данных из sync_state перечитывается не чаще
+    раза в generation_check_interval секунд; если после заполнения кеша прошла загрузка,
+    кеш сбрасывается. Декоратор применяется поверх track_query: метрики запросов учитывают
+    только обращения к БД, попадания в кеш считаются в db_cache_total.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self.cache_size:
+            return func(self, *args, **kwargs)
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        generation = self._checked_generation()
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                self._cache.clear()
+                self._cache_generation = generation
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                metrics.inc("db_cache_total", result="hit", query=func.__name__)
+                return self._cache[key]
+        metrics.inc("db_cache_total", result="miss", query=func.__name__)
+        result = func(self, *args, **kwargs)
+        with self._cache_lock:
+            if generation == self._cache_generation:  # за время запроса данные не перезагружались
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    return wrapper
 
 
 class DBManager:
-    """Класс для работы с данными в базе данных PostgreSQL."""
+    """Класс для работы с данными в базе данных PostgreSQL.
+
+    Время выполнения и число строк каждого запроса записываются в метрики (src.metrics).
+    При cache_size > 0 результаты запросов, возвращающих списки и значения, хранятся
+    в LRU-кеше на cache_size записей и сбрасываются после каждой загрузки данных
+    (загрузка другим процессом обнаруживается в пределах generation_check_interval).
+    Закешированные результаты общие для всех вызывающих, их нельзя изменять.
+    """
+
+    # Общая часть запросов потоковых и постраничных выборок вакансий
+    VACANCY_QUERY = """
+                SELECT v.vacancy_id, e.name, v.name, v.salary_from, v.salary_to, v.url
+                FROM vacancies v
+                JOIN employers e ON v.employer_id = e.employer_id
+                WHERE NOT v.archived"""
+    # Средняя зарплата как подзапрос: вычисляется один раз внутри запроса, который её использует.
+    # Зарплаты сравниваются по salary_rub — в рублях на руки, с индексом vacancies_salary_rub_idx
+    AVG_SALARY_SUBQUERY = """(
+                    SELECT AVG(salary_rub)
+                    FROM vacancies
+                    WHERE salary_rub IS NOT NULL AND NOT archived
+                )"""
+
+    def __init__(self, db_params: Dict[str, str], cache_size: int = 0, generation_check_interval: float = 5.0):
+        """Сохраняет параметры подключения; соединения берутся из общего пула.
+
+        :param cache_size: число результатов в кеше; 0 — кеш выключен.
+        :param generation_check_interval: как часто (в секундах) кеш проверяет, не загружены ли
+            данные заново другим процессом; загрузка в этом процессе сбрасывает кеш через clear_cache.
+        """
+        self.db_params = db_params
+        self.cache_size = cache_size
+        self.generation_check_interval = generation_check_interval
+        self._cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._cache_generation: Optional[int] = None
+        self._cache_lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._generation_checked_at = 0.0
 
-    def __init__(self, db_params: Dict[str, str]):
-        """Инициализирует подключение к БД."""
-        self.conn = psycopg2.connect(**db_params)
+    def get_data_generation(self) -> int:
+        """Поколение данных: увеличивается каждой загрузкой (см. bump_data_generation)."""
+        with self._cursor() as cursor:
+            cursor.execute("SELECT generation FROM sync_state WHERE id = 1")
+            row = cursor.fetchone()
+            return row[0] if row else 0
 
+    def clear_cache(self) -> None:
+        """Очищает кеш результатов запросов; поколение данных будет прочитано при следующем запросе."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._generation = None
+
+    def _checked_generation(self) -> int:
+        """Поколение данных, перечитываемое из БД не чаще раза в generation_check_interval секунд."""
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked_at >= self.generation_check_interval:
+            self._generation = self.get_data_generation()
+            self._generation_checked_at = now
+        return self._generation
+
+    @contextmanager
+    def _cursor(self) -> Iterator:
+        """Курсор на соединении из общего пула, возвращаемом после запроса."""
+        with connection(self.db_params) as conn, conn.cursor() as cursor:
+            yield cursor
+
+    @cached_query
+    @track_query
     def get_companies_and_vacancies_count(self) -> List[Dict[str, Any]]:
-        """Получает список компаний и количество их вакансий."""
-        with self.conn.cursor() as cursor:
+        """Получает список компаний и количество их вакансий.
+
+        Читает сводку employer_summary, обновляемую при загрузке, поэтому запрос не
+        просматривает таблицу вакансий. found — число вакансий по данным API (None, если
+        неизвестно). Работодатели без строки сводки выводятся с нулём вакансий.
+        """
+        with self._cursor() as cursor:
             cursor.execute("""
-                SELECT e.name, COUNT(v.vacancy_id) as vacancies_count
+                SELECT e.name, COALESCE(s.vacancies_count, 0), s.found, s.min_salary, s.avg_salary, s.max_salary
                 FROM employers e
-                LEFT JOIN vacancies v ON e.employer_id = v.employer_id
-                GROUP BY e.name
+                LEFT JOIN employer_summary s ON s.employer_id = e.employer_id
+                ORDER BY e.name
             """)
-            return [{"company": row[0], "vacancies_count": row[1]} for row in cursor.fetchall()]
+            return [
+                {"company": row[0], "vacancies_count": row[1], "found": row[2], "min_salary": row[3],
+                 "avg_salary": float(row[4]) if row[4] is not None else None, "max_salary": row[5]}
+                for row in cursor.fetchall()
+            ]
 
+    @cached_query
+    @track_query
     def get_all_vacancies(self) -> List[Dict[str, Any]]:
         """Получает список всех вакансий с данными о компании, зарплате и ссылке."""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             cursor.execute("""
                 SELECT e.name, v.name, v.salary_from, v.salary_to, v.url
                 FROM vacancies v
                 JOIN employers e ON v.employer_id = e.employer_id
+                WHERE NOT v.archived
             """)
             return [
                 {"company": row[0], "vacancy": row[1], "salary_from": row[2], "salary_to": row[3], "url": row[4]}
                 for row in cursor.fetchall()
             ]
 
+    @cached_query
+    @track_query
     def get_avg_salary(self) -> float:
-        """Получает среднюю зарплату по всем вакансиям."""
-        with self.conn.cursor() as cursor:
+        """Получает среднюю зарплату по всем вакансиям в рублях на руки."""
+        with self._cursor() as cursor:
             cursor.execute("""
-                SELECT AVG(COALESCE(salary_from, salary_to)) 
-                FROM vacancies 
-                WHERE salary_from IS NOT NULL OR salary_to IS NOT NULL
+                SELECT AVG(salary_rub)
+                FROM vacancies
+                WHERE salary_rub IS NOT NULL AND NOT archived
             """)
             return cursor.fetchone()[0] or 0
 
+    @cached_query
+    @track_query
     def get_vacancies_with_higher_salary(self) -> List[Dict[str, Any]]:
-        """Получает вакансии с зарплатой выше средней."""
-        avg_salary = self.get_avg_salary()
-        with self.conn.cursor() as cursor:
-            cursor.execute("""
+        """Получает вакансии с зарплатой выше средней.
+
+        Средняя зарплата вычисляется подзапросом в том же запросе, без отдельного обращения к БД.
+        """
+        with self._cursor() as cursor:
+            cursor.execute(f"""
                 SELECT e.name, v.name, v.salary_from, v.salary_to, v.url
                 FROM vacancies v
                 JOIN employers e ON v.employer_id = e.employer_id
-                WHERE COALESCE(v.salary_from, v.salary_to) > %s
-            """, (avg_salary,))
+                WHERE v.salary_rub > {self.AVG_SALARY_SUBQUERY} AND NOT v.archived
+            """)
             return [
                 {"company": row[0], "vacancy": row[1], "salary_from": row[2], "salary_to": row[3], "url": row[4]}
                 for row in cursor.fetchall()
             ]
 
+    @cached_query
+    @track_query
     def get_vacancies_with_keyword(self, keyword: str) -> List[Dict[str, Any]]:
         """Получает вакансии по ключевому слову в названии."""
-        with self.conn.cursor() as cursor:
+        with self._cursor() as cursor:
             cursor.execute("""
                 SELECT e.name, v.name, v.salary_from, v.salary_to, v.url
                 FROM vacancies v
                 JOIN employers e ON v.employer_id = e.employer_id
-                WHERE v.name ILIKE %s
+                WHERE v.name ILIKE %s AND NOT v.archived
             """, (f"%{keyword}%",))
             return [
                 {"company": row[0], "vacancy": row[1], "salary_from": row[2], "salary_to": row[3], "url": row[4]}
                 for row in cursor.fetchall()
             ]
 
-    def __del__(self):
-        """Закрывает соединение с БД при уничтожении объекта."""
-        self.conn.close()
\ No newline at end of file
+    @cached_query
+    @track_query
+    def search_vacancies(self, query: str, limit: Optional[int] = 50) -> List[Dict[str, Any]]:
+        """Ищет вакансии по словам запроса с ранжированием по релевантности.
+
+        Слова сопоставляются с учётом словоформ (русская и английская морфология,
+        все слова запроса должны встретиться), дополнительно находятся названия,
+        содержащие запрос как подстроку. Оба условия обслуживаются GIN-индексами.
+        limit=None возвращает все найденные вакансии.
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                SELECT e.name, v.name, v.salary_from, v.salary_to, v.url,
+                       ts_rank(v.search_vector, q.query) + similarity(v.name, %(query)s) AS rank
+                FROM vacancies v
+                JOIN employers e ON v.employer_id = e.employer_id
+                CROSS JOIN (
+                    SELECT plainto_tsquery('russian', %(query)s) || plainto_tsquery('english', %(query)s) AS query
+                ) q
+                WHERE (v.search_vector @@ q.query OR v.name ILIKE %(pattern)s) AND NOT v.archived
+                ORDER BY rank DESC, v.vacancy_id
+                LIMIT %(limit)s
+            """, {"query": query, "pattern": f"%{query}%", "limit": limit})
+            return [
+                {"company": row[0], "vacancy": row[1], "salary_from": row[2], "salary_to": row[3], "url": row[4],
+                 "rank": row[5]}
+                for row in cursor.fetchall()
+            ]
+
+    @track_query
+    def iter_all_vacancies(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Потоково выдаёт все вакансии, получая их с сервера пачками по batch_size."""
+        return self._iter_vacancies("", (), batch_size)
+
+    @track_query
+    def iter_vacancies_with_higher_salary(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Потоково выдаёт вакансии с зарплатой выше средней."""
+        condition, params = self._higher_salary_condition()
+        return self._iter_vacancies(condition, params, batch_size)
+
+    @track_query
+    def iter_vacancies_with_keyword(self, keyword: str, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Потоково выдаёт вакансии с ключевым словом в названии."""
+        return self._iter_vacancies(" AND v.name ILIKE %s", (f"%{keyword}%",), batch_size)
+
+    @cached_query
+    @track_query
+    def get_all_vacancies_page(self, after: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Возвращает страницу вакансий, следующих за вакансией after (постраничный вывод по ключу).
+
+        Для следующей страницы передайте vacancy_id последней вакансии текущей страницы.
+        """
+        return self._vacancies_page("", (), after, limit)
+
+    @cached_query
+    @track_query
+    def get_vacancies_with_higher_salary_page(self, after: Optional[str] = None,
+                                              limit: int = 100) -> List[Dict[str, Any]]:
+        """Возвращает страницу вакансий с зарплатой выше средней."""
+        condition, params = self._higher_salary_condition()
+        return self._vacancies_page(condition, params, after, limit)
+
+    @cached_query
+    @track_query
+    def get_vacancies_with_keyword_page(self, keyword: str, after: Optional[str] = None,
+                                        limit: int = 100) -> List[Dict[str, Any]]:
+        """Возвращает страницу вакансий с ключевым словом в названии."""
+        return self._vacancies_page(" AND v.name ILIKE %s", (f"%{keyword}%",), after, limit)
+
+    def _higher_salary_condition(self) -> Tuple[str, Tuple]:
+        """Условие отбора вакансий с зарплатой выше средней."""
+        return f" AND v.salary_rub > {self.AVG_SALARY_SUBQUERY}", ()
+
+    def _iter_vacancies(self, condition: str, params: Tuple, batch_size: int) -> Iterator[Dict[str, Any]]:
+        """Выполняет выборку серверным (именованным) курсором и выдаёт строки по одной.
+
+        Клиент получает строки пачками по batch_size, поэтому в памяти не хранится
+        весь результат. Соединение возвращается в пул после исчерпания или закрытия генератора.
+        """
+        with connection(self.db_params) as conn:
+            with conn.cursor(name=f"dbmanager_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(f"{self.VACANCY_QUERY}{condition}", params)
+                for row in cursor:
+                    yield self._vacancy(row)
+
+    def _vacancies_page(self, condition: str, params: Tuple, after: Optional[str],
+                        limit: int) -> List[Dict[str, Any]]:
+        """Выборка страницы по ключу: vacancy_id > after в порядке первичного ключа."""
+        if after is not None:
+            condition += " AND v.vacancy_id > %s"
+            params += (after,)
+        with self._cursor() as cursor:
+            cursor.execute(f"{self.VACANCY_QUERY}{condition}\n                ORDER BY v.vacancy_id\n                LIMIT %s",
+                           params + (limit,))
+            return [self._vacancy(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _vacancy(row: Tuple) -> Dict[str, Any]:
+        """Преобразует строку VACANCY_QUERY в словарь."""
+        return {"vacancy_id": row[0], "company": row[1], "vacancy": row[2], "salary_from": row[3],
+                "salary_to": row[4], "url": row[5]}
+
+    @cached_query
+    @track_query
+    def get_salary_stats(self, buckets: int = 10) -> List[Dict[str, Any]]:
+        """Получает статистику зарплат по компаниям одним запросом.
+
+        Для каждой компании возвращаются число вакансий с зарплатой, средняя, медиана,
+        10-й и 90-й перцентили и гистограмма: число вакансий в каждом из buckets равных
+        интервалов между минимальной и максимальной зарплатой по всем компаниям
+        (границы интервалов — в bucket_edges). Зарплаты — в рублях на руки (salary_rub).
+        """
+        with self._cursor() as cursor:
+            cursor.execute("""
+                WITH s AS (
+                    SELECT employer_id, salary_rub AS salary
+                    FROM vacancies
+                    WHERE salary_rub IS NOT NULL AND NOT archived
+                ),
+                bounds AS (
+                    SELECT MIN(salary) AS lo, MAX(salary) + 1 AS hi FROM s
+                ),
+                hist AS (
+                    SELECT s.employer_id, width_bucket(s.salary, b.lo, b.hi, %(buckets)s) AS bucket,
+                           COUNT(*) AS vacancies_count
+                    FROM s CROSS JOIN bounds b
+                    GROUP BY s.employer_id, bucket
+                ),
+                stats AS (
+                    SELECT employer_id, COUNT(*) AS vacancies_count, AVG(salary) AS avg_salary,
+                           percentile_cont(ARRAY[0.1, 0.5, 0.9]) WITHIN GROUP (ORDER BY salary) AS percentiles
+                    FROM s
+                    GROUP BY employer_id
+                )
+                SELECT e.name, st.vacancies_count, st.avg_salary, st.percentiles, b.lo, b.hi,
+                       (SELECT json_object_agg(h.bucket, h.vacancies_count)
+                        FROM hist h WHERE h.employer_id = st.employer_id)
+                FROM stats st
+                JOIN employers e ON e.employer_id = st.employer_id
+                CROSS JOIN bounds b
+                ORDER BY e.name
+            """, {"buckets": buckets})
+            result = []
+            for name, count, avg_salary, percentiles, lo, hi, histogram in cursor.fetchall():
+                step = (hi - lo) / buckets
+                result.append({
+                    "company": name,
+                    "vacancies_count": count,
+                    "avg_salary": float(avg_salary),
+                    "p10": percentiles[0],
+                    "median": percentiles[1],
+                    "p90": percentiles[2],
+                    "histogram": [histogram.get(str(i), 0) for i in range(1, buckets + 1)],
+                    "bucket_edges": [lo + step * i for i in range(buckets + 1)]
+                })
+            return result
@@ -0,0 +1,126 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с PostgreSQL.
+
+    Держит от minconn до maxconn соединений; если все заняты, вызывающий поток ждёт
+    освобождения. Соединение, простоявшее дольше health_check_interval, перед выдачей
+    проверяется запросом SELECT 1, а закрытое или неработоспособное заменяется новым.
+    """
+
+    def __init__(self, db_params: Dict[str, str], minconn: int = 1, maxconn: int = 10,
+                 health_check_interval: float = 30.0):
+        self.health_check_interval = health_check_interval
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **db_params)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used = {}
+
+    @contextmanager
+    def connection(self, autocommit: bool = False) -> Iterator:
+        """Выдаёт соединение из пула и возвращает его после использования.
+
+        При успешном завершении блока транзакция фиксируется, при исключении —
+        откатывается. Соединение, на котором произошла ошибка связи, закрывается.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            if autocommit:
+                conn.autocommit = True
+            yield conn
+            if not autocommit:
+                conn.commit()
+        except BaseException as e:
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not broken and not conn.closed and not autocommit:
+                conn.rollback()
+            raise
+        finally:
+            if autocommit and not conn.closed and not broken:
+                conn.autocommit = False
+            self.putconn(conn, close=broken)
+
+    def getconn(self):
+        """Берёт из пула работоспособное соединение, при необходимости переподключаясь."""
+        self._slots.acquire()
+        try:
+            conn = self._pool.getconn()
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                conn = self._pool.getconn()
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """Возвращает соединение в пул; при close=True или закрытом соединении оно удаляется."""
+        try:
+            if close or conn.closed:
+                self._discard(conn)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self) -> None:
+        """Закрывает все соединения пула."""
+        self._pool.closeall()
+        self._last_used.clear()
+
+    def _is_healthy(self, conn) -> bool:
+        """Проверяет соединение; давно простаивающее проверяется запросом к серверу."""
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn) -> None:
+        """Удаляет соединение из пула и закрывает его."""
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+
+_pools: Dict[Tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_params: Dict[str, str], minconn: int = 1, maxconn: int = 10) -> ConnectionPool:
+    """Возвращает общий пул для параметров подключения, создавая его при первом обращении."""
+    key = tuple(sorted(db_params.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_params, minconn, maxconn)
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def connection(db_params: Dict[str, str], autocommit: bool = False) -> Iterator:
+    """Соединение из общего пула для указанных параметров (см. ConnectionPool.connection)."""
+    with get_pool(db_params).connection(autocommit) as conn:
+        yield conn
+
+
+def close_all() -> None:
+    """Закрывает все общие пулы."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
@@ -1,57 +1,46 @@
+from typing import Dict, List, Optional, Tuple
+
 import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-from typing import Dict
+
+from src.db_pool import connection
 
 
 def create_database(db_params: Dict[str, str]) -> None:
     """Создаёт базу данных, если она не существует."""
-    conn = psycopg2.connect(
-        dbname="postgres",
-        user=db_params["user"],
-        password=db_params["password"],
-        host=db_params["host"],
-        port=db_params["port"]
-    )
-    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = conn.cursor()
-
-    db_name = db_params["dbname"]
-    cursor.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}'")
-    exists = cursor.fetchone()
-    if not exists:
-        cursor.execute(f"CREATE DATABASE {db_name}")
-    cursor.close()
-    conn.close()
+    maintenance_params = {**db_params, "dbname": "postgres"}
+    with connection(maintenance_params, autocommit=True) as conn:
+        with conn.cursor() as cursor:
+            db_name = db_params["dbname"]
+            cursor.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}'")
+            exists = cursor.fetchone()
+            if not exists:
+                cursor.execute(f"CREATE DATABASE {db_name}")
 
 
 def drop_tables(db_params: Dict[str, str]) -> None:
-    """Удаляет существующие таблицы employers и vacancies."""
+    """Удаляет таблицы данных, сводку employer_summary, курсы валют, состояние загрузки и версию схемы."""
     try:
-        conn = psycopg2.connect(**db_params)
-        cursor = conn.cursor()
-        cursor.execute("DROP TABLE IF EXISTS vacancies, employers CASCADE")
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with connection(db_params) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DROP TABLE IF EXISTS schema_version, sync_state, currency_rates, employer_summary, "
+                               "vacancies, employers CASCADE")
     except Exception as e:
         print("Ошибка в drop_tables:", str(e))
         raise
 
 
-def create_tables(db_params: Dict[str, str]) -> None:
-    """Создаёт таблицы в базе данных."""
-    conn = psycopg2.connect(**db_params)
-    cursor = conn.cursor()
-
-    cursor.execute("""
+# Миграции схемы: (версия, описание, команды). Команды идемпотентны (IF NOT EXISTS), поэтому
+# применяются и к базам, созданным до появления учёта версий. Новые изменения — только новой версией.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Таблицы работодателей и вакансий", [
+        """
         CREATE TABLE IF NOT EXISTS employers (
             employer_id VARCHAR(20) PRIMARY KEY,
             name VARCHAR(255) NOT NULL,
             url VARCHAR(255)
         )
-    """)
-
-    cursor.execute("""
+    """,
+        """
         CREATE TABLE IF NOT EXISTS vacancies (
             vacancy_id VARCHAR(20) PRIMARY KEY,
             employer_id VARCHAR(20) REFERENCES employers(employer_id),
@@ -60,8 +49,158 @@ def create_tables(db_params: Dict[str, str]) -> None:
             salary_to INTEGER,
             url VARCHAR(255)
         )
-    """)
+    """
+    ]),
+    (2, "Поля инкрементальной синхронизации", [
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS content_hash CHAR(32)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS archived BOOLEAN NOT NULL DEFAULT FALSE",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()"
+    ]),
+    (3, "Полнотекстовый поиск по названию с русской и английской морфологией", [
+        """
+        ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('russian', coalesce(name, '')) || to_tsvector('english', coalesce(name, ''))
+        ) STORED
+    """,
+        "CREATE INDEX IF NOT EXISTS vacancies_search_vector_idx ON vacancies USING GIN (search_vector)"
+    ]),
+    (4, "Триграммный индекс для поиска подстроки (ILIKE '%...%')", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS vacancies_name_trgm_idx ON vacancies USING GIN (name gin_trgm_ops)"
+    ]),
+    (5, "Индекс по эффективной зарплате для отбора вакансий выше средней и аналитики", [
+        """
+        CREATE INDEX IF NOT EXISTS vacancies_effective_salary_idx
+        ON vacancies ((COALESCE(salary_from, salary_to)))
+        WHERE NOT archived
+    """
+    ]),
+    (6, "Сводка по работодателям, обновляемая при загрузке (см. refresh_employer_summary)", [
+        """
+        CREATE TABLE IF NOT EXISTS employer_summary (
+            employer_id VARCHAR(20) PRIMARY KEY REFERENCES employers(employer_id) ON DELETE CASCADE,
+            vacancies_count INTEGER NOT NULL DEFAULT 0,
+            found INTEGER,
+            min_salary INTEGER,
+            avg_salary NUMERIC,
+            max_salary INTEGER,
+            refreshed_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """
+    ]),
+    (7, "Индексы внешнего ключа и названий", [
+        # Соединения vacancies с employers, архивация и пересчёт сводки идут по employer_id
+        "CREATE INDEX IF NOT EXISTS vacancies_employer_id_idx ON vacancies (employer_id) WHERE NOT archived",
+        "CREATE INDEX IF NOT EXISTS employers_name_idx ON employers (name)",
+        "CREATE INDEX IF NOT EXISTS vacancies_name_idx ON vacancies (name)"
+    ]),
+    (8, "Поколение данных, увеличиваемое каждой загрузкой (см. bump_data_generation)", [
+        """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+            generation BIGINT NOT NULL DEFAULT 0,
+            loaded_at TIMESTAMP
+        )
+    """,
+        "INSERT INTO sync_state (id) VALUES (1) ON CONFLICT DO NOTHING"
+    ]),
+    (9, "Зарплата в рублях на руки с учётом валюты и налога (см. SALARY_RUB)", [
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS currency VARCHAR(3)",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS gross BOOLEAN",
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS salary_rub INTEGER",
+        # Курс — единиц валюты за рубль, как в справочнике hh.ru (/dictionaries); обновляется при загрузке
+        """
+        CREATE TABLE IF NOT EXISTS currency_rates (
+            code VARCHAR(3) PRIMARY KEY,
+            rate NUMERIC NOT NULL CHECK (rate > 0),
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """,
+        """
+        INSERT INTO currency_rates (code, rate) VALUES
+            ('RUR', 1), ('USD', 0.0125), ('EUR', 0.0115), ('KZT', 6.2), ('BYR', 0.04),
+            ('UAH', 0.5), ('UZS', 155), ('AZN', 0.021), ('GEL', 0.034), ('KGS', 1.08)
+        ON CONFLICT DO NOTHING
+    """,
+        # Валюта строк, загруженных до миграции, неизвестна: они считаются рублёвыми до следующей загрузки,
+        # при которой изменившийся хеш содержимого перезапишет их с валютой
+        "UPDATE vacancies SET salary_rub = COALESCE(salary_from, salary_to) WHERE salary_rub IS NULL",
+        """
+        UPDATE employer_summary s
+        SET min_salary = a.min_salary, avg_salary = a.avg_salary, max_salary = a.max_salary
+        FROM (
+            SELECT employer_id, MIN(salary_rub) AS min_salary, AVG(salary_rub) AS avg_salary,
+                   MAX(salary_rub) AS max_salary
+            FROM vacancies
+            WHERE NOT archived
+            GROUP BY employer_id
+        ) a
+        WHERE a.employer_id = s.employer_id
+    """,
+        "DROP INDEX IF EXISTS vacancies_effective_salary_idx",
+        "CREATE INDEX IF NOT EXISTS vacancies_salary_rub_idx ON vacancies (salary_rub) WHERE NOT archived"
+    ])
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+# Ключ рекомендательной блокировки: одновременно запущенные копии не применяют миграции дважды
+MIGRATION_LOCK_KEY = 3_240_001
+
 
-    conn.commit()
-    cursor.close()
-    conn.close()
\ No newline at end of file
+def get_schema_version(cursor) -> int:
+    """Возвращает версию схемы базы данных; 0, если учёт версий ещё не вёлся."""
+    cursor.execute("SELECT to_regclass('schema_version')")
+    if cursor.fetchone()[0] is None:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def create_tables(db_params: Dict[str, str]) -> int:
+    """Приводит схему базы данных к версии SCHEMA_VERSION, возвращает число применённых миграций.
+
+    Если схема уже актуальна, выполняются только запросы чтения версии, без DDL.
+    Недостающие миграции применяются по порядку в одной транзакции.
+    """
+    with connection(db_params) as conn:
+        with conn.cursor() as cursor:
+            if get_schema_version(cursor) >= SCHEMA_VERSION:
+                return 0
+            # Блокировка берётся до CREATE TABLE: одновременные CREATE TABLE IF NOT EXISTS конфликтуют в pg_type
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_KEY,))
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                )
+            """)
+            current = get_schema_version(cursor)  # другая копия могла применить миграции, пока мы ждали
+            pending = [migration for migration in MIGRATIONS if migration[0] > current]
+            for version, description, statements in pending:
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)", (version, description)
+                )
+            return len(pending)
+
+
+def get_data_age(db_params: Dict[str, str]) -> Optional[float]:
+    """Возвращает возраст загруженных данных в секундах по sync_state.loaded_at.
+
+    None — данные нужно загрузить: базы ещё нет, схема отстаёт от SCHEMA_VERSION
+    или загрузка ни разу не завершалась. Выполняет только запросы чтения.
+    """
+    try:
+        with connection(db_params) as conn:
+            with conn.cursor() as cursor:
+                if get_schema_version(cursor) < SCHEMA_VERSION:
+                    return None
+                cursor.execute("SELECT EXTRACT(EPOCH FROM now() - loaded_at) FROM sync_state WHERE id = 1")
+                row = cursor.fetchone()
+    except psycopg2.OperationalError:
+        return None  # база данных ещё не создана
+    if row is None or row[0] is None:
+        return None
+    return float(row[0])
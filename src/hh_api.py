@@ -1,28 +1,248 @@
+import json
+import time
 import requests
-from typing import List, Dict, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+from urllib3.util.retry import Retry
+
+from src.concurrency import AdaptiveLimiter
+from src.http_cache import ResponseCache
+from src.metrics import endpoint, metrics
+from src.records import Employer, Vacancy, employer_row, vacancy_row
 
 
 class HhApi:
     """Класс для взаимодействия с публичным API hh.ru."""
 
     BASE_URL = "https://api.hh.ru"
+    PER_PAGE = 100
+    USER_AGENT = "project_3_/1.0"
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(
+            self,
+            max_workers: int = 5,
+            timeout: float = 10.0,
+            max_retries: int = 3,
+            backoff_factor: float = 0.5,
+            pool_maxsize: Optional[int] = None,
+            session: Optional[requests.Session] = None,
+            base_url: Optional[str] = None,
+            cache: Optional[ResponseCache] = None,
+            limiter: Optional[AdaptiveLimiter] = None
+    ):
+        """Инициализирует клиент API.
+
+        :param max_workers: максимальное число работодателей или страниц вакансий, загружаемых параллельно.
+        :param timeout: таймаут одного запроса в секундах.
+        :param max_retries: число повторов при ошибках соединения и ответах из RETRY_STATUSES.
+        :param backoff_factor: множитель экспоненциальной задержки между повторами.
+        :param pool_maxsize: число keep-alive соединений в пуле (по умолчанию не меньше max_workers).
+        :param session: готовая сессия requests; если не передана, создаётся пул с повторами.
+        :param base_url: адрес API (по умолчанию BASE_URL), например локальный сервер для тестов.
+        :param cache: постоянный кеш ответов; без него каждый запрос идёт в сеть.
+        :param limiter: адаптивное ограничение запросов в полёте; по умолчанию AIMD с потолком max_workers.
+        """
+        self.base_url = base_url or self.BASE_URL
+        self.cache = cache
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Общий для работодателей и вакансий: параллелизм подстраивается под ответы API
+        self.limiter = limiter or AdaptiveLimiter(max_limit=max_workers)
+        if session is None:
+            session = self._create_session(max_retries, backoff_factor, pool_maxsize or max(max_workers, 10))
+        self.session = session
+
+    @classmethod
+    def _create_session(cls, max_retries: int, backoff_factor: float, pool_maxsize: int) -> requests.Session:
+        """Создаёт сессию с пулом keep-alive соединений и повторами с экспоненциальной задержкой."""
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=cls.RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,  # Retry-After из 429/503 имеет приоритет над backoff
+            raise_on_status=False  # после исчерпания повторов возвращаем последний ответ
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = cls.USER_AGENT
+        return session
+
+    def close(self) -> None:
+        """Закрывает соединения пула и кеш ответов (сохраняя накопленные изменения кеша)."""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def get_employers(self, employer_ids: List[str], records: bool = False) -> List[Union[Dict[str, Any], Employer]]:
+        """Получает данные о работодателях по их ID.
+
+        Запросы выполняются параллельно в пуле из max_workers потоков (число запросов
+        в полёте определяет limiter), работодатели возвращаются в порядке employer_ids.
+        При records=True вместо ответов API возвращаются записи Employer.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda emp_id: self._get_json(f"/employers/{emp_id}"), employer_ids)
+            return [employer_row(data) if records else data for data in results if data is not None]
+
+    def search_employers(self, text: Optional[str] = None, area: Optional[str] = None,
+                         only_with_vacancies: bool = True, records: bool = False,
+                         **filters: Any) -> List[Union[Dict[str, Any], Employer]]:
+        """Ищет работодателей через /employers, возвращает всех найденных в порядке выдачи.
+
+        После первой страницы (в ней API сообщает число страниц) остальные загружаются
+        параллельно в пуле из max_workers потоков. Работодатель, сдвинувшийся в выдаче на
+        следующую страницу во время загрузки, возвращается один раз. Элементы выдачи —
+        краткие данные (id, name, alternate_url, open_vacancies), их достаточно для записей
+        Employer (records=True). filters — дополнительные параметры поиска, например type.
+        """
+        params = {**filters, "per_page": self.PER_PAGE}
+        if text:
+            params["text"] = text
+        if area:
+            params["area"] = area
+        if only_with_vacancies:
+            params["only_with_vacancies"] = "true"
+        first_page = self._get_json("/employers", {**params, "page": 0})
+        if first_page is None:
+            return []
+        results = [first_page]
+        pages = first_page.get("pages", 1)
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results.extend(executor.map(lambda page: self._get_json("/employers", {**params, "page": page}),
+                                            range(1, pages)))
+        employers = {}
+        for data in results:
+            for emp in data.get("items", []) if data is not None else []:
+                employers.setdefault(emp["id"], emp)
+        return [employer_row(emp) for emp in employers.values()] if records else list(employers.values())
+
+    def discover_employers(self, text: Optional[str] = None, area: Optional[str] = None, min_vacancies: int = 1,
+                           records: bool = False, **filters: Any) -> List[Union[Dict[str, Any], Employer]]:
+        """Находит работодателей с не меньше чем min_vacancies открытыми вакансиями.
+
+        Возвращает элементы выдачи поиска (или записи Employer при records=True) без
+        отдельных запросов /employers/{id}: для загрузки работодателей их полей достаточно,
+        поэтому результат передаётся в run_pipeline через employers.
+        """
+        found = [emp for emp in self.search_employers(text, area, only_with_vacancies=min_vacancies > 0, **filters)
+                 if emp.get("open_vacancies", 0) >= min_vacancies]
+        metrics.inc("hh_api_employers_discovered_total", len(found))
+        return [employer_row(emp) for emp in found] if records else found
 
-    def get_employers(self, employer_ids: List[str]) -> List[Dict[str, Any]]:
-        """Получает данные о работодателях по их ID."""
-        employers = []
-        for emp_id in employer_ids:
-            response = requests.get(f"{self.BASE_URL}/employers/{emp_id}")
-            if response.status_code == 200:
-                employers.append(response.json())
-        return employers
-
-    def get_vacancies(self, employer_id: str) -> tuple[int, List[Dict[str, Any]]]:
-        """Получает общее количество вакансий и список вакансий для указанного работодателя."""
-        params = {"employer_id": employer_id, "per_page": 100, "page": 0}  # Первая страница
-        response = requests.get(f"{self.BASE_URL}/vacancies", params=params)
+    def get_currency_rates(self) -> Dict[str, float]:
+        """Получает курсы валют из справочника hh.ru: {код валюты: единиц валюты за рубль}."""
+        data = self._get_json("/dictionaries")
+        if data is None:
+            return {}
+        return {currency["code"]: currency["rate"] for currency in data.get("currency", []) if currency.get("rate")}
+
+    def get_vacancies(self, employer_id: str, all_pages: bool = False,
+                      records: bool = False) -> Tuple[int, List[Union[Dict[str, Any], Vacancy]]]:
+        """Получает общее количество вакансий и список вакансий для указанного работодателя.
+
+        По умолчанию загружается только первая страница. При all_pages=True после первого
+        ответа (в котором API сообщает число страниц) остальные страницы загружаются
+        параллельно в пуле из max_workers потоков и объединяются в исходном порядке.
+        При records=True вместо ответов API возвращаются записи Vacancy.
+        """
+        total_vacancies = 0
+        vacancies = []
+        for page in self.iter_vacancy_pages(employer_id, all_pages, records):
+            total_vacancies = page.get("found", 0)  # Общее количество вакансий
+            vacancies.extend(page.get("items", []))
+        return total_vacancies, vacancies
+
+    def iter_vacancy_pages(self, employer_id: str, all_pages: bool = True,
+                           records: bool = False) -> Iterator[Dict[str, Any]]:
+        """Генератор страниц вакансий работодателя в порядке номеров страниц.
+
+        Страницы после первой загружаются параллельно, но отдаются по одной, поэтому
+        потребитель может обрабатывать их, не собирая весь набор вакансий в памяти.
+        Неуспешно загруженные страницы пропускаются. При records=True элементы items
+        заменяются записями Vacancy сразу после разбора ответа, в потоке загрузки страницы,
+        и исходные ответы не накапливаются в очереди потребителя.
+        """
+        first_page = self._get_vacancies_page(employer_id, 0, records)
+        if first_page is None:
+            return
+        pages = first_page.get("pages", 1)
+        yield first_page
+
+        if all_pages and pages > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                # map сохраняет порядок страниц независимо от порядка завершения запросов
+                results = executor.map(lambda page: self._get_vacancies_page(employer_id, page, records),
+                                       range(1, pages))
+                for data in results:
+                    if data is not None:
+                        yield data
+
+    def _get_vacancies_page(self, employer_id: str, page: int, records: bool = False,
+                            filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Загружает одну страницу вакансий работодателя, возвращает None при ошибке.
+
+        filters — дополнительные параметры поиска, например окно дат публикации (date_from, date_to).
+        """
+        params = {"employer_id": employer_id, "per_page": self.PER_PAGE, "page": page, **(filters or {})}
+        data = self._get_json("/vacancies", params)
+        if data is not None and records:
+            data["items"] = [vacancy_row(vac) for vac in data.get("items", [])]
+        return data
+
+    def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Выполняет GET-запрос через пул сессии, возвращает JSON или None при неуспешном ответе.
+
+        Если задан кеш, свежие записи возвращаются без запроса, устаревшие перепроверяются
+        условным запросом (ответ 304 продлевает запись), а в режиме offline сеть не используется.
+        Ответ сохраняется, только если кеш сможет его использовать (ResponseCache.should_store).
+        """
+        url = f"{self.base_url}{path}"
+        route = endpoint(path)
+        cached = self.cache.get(url, params) if self.cache is not None else None
+        if cached is not None and (self.cache.offline or self.cache.is_fresh(path, cached)):
+            metrics.inc("hh_api_cache_total", endpoint=route, result="hit")
+            return json.loads(cached.body)
+        if self.cache is not None and self.cache.offline:
+            metrics.inc("hh_api_cache_total", endpoint=route, result="offline_miss")
+            return None
+
+        kwargs = {"headers": self.cache.conditional_headers(cached)} if cached is not None else {}
+        start = time.perf_counter()
+        with self.limiter.slot() as outcome:
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                metrics.observe("hh_api_request_duration_seconds", time.perf_counter() - start, endpoint=route,
+                                status=type(e).__name__)
+                raise
+            outcome["overloaded"] = self._overloaded(response)
+        metrics.observe("hh_api_request_duration_seconds", time.perf_counter() - start, endpoint=route,
+                        status=response.status_code)
+        # Тело всё равно читается при разборе JSON
+        metrics.inc("hh_api_response_bytes_total", len(response.content), endpoint=route)
+        if response.status_code == 304 and cached is not None:
+            metrics.inc("hh_api_cache_total", endpoint=route, result="revalidated")
+            self.cache.refresh(url, params)
+            return json.loads(cached.body)
         if response.status_code == 200:
-            data = response.json()
-            total_vacancies = data.get("found", 0)  # Общее количество вакансий
-            vacancies = data.get("items", [])
-            return total_vacancies, vacancies
-        return 0, []
\ No newline at end of file
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if self.cache is not None and self.cache.should_store(path, etag, last_modified):
+                self.cache.put(url, params, response.text, etag, last_modified)
+            return response.json()
+        return None
+
+    @classmethod
+    def _overloaded(cls, response: requests.Response) -> bool:
+        """Признак перегрузки API: ответ из RETRY_STATUSES, в том числе у повторов, выполненных urllib3."""
+        if response.status_code in cls.RETRY_STATUSES:
+            return True
+        retries = getattr(getattr(response, "raw", None), "retries", None)
+        if not isinstance(retries, Retry):
+            return False
+        return any(attempt.status in cls.RETRY_STATUSES for attempt in retries.history)
@@ -0,0 +1,230 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, NamedTuple, Optional
+from urllib.parse import urlencode, urlparse
+
+
+class CachedResponse(NamedTuple):
+    """Сохранённый ответ API."""
+
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+class ResponseCache:
+    """Постоянный кеш ответов API в файле SQLite.
+
+    Ключ — URL вместе с отсортированными параметрами запроса. Время жизни записи
+    задаётся по префиксу пути (ttls), устаревшие записи с ETag/Last-Modified
+    перепроверяются условным запросом. Размер тел ограничен отдельно для каждого
+    префикса из budgets и общим max_bytes для остальных путей: при превышении
+    удаляются давно не использованные записи (LRU) того же раздела, поэтому поток
+    страниц вакансий не вытесняет данные работодателей. В режиме offline клиент
+    обслуживается только из кеша, без обращения к сети.
+
+    Ответы путей с нулевым временем жизни без ETag/Last-Modified никогда не бывают
+    свежими и не могут быть перепроверены, поэтому сохраняются только в режиме record
+    (запись ответов для последующей работы offline).
+
+    Время последнего использования записей копится в памяти, а изменения фиксируются
+    пакетами по commit_every записей и при закрытии кеша: чтение из кеша не пишет
+    в файл, а запись ответа не ждёт сброса файла на диск.
+    """
+
+    DEFAULT_TTLS = {
+        "/employers/": 24 * 60 * 60,  # данные работодателей меняются редко
+        "/employers": 60 * 60,  # страницы поиска работодателей
+        "/dictionaries": 24 * 60 * 60,  # курсы валют обновляются раз в сутки
+        "/vacancies": 0  # страницы вакансий всегда перепроверяются
+    }
+    # Собственные пределы размера разделов; страницы вакансий многочисленны и почти не повторяются
+    DEFAULT_BUDGETS = {
+        "/vacancies": 50 * 1024 * 1024
+    }
+
+    def __init__(self, path: str, ttls: Optional[Dict[str, float]] = None, max_bytes: int = 100 * 1024 * 1024,
+                 offline: bool = False, budgets: Optional[Dict[str, int]] = None, record: bool = False,
+                 commit_every: int = 100):
+        """Открывает (или создаёт) файл кеша.
+
+        :param path: путь к файлу SQLite.
+        :param ttls: время жизни записей в секундах по префиксу пути; по умолчанию DEFAULT_TTLS.
+        :param max_bytes: предельный суммарный размер ответов по путям, не указанным в budgets.
+        :param offline: отдавать ответы только из кеша, не выполняя запросов.
+        :param budgets: предельный размер ответов по префиксу пути; по умолчанию DEFAULT_BUDGETS.
+        :param record: сохранять все ответы, в том числе не пригодные для повторного использования онлайн.
+        :param commit_every: число изменений, после которого транзакция фиксируется.
+        """
+        self.path = path
+        self.ttls = self.DEFAULT_TTLS if ttls is None else ttls
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.budgets = self.DEFAULT_BUDGETS if budgets is None else budgets
+        self.record = record
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                section TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+        if "section" not in columns:  # файл кеша, созданный до разделов
+            self._conn.execute("ALTER TABLE responses ADD COLUMN section TEXT NOT NULL DEFAULT ''")
+            for (key,) in self._conn.execute("SELECT key FROM responses").fetchall():
+                self._conn.execute("UPDATE responses SET section = ? WHERE key = ?", (self.section_for(key), key))
+        self._conn.execute("DROP INDEX IF EXISTS responses_accessed_at")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_section_accessed_at ON responses (section, accessed_at)"
+        )
+        self._conn.commit()
+        self._section_bytes: Dict[str, int] = dict(
+            self._conn.execute("SELECT section, SUM(size) FROM responses GROUP BY section").fetchall()
+        )
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Строит ключ записи по URL и параметрам запроса."""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def ttl_for(self, path: str) -> float:
+        """Возвращает время жизни записей для пути по самому длинному совпавшему префиксу."""
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+        if not matches:
+            return 0
+        return self.ttls[max(matches, key=len)]
+
+    def section_for(self, url: str) -> str:
+        """Раздел записи: самый длинный совпавший префикс из budgets или "" для общего раздела."""
+        path = urlparse(url).path
+        matches = [prefix for prefix in self.budgets if path.startswith(prefix)]
+        return max(matches, key=len) if matches else ""
+
+    def should_store(self, path: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """Проверяет, пригодится ли ответ: он может быть свежим, перепроверяется условным запросом или нужен offline."""
+        return self.record or bool(etag or last_modified) or self.ttl_for(path) > 0
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[CachedResponse]:
+        """Возвращает сохранённый ответ и отмечает его как недавно использованный."""
+        key = self.make_key(url, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+        return CachedResponse(*row)
+
+    def is_fresh(self, path: str, cached: CachedResponse) -> bool:
+        """Проверяет, не истекло ли время жизни записи."""
+        return time.time() - cached.stored_at < self.ttl_for(path)
+
+    @staticmethod
+    def conditional_headers(cached: CachedResponse) -> Dict[str, str]:
+        """Заголовки условного запроса для перепроверки записи."""
+        headers = {}
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def put(self, url: str, params: Optional[Dict[str, Any]], body: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> None:
+        """Сохраняет ответ и при необходимости вытесняет давно не использованные записи."""
+        key = self.make_key(url, params)
+        section = self.section_for(url)
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            previous = self._conn.execute("SELECT size, section FROM responses WHERE key = ?", (key,)).fetchone()
+            if previous:
+                self._section_bytes[previous[1]] -= previous[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now, now, size, section)
+            )
+            self._section_bytes[section] = self._section_bytes.get(section, 0) + size
+            self._evict(section)
+            self._changed()
+
+    def refresh(self, url: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Продлевает запись после ответа 304 Not Modified."""
+        now = time.time()
+        key = self.make_key(url, params)
+        with self._lock:
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key)
+            )
+            self._changed()
+
+    def clear(self) -> None:
+        """Удаляет все записи."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._uncommitted = 0
+            self._touched.clear()
+            self._section_bytes.clear()
+
+    def close(self) -> None:
+        """Сохраняет время использования записей и закрывает файл кеша."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+        self._conn.close()
+
+    @property
+    def total_bytes(self) -> int:
+        """Суммарный размер сохранённых ответов."""
+        return sum(self._section_bytes.values())
+
+    def _flush_touched(self) -> None:
+        """Записывает накопленное время использования записей (без фиксации транзакции)."""
+        if self._touched:
+            self._conn.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                   [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def _changed(self) -> None:
+        """Учитывает изменение и фиксирует транзакцию, когда накопилось commit_every изменений."""
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def _evict(self, section: str) -> None:
+        """Удаляет записи раздела в порядке давности использования, пока его размер превышает предел."""
+        limit = self.budgets.get(section, self.max_bytes) if section else self.max_bytes
+        while self._section_bytes.get(section, 0) > limit:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses WHERE section = ? ORDER BY accessed_at LIMIT 1", (section,)
+            ).fetchone()
+            if row is None:
+                self._section_bytes[section] = 0
+                return
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self._section_bytes[section] -= row[1]
@@ -0,0 +1,271 @@
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Границы интервалов гистограмм длительности, в секундах
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами: число наблюдений по интервалам, сумма, минимум и максимум."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последний интервал — больше всех границ (+Inf)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Добавляет наблюдение."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля по верхней границе интервала, в который он попадает."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сводка гистограммы для JSON-отчёта."""
+        return {"count": self.count, "sum": self.sum, "min": self.min if self.count else 0.0, "max": self.max,
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99),
+                "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts))}
+
+
+class Metrics:
+    """Реестр метрик: счётчики, текущие значения (gauge), гистограммы длительности и трассировка этапов.
+
+    Запись метрики — несколько операций со словарём под блокировкой, поэтому реестр
+    можно держать включённым постоянно. Метрики различаются именем и метками (labels).
+    Спаны (span) измеряют этапы обработки: длительность попадает в гистограмму
+    span_duration_seconds, а последние max_spans спанов с вложенностью — в трассу.
+    """
+
+    def __init__(self, max_spans: int = 1000):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelsKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelsKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelsKey], Histogram] = {}
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+        self._local = threading.local()
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """Увеличивает счётчик."""
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        """Устанавливает текущее значение показателя."""
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Добавляет наблюдение в гистограмму."""
+        if not self.enabled:
+            return
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Измеряет длительность блока и добавляет её в гистограмму name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+        """Спан этапа обработки; атрибуты можно дополнить внутри блока через возвращаемый словарь."""
+        if not self.enabled:
+            yield {}
+            return
+        stack = self._local.__dict__.setdefault("stack", [])
+        record = {"name": name, "parent": stack[-1]["name"] if stack else None, "thread": threading.get_ident(),
+                  "started_at": time.time(), "attributes": dict(attributes)}
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record["attributes"]
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            record["duration_seconds"] = duration
+            self.observe("span_duration_seconds", duration, span=name)
+            with self._lock:
+                self._spans.append(record)
+
+    def reset(self) -> None:
+        """Удаляет все накопленные метрики и спаны."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self._spans.clear()
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Текущее значение счётчика."""
+        with self._lock:
+            return self._counters.get((name, _labels_key(labels)), 0)
+
+    def gauge(self, name: str, **labels: Any) -> Optional[float]:
+        """Текущее значение показателя, если оно было установлено."""
+        with self._lock:
+            return self._gauges.get((name, _labels_key(labels)))
+
+    def histogram(self, name: str, **labels: Any) -> Optional[Histogram]:
+        """Гистограмма по имени и меткам, если в неё были наблюдения."""
+        with self._lock:
+            return self._histograms.get((name, _labels_key(labels)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-совместимый отчёт: счётчики, показатели, сводки гистограмм и трасса спанов."""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            gauges = [{"name": name, "labels": dict(labels), "value": value}
+                      for (name, labels), value in sorted(self._gauges.items())]
+            histograms = [{"name": name, "labels": dict(labels), **histogram.to_dict()}
+                          for (name, labels), histogram in sorted(self._histograms.items(), key=lambda i: i[0])]
+            spans = list(self._spans)
+        return {"generated_at": time.time(), "counters": counters, "gauges": gauges, "histograms": histograms,
+                "spans": spans}
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus (для node_exporter textfile collector)."""
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items(), key=lambda i: i[0])
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip([*map(str, histogram.buckets), "+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Сохраняет метрики: в формате Prometheus для файлов .prom, иначе JSON-отчётом."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+# Общий реестр процесса
+metrics = Metrics()
+
+
+def track_query(func: Callable) -> Callable:
+    """Декоратор метода DBManager: время выполнения и число строк запроса.
+
+    Для генераторов время и строки учитываются до исчерпания или закрытия генератора.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        if inspect.isgenerator(result):
+            return _track_iterator(name, result, start)
+        _record_query(name, start, len(result) if isinstance(result, list) else 1)
+        return result
+
+    return wrapper
+
+
+def endpoint(path: str) -> str:
+    """Шаблон пути API без идентификаторов (/employers/1740 → /employers/{id})."""
+    return re.sub(r"/\d+", "/{id}", path)
+
+
+def _track_iterator(name: str, iterator: Iterator, start: float) -> Iterator:
+    """Передаёт элементы генератора, подсчитывая их."""
+    rows = 0
+    try:
+        for item in iterator:
+            rows += 1
+            yield item
+    finally:
+        _record_query(name, start, rows)
+
+
+def _record_query(name: str, start: float, rows: int) -> None:
+    """Записывает длительность и число строк запроса."""
+    metrics.observe("db_query_duration_seconds", time.perf_counter() - start, query=name)
+    metrics.inc("db_query_rows_total", rows, query=name)
+
+
+def _labels_key(labels: Dict[str, Any]) -> LabelsKey:
+    """Неизменяемый ключ меток."""
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelsKey) -> str:
+    """Метки в синтаксисе Prometheus."""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
@@ -0,0 +1,197 @@
+import os
+import queue
+import threading
+import time
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from src.data_processor import (EMPLOYER_COLUMNS, VACANCY_COLUMNS, JsonArrayWriter, archive_missing_vacancies,
+                                bump_data_generation, employer_row, load_employers, load_stats,
+                                refresh_employer_summary, save_to_json, update_currency_rates, vacancy_bulk_loader,
+                                vacancy_row)
+from src.crawler import PartitionedCrawler
+from src.db_pool import connection
+from src.hh_api import HhApi
+from src.metrics import metrics
+from src.records import Employer
+from src.snapshot import SnapshotWriter, is_compact_snapshot, write_snapshot
+
+_DONE = object()
+
+
+def run_pipeline(
+        db_params: Dict[str, str],
+        hh_api: HhApi,
+        employer_ids: List[str],
+        companies_path: str,
+        vacancies_path: str,
+        chunk_size: int = 1000,
+        queue_size: int = 4,
+        incremental: bool = False,
+        partition: bool = False,
+        employers: Optional[List[Union[Dict[str, Any], Employer]]] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, int], Dict[str, float]]:
+    """Потоково загружает вакансии из API в БД и в файл снапшота.
+
+    Фоновый поток получает страницы вакансий и кладёт их в очередь размером queue_size;
+    когда загрузка в БД отстаёт, очередь заполняется и поток ждёт (обратное давление).
+    Основной поток извлекает поля, сразу дописывает вакансии в снапшот и передаёт строки
+    в БД пачками по chunk_size, поэтому в памяти одновременно находится не больше
+    queue_size страниц и одной пачки. Все данные фиксируются одной транзакцией; снапшоты
+    заменяют прежние только после её фиксации, поэтому при сбое остаются предыдущие.
+
+    Снапшоты с расширением .ndjson, .ndjson.gz или .ndjson.zst пишутся в компактном
+    формате (см. src.snapshot) — только сохраняемые в БД поля; иначе — JSON-массивом
+    исходных ответов API. Для компактного снапшота ответы API сразу при разборе
+    превращаются в записи Employer и Vacancy (src.records), и дальше по конвейеру
+    идут только они.
+
+    При incremental=True вакансии полностью загруженных работодателей, которых не было
+    в ответе API, помечаются архивными (см. archive_missing_vacancies). В конце
+    пересчитывается сводка employer_summary загруженных работодателей.
+
+    При partition=True вакансии работодателей, не помещающихся в выдачу поиска hh.ru
+    (2000 результатов), загружаются по срезам дат публикации (см. PartitionedCrawler);
+    работодатель считается загруженным полностью, если все срезы поместились в выдачу.
+
+    Перед загрузкой вакансий курсы валют в currency_rates обновляются из справочника
+    hh.ru: по ним вычисляется зарплата в рублях salary_rub.
+
+    employers — уже полученные данные работодателей employer_ids (например, из
+    HhApi.discover_employers): тогда запросы /employers/{id} не выполняются. Для JSON-снапшота
+    работодателей нужны ответы API, для компактного подходят и записи Employer.
+
+    Возвращает работодателей, словарь {employer_id: found} и статистику загрузки.
+    """
+    start = time.perf_counter()
+    with metrics.span("pipeline", employers=len(employer_ids), incremental=incremental) as span:
+        compact_companies = is_compact_snapshot(companies_path)
+        if employers is None:
+            with metrics.span("fetch_employers"):
+                employers = hh_api.get_employers(employer_ids, records=compact_companies)
+        elif compact_companies:
+            employers = [employer_row(emp) for emp in employers]
+        compact = is_compact_snapshot(vacancies_path)
+        # Снапшоты пишутся во временные файлы и заменяют прежние только после фиксации транзакции
+        companies_temp, vacancies_temp = _temp_path(companies_path), _temp_path(vacancies_path)
+
+        employer_vacancy_counts = {}
+        complete_employers = []
+        pages = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        crawler = PartitionedCrawler(hh_api) if partition else None
+        producer = threading.Thread(
+            target=_produce_pages,
+            args=(hh_api, employer_ids, employer_vacancy_counts, complete_employers, pages, stop, compact, crawler),
+            daemon=True
+        )
+
+        try:
+            with metrics.span("write_companies_snapshot"):
+                if compact_companies:
+                    write_snapshot(companies_temp, "employers", EMPLOYER_COLUMNS, map(employer_row, employers))
+                else:
+                    save_to_json(employers, companies_temp)
+            with connection(db_params) as conn, conn.cursor() as cursor:
+                with metrics.span("load_employers"):
+                    employers_count = load_employers(cursor, employers, chunk_size)
+                with metrics.span("update_currency_rates"):
+                    update_currency_rates(cursor, hh_api.get_currency_rates())
+                vacancy_loader = vacancy_bulk_loader(cursor, chunk_size, track_seen=incremental)
+                producer.start()
+                snapshot_writer = SnapshotWriter(vacancies_temp, "vacancies", VACANCY_COLUMNS) if compact \
+                    else JsonArrayWriter(vacancies_temp)
+                with metrics.span("stream_vacancies"), snapshot_writer as snapshot:
+                    chunk = []
+                    while True:
+                        # Долгое ожидание очереди означает, что узкое место — загрузка из API
+                        with metrics.timer("pipeline_queue_wait_seconds"):
+                            items = pages.get()
+                        if items is _DONE:
+                            break
+                        if isinstance(items, BaseException):
+                            raise items
+                        with metrics.timer("pipeline_serialize_seconds"):
+                            for vac in items:
+                                row = vacancy_row(vac)
+                                snapshot.write(row if compact else vac)
+                                chunk.append(row)
+                        if len(chunk) >= chunk_size:
+                            _flush(vacancy_loader, chunk)
+                            chunk = []
+                    _flush(vacancy_loader, chunk)
+                with metrics.span("archive"):
+                    archived = archive_missing_vacancies(cursor, complete_employers) if incremental else 0
+                refresh_employer_summary(cursor, employer_ids, employer_vacancy_counts)
+                bump_data_generation(cursor)
+            os.replace(companies_temp, companies_path)
+            os.replace(vacancies_temp, vacancies_path)
+        finally:
+            stop.set()
+            for path in (companies_temp, vacancies_temp):
+                if os.path.exists(path):  # загрузка не удалась: прежние снапшоты остаются на месте
+                    os.remove(path)
+        span.update(vacancies=vacancy_loader.count, archived=archived)
+
+    stats = load_stats(employers_count, vacancy_loader.count, time.perf_counter() - start)
+    stats["archived"] = archived
+    return employers, employer_vacancy_counts, stats
+
+
+def _temp_path(path: str) -> str:
+    """Временный файл рядом со снапшотом; расширение сохраняется, чтобы формат определялся так же."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".tmp-{name}")
+
+
+def _flush(vacancy_loader, chunk: List[Tuple]) -> None:
+    """Передаёт накопленную пачку строк в БД."""
+    if chunk:
+        with metrics.timer("pipeline_flush_seconds"):
+            vacancy_loader.copy(chunk)
+            vacancy_loader.merge()
+
+
+def _produce_pages(hh_api: HhApi, employer_ids: List[str], employer_vacancy_counts: Dict[str, int],
+                   complete_employers: List[str], pages: queue.Queue, stop: threading.Event,
+                   records: bool = False, crawler: Optional[PartitionedCrawler] = None) -> None:
+    """Получает страницы вакансий и кладёт списки вакансий (записей Vacancy при records) в очередь.
+
+    Работодатель считается загруженным полностью, если получены все его страницы и
+    API не обрезал выдачу (found помещается в pages * PER_PAGE), а при обходе краулером —
+    если все срезы загружены целиком.
+    """
+    try:
+        for emp_id in employer_ids:
+            if crawler is not None:
+                coverage = {}
+                for page in crawler.iter_pages(emp_id, records, coverage):
+                    employer_vacancy_counts[emp_id] = page["found"]
+                    if not _put(pages, page["items"], stop):
+                        return
+                if coverage.get("complete"):
+                    complete_employers.append(emp_id)
+                continue
+            received = expected = 0
+            for page in hh_api.iter_vacancy_pages(emp_id, all_pages=True, records=records):
+                if not received:
+                    expected = page.get("pages", 1)
+                received += 1
+                employer_vacancy_counts[emp_id] = page.get("found", 0)
+                if not _put(pages, page.get("items", []), stop):
+                    return
+            if received and received >= expected and employer_vacancy_counts[emp_id] <= expected * hh_api.PER_PAGE:
+                complete_employers.append(emp_id)
+        _put(pages, _DONE, stop)
+    except Exception as e:
+        _put(pages, e, stop)
+
+
+def _put(pages: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Кладёт элемент в очередь, ожидая свободного места; False, если потребитель остановился."""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
@@ -0,0 +1,69 @@
+import time
+from typing import Dict, Iterator, Tuple
+
+from src.data_processor import (EMPLOYER_COLUMNS, VACANCY_COLUMNS, bump_data_generation, employer_row,
+                                load_employer_rows, load_stats, refresh_employer_summary, vacancy_bulk_loader,
+                                vacancy_row)
+from src.db_pool import connection
+from src.metrics import metrics
+from src.snapshot import check_snapshot, is_compact_snapshot, iter_json_array, read_snapshot
+
+
+def replay_snapshots(
+        db_params: Dict[str, str],
+        companies_path: str,
+        vacancies_path: str,
+        batch_size: int = 5000
+) -> Tuple[Dict[str, int], Dict[str, float]]:
+    """Восстанавливает БД из сохранённых снапшотов без обращения к hh.ru.
+
+    Поддерживаются компактные снапшоты (src.snapshot) и JSON-массивы исходных ответов
+    API. Оба снапшота проверяются до обращения к БД. Прежние данные удаляются (TRUNCATE)
+    в той же транзакции, в которой файлы потоково передаются в БД пакетным загрузчиком
+    обычной загрузки, поэтому при ошибке чтения снапшота остаются прежние данные. Затем
+    пересчитывается сводка employer_summary (found — число вакансий работодателя в снапшоте).
+    Схема, курсы валют и состояние загрузки сохраняются.
+
+    Возвращает словарь {employer_id: число вакансий в снапшоте} и статистику загрузки.
+    """
+    start = time.perf_counter()
+    check_snapshot(companies_path, "employers")
+    check_snapshot(vacancies_path, "vacancies")
+    employer_ids = []
+    employer_vacancy_counts = {}
+    with metrics.span("replay"), connection(db_params) as conn, conn.cursor() as cursor:
+        # БД пересобирается ровно по снапшотам; TRUNCATE откатывается вместе с неудачной загрузкой
+        cursor.execute("TRUNCATE employer_summary, vacancies, employers")
+        employers_count = load_employer_rows(
+            cursor, _collect_ids(_snapshot_rows(companies_path, "employers"), employer_ids), batch_size
+        )
+        vacancy_loader = vacancy_bulk_loader(cursor, batch_size)
+        vacancy_loader.copy(_count_by_employer(_snapshot_rows(vacancies_path, "vacancies"), employer_vacancy_counts))
+        vacancy_loader.merge()
+        # found из API в снапшотах не хранится: число вакансий снапшота — лучшая оценка
+        refresh_employer_summary(cursor, employer_ids, employer_vacancy_counts)
+        bump_data_generation(cursor)
+
+    return employer_vacancy_counts, load_stats(employers_count, vacancy_loader.count, time.perf_counter() - start)
+
+
+def _snapshot_rows(path: str, kind: str) -> Iterator[Tuple]:
+    """Строки таблицы из снапшота любого поддерживаемого формата."""
+    if is_compact_snapshot(path):
+        # Снапшоты прежних версий могут не содержать новых столбцов (например, currency и gross)
+        return read_snapshot(path, kind=kind, columns=EMPLOYER_COLUMNS if kind == "employers" else VACANCY_COLUMNS)
+    return map(employer_row if kind == "employers" else vacancy_row, iter_json_array(path))
+
+
+def _collect_ids(rows: Iterator[Tuple], ids: list) -> Iterator[Tuple]:
+    """Пропускает строки работодателей, запоминая их идентификаторы."""
+    for row in rows:
+        ids.append(row[0])
+        yield row
+
+
+def _count_by_employer(rows: Iterator[Tuple], counts: Dict[str, int]) -> Iterator[Tuple]:
+    """Пропускает строки вакансий, подсчитывая их по работодателям."""
+    for row in rows:
+        counts[row[1]] = counts.get(row[1], 0) + 1
+        yield row
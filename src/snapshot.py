@@ -0,0 +1,186 @@
+import gzip
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # сжатие zstd необязательно
+    zstandard = None
+
+SNAPSHOT_FORMAT = "hh-snapshot"
+SNAPSHOT_VERSION = 1
+COMPACT_SUFFIXES = (".ndjson", ".ndjson.gz", ".ndjson.zst")
+
+
+def is_compact_snapshot(path: str) -> bool:
+    """Проверяет, что путь указывает на компактный снапшот (NDJSON, возможно сжатый)."""
+    return path.endswith(COMPACT_SUFFIXES)
+
+
+def _open_text(path: str, mode: str):
+    """Открывает файл снапшота как текст, сжатие выбирается по расширению (.gz, .zst)."""
+    if path.endswith(".gz"):
+        # Уровень 6 заметно быстрее максимального при почти том же размере
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise ImportError("Для снапшотов .zst установите пакет zstandard")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class SnapshotWriter:
+    """Потоковая запись компактного снапшота.
+
+    Первая строка — заголовок с типом данных и списком столбцов, далее по строке на
+    запись: JSON-массив значений в порядке столбцов, без отступов и лишних полей ответа
+    API. Строки пишутся по мере поступления, поэтому память не зависит от размера снапшота.
+    """
+
+    def __init__(self, path: str, kind: str, columns: Tuple[str, ...]):
+        self.path = path
+        self.kind = kind
+        self.columns = columns
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "SnapshotWriter":
+        self._file = _open_text(self.path, "w")
+        header = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, "kind": self.kind,
+                  "columns": list(self.columns)}
+        self._file.write(json.dumps(header, ensure_ascii=False) + "\n")
+        return self
+
+    def write(self, row: Tuple) -> None:
+        """Дописывает строку."""
+        self._file.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def write_many(self, rows: Iterable[Tuple]) -> int:
+        """Дописывает строки, возвращает их число."""
+        before = self.count
+        for row in rows:
+            self.write(row)
+        return self.count - before
+
+    def __exit__(self, *exc) -> None:
+        self._file.close()
+
+
+class SnapshotReader:
+    """Ленивое чтение компактного снапшота: строки читаются и разбираются по одной."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open_text(path, "r")
+        try:
+            header = json.loads(self._file.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+            self._file.close()
+            raise ValueError(f"Файл {path} не является снапшотом {SNAPSHOT_FORMAT}")
+        if header.get("version") != SNAPSHOT_VERSION:
+            self._file.close()
+            raise ValueError(f"Неподдерживаемая версия снапшота {header.get('version')} в {path}")
+        self.kind: str = header["kind"]
+        self.columns: Tuple[str, ...] = tuple(header["columns"])
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for line in self._file:
+            if line.strip():
+                yield tuple(json.loads(line))
+
+    def dicts(self) -> Iterator[Dict[str, Any]]:
+        """Строки снапшота в виде словарей {столбец: значение}."""
+        for row in self:
+            yield dict(zip(self.columns, row))
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        self._file.close()
+
+    def __enter__(self) -> "SnapshotReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_snapshot(path: str, kind: str, columns: Tuple[str, ...], rows: Iterable[Tuple]) -> int:
+    """Записывает строки в компактный снапшот, возвращает их число."""
+    with SnapshotWriter(path, kind, columns) as writer:
+        return writer.write_many(rows)
+
+
+def read_snapshot(path: str, kind: Optional[str] = None,
+                  columns: Optional[Tuple[str, ...]] = None) -> Iterator[Tuple]:
+    """Лениво читает строки компактного снапшота, при kind проверяя тип данных.
+
+    При columns строки приводятся к этому порядку столбцов: так читаются снапшоты,
+    записанные с другим набором столбцов; отсутствующие в снапшоте столбцы — None.
+    """
+    with SnapshotReader(path) as reader:
+        _check_kind(reader, kind)
+        if columns is None or tuple(columns) == reader.columns:
+            yield from reader
+            return
+        positions = [reader.columns.index(column) if column in reader.columns else None for column in columns]
+        for row in reader:
+            yield tuple(None if position is None else row[position] for position in positions)
+
+
+def check_snapshot(path: str, kind: Optional[str] = None) -> None:
+    """Проверяет, что файл — компактный снапшот (при kind — нужного типа данных) или JSON-массив.
+
+    Читается только начало файла, поэтому ошибки пути и формата обнаруживаются до загрузки.
+    """
+    if is_compact_snapshot(path):
+        with SnapshotReader(path) as reader:
+            _check_kind(reader, kind)
+        return
+    with _open_text(path, "r") as f:
+        if not f.read(1 << 16).lstrip().startswith("["):
+            raise ValueError(f"Файл {path} не является JSON-массивом")
+
+
+def _check_kind(reader: SnapshotReader, kind: Optional[str]) -> None:
+    """Проверяет тип данных открытого снапшота."""
+    if kind is not None and reader.kind != kind:
+        raise ValueError(f"Снапшот {reader.path} содержит {reader.kind}, ожидались {kind}")
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Лениво читает элементы JSON-массива верхнего уровня (снапшоты save_to_json и JsonArrayWriter).
+
+    Файл читается блоками по chunk_size символов, в памяти держится только текущий
+    элемент и непрочитанный остаток блока.
+    """
+    decoder = json.JSONDecoder()
+    with _open_text(path, "r") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"Файл {path} не является JSON-массивом")
+        position = 1
+        eof = False
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer):
+                if buffer[position] == "]":
+                    return
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    end = None
+                # Элемент, упирающийся в конец блока, мог быть обрезан — тогда дочитываем файл
+                if end is not None and (end < len(buffer) or eof):
+                    yield item
+                    position = end
+                    continue
+            if eof:
+                raise ValueError(f"Файл {path} не является корректным JSON-массивом")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from src import db_pool
+
+
+@pytest.fixture(autouse=True)
+def reset_db_pools():
+    """Закрывает общие пулы соединений после каждого теста, чтобы моки не переиспользовались."""
+    yield
+    db_pool.close_all()
+
+
+@pytest.fixture
+def mock_conn(mocker):
+    """Фикстура с замоканным соединением, которое выдаёт пул."""
+    conn = mocker.MagicMock()
+    conn.closed = 0
+    mocker.patch("psycopg2.connect", return_value=conn)
+    return conn
+
+
+@pytest.fixture
+def mock_cursor(mock_conn):
+    """Фикстура с курсором замоканного соединения."""
+    return mock_conn.cursor.return_value.__enter__.return_value
+
+
+@pytest.fixture
+def mock_db_params():
+    """Фикстура с тестовыми параметрами подключения к БД."""
+    return {
+        "dbname": "test_db",
+        "user": "postgres",
+        "password": "test_pass",
+        "host": "localhost",
+        "port": "5432"
+    }
+
+
+@pytest.fixture
+def make_response(mocker):
+    """Фабрика моков ответа requests: тело — JSON из data или готовый текст text."""
+    def factory(status_code, data=None, text=None, headers=None):
+        if text is None:
+            text = "" if data is None else json.dumps(data, ensure_ascii=False)
+        response = mocker.Mock(status_code=status_code)
+        response.text = text
+        response.content = text.encode("utf-8")
+        response.headers = headers or {}
+        response.json.side_effect = lambda: json.loads(text)
+        return response
+
+    return factory
@@ -0,0 +1,58 @@
+import json
+
+from benchmarks import synthetic
+from benchmarks.compare import compare
+from benchmarks.stand_in import HhStandIn
+from src.hh_api import HhApi
+
+
+def test_synthetic_dataset():
+    """Тест детерминированного синтетического набора с делением по работодателям."""
+    vacancies = list(synthetic.vacancies(4500))
+
+    assert len(vacancies) == 4500
+    assert len({vac["id"] for vac in vacancies}) == 4500
+    assert synthetic.employer_ids(4500) == ["100000", "100001", "100002"]
+    assert synthetic.found_counts(4500) == {"100000": 2000, "100001": 2000, "100002": 500}
+    assert vacancies[10] == synthetic.vacancy("100000", 10)
+    assert any(vac["salary"] is None for vac in vacancies)
+
+
+def test_stand_in_serves_hh_api():
+    """Тест заглушки API: постраничная выдача и ответы 429, которые клиент повторяет."""
+    with HhStandIn(250, per_employer=200, error_rate=0.3, seed=1) as stand_in:
+        api = HhApi(base_url=stand_in.url, backoff_factor=0, max_retries=10)
+
+        employers = api.get_employers(["100000", "999"])
+        found, vacancies = api.get_vacancies("100001", all_pages=True)
+        api.close()
+
+    assert [emp["id"] for emp in employers] == ["100000"]
+    assert found == 50
+    assert [vac["id"] for vac in vacancies] == [f"100001{i:06d}" for i in range(50)]
+    assert stand_in.throttled > 0
+
+
+def test_stand_in_search_cap():
+    """Тест ограничения выдачи 2000 результатами, как у hh.ru."""
+    stand_in = HhStandIn(5000, per_employer=5000)
+
+    status, data = stand_in.route("/vacancies?employer_id=100000&page=0&per_page=100")
+    assert status == 200
+    assert data["found"] == 5000
+    assert data["pages"] == 20
+    assert stand_in.route("/vacancies?employer_id=100000&page=20&per_page=100")[0] == 400
+    stand_in.server.server_close()
+
+
+def test_compare_results():
+    """Тест сравнения результатов двух прогонов."""
+    baseline = {("load_to_db", "", 1000): {"items_per_sec": 100.0, "peak_rss_kb": 1000}}
+    current = {("load_to_db", "", 1000): {"items_per_sec": 200.0, "peak_rss_kb": 1500}}
+
+    rows = {row["metric"]: row for row in compare(baseline, current)}
+
+    assert rows["items_per_sec"]["ratio"] == 2.0
+    assert rows["items_per_sec"]["improved"]
+    assert not rows["peak_rss_kb"]["improved"]
+    assert json.dumps(rows)  # результаты сериализуются для сохранения
@@ -0,0 +1,63 @@
+import math
+
+import pytest
+from src.columnar import ColumnarVacancies
+
+ROWS = [
+    ("1", "Яндекс", "Python-разработчик", 100000, 150000, "https://hh.ru/vacancy/1", 87000),
+    ("2", "СБЕР", "Аналитик", None, None, "https://hh.ru/vacancy/2", None),
+    ("3", "Яндекс", "Senior Python Developer (python)", None, 3000, "https://hh.ru/vacancy/3", 240000),
+    ("4", "СБЕР", "Тестировщик", 60000, None, "https://hh.ru/vacancy/4", 60000)
+]
+
+
+@pytest.fixture
+def columnar():
+    """Фикстура со снимком из тестовых строк."""
+    return ColumnarVacancies(ROWS)
+
+
+def test_columns(columnar):
+    """Тест колоночного хранения: названия компаний хранятся один раз, зарплаты — в массивах."""
+    assert len(columnar) == 4
+    assert columnar.companies == ["Яндекс", "СБЕР"]
+    assert list(columnar.company_index) == [0, 1, 0, 1]
+    assert math.isnan(columnar.salary_rub[1])
+
+
+def test_avg_salary(columnar):
+    """Тест средней зарплаты: вакансии без salary_rub не учитываются."""
+    assert columnar.get_avg_salary() == pytest.approx((87000 + 240000 + 60000) / 3)
+    assert ColumnarVacancies([]).get_avg_salary() == 0.0
+
+
+def test_vacancies_with_higher_salary(columnar):
+    """Тест отбора вакансий с зарплатой выше средней в виде результатов DBManager."""
+    assert columnar.get_vacancies_with_higher_salary() == [
+        {"company": "Яндекс", "vacancy": "Senior Python Developer (python)", "salary_from": None, "salary_to": 3000,
+         "url": "https://hh.ru/vacancy/3"}
+    ]
+    assert [vac["url"][-1] for vac in columnar.get_vacancies_with_salary_above(60000)] == ["1", "3"]
+
+
+def test_vacancies_with_keyword(columnar):
+    """Тест поиска по подстроке без учёта регистра: каждая вакансия попадает в результат один раз."""
+    assert [vac["url"][-1] for vac in columnar.get_vacancies_with_keyword("PYTHON")] == ["1", "3"]
+    assert [vac["url"][-1] for vac in columnar.get_vacancies_with_keyword("python", limit=1)] == ["1"]
+    assert columnar.get_vacancies_with_keyword("аналитик")[0]["salary_from"] is None
+    assert columnar.get_vacancies_with_keyword("r\nа") == []
+    assert columnar.get_vacancies_with_keyword("Java") == []
+    assert len(columnar.get_vacancies_with_keyword("")) == 4
+
+
+def test_load(mock_db_params, mock_conn):
+    """Тест построения снимка из БД серверным курсором."""
+    cursor = mock_conn.cursor.return_value.__enter__.return_value
+    cursor.__iter__.return_value = iter(ROWS)
+
+    columnar = ColumnarVacancies.load(mock_db_params, batch_size=500)
+
+    assert len(columnar) == 4
+    assert cursor.itersize == 500
+    cursor.execute.assert_called_once_with(ColumnarVacancies.QUERY)
+    assert mock_conn.cursor.call_args.kwargs["name"].startswith("columnar_")
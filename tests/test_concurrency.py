@@ -0,0 +1,110 @@
+import threading
+import time
+
+from src.concurrency import AdaptiveLimiter
+
+
+def test_limit_grows_while_healthy():
+    """Тест аддитивного роста лимита при успешных ответах со стабильной задержкой."""
+    limiter = AdaptiveLimiter(max_limit=8, initial_limit=2)
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(0.01)
+
+    assert 4 <= limiter.limit <= 5
+    assert limiter.stats()["requests"] == 10
+
+
+def test_limit_does_not_exceed_bounds():
+    """Тест, что лимит остаётся в пределах [min_limit, max_limit]."""
+    limiter = AdaptiveLimiter(max_limit=3, min_limit=2, initial_limit=3)
+
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 3
+
+    for _ in range(5):
+        limiter.acquire()
+        limiter._last_decrease = 0.0  # каждое снижение — в новом круге
+        limiter.release(0.01, overloaded=True)
+    assert limiter.limit == 2
+
+
+def test_overload_halves_limit_once_per_round_trip():
+    """Тест мультипликативного снижения: пачка 429 из одного круга снижает лимит один раз."""
+    limiter = AdaptiveLimiter(max_limit=16, initial_limit=16)
+
+    for _ in range(8):
+        limiter.acquire()
+    for _ in range(8):
+        limiter.release(10.0, overloaded=True)
+
+    assert limiter.limit == 8
+    assert limiter.stats()["overloaded"] == 8
+
+
+def test_slow_responses_stop_growth():
+    """Тест: задержка выше latency_tolerance от минимальной не увеличивает лимит."""
+    limiter = AdaptiveLimiter(max_limit=8, initial_limit=2, latency_tolerance=2.0)
+    limiter.acquire()
+    limiter.release(0.01)
+    grown = limiter.limit
+
+    limiter.acquire()
+    limiter.release(0.05)
+
+    assert limiter.limit == grown
+
+
+def test_single_fast_response_does_not_block_growth():
+    """Тест: базовая задержка скользящая, единичный быстрый ответ не останавливает рост навсегда."""
+    limiter = AdaptiveLimiter(max_limit=16, initial_limit=8, baseline_window=20)
+    limiter.acquire()
+    limiter.release(0.03)
+
+    for _ in range(500):
+        limiter.acquire()
+        limiter.release(0.2)
+
+    assert limiter.limit == 16
+
+
+def test_growth_resumes_after_overload():
+    """Тест: после перегрузки лимит снова растёт при здоровых ответах."""
+    limiter = AdaptiveLimiter(max_limit=16, initial_limit=16)
+    limiter.acquire()
+    limiter.release(0.03)  # например, быстрый ответ /dictionaries
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(0.2)
+    limiter.acquire()
+    limiter.release(0.2, overloaded=True)
+    assert limiter.limit == 8
+
+    for _ in range(200):
+        limiter.acquire()
+        limiter.release(0.2)
+
+    assert limiter.limit == 16
+
+
+def test_in_flight_limited():
+    """Тест, что одновременно выполняется не больше limit запросов."""
+    limiter = AdaptiveLimiter(max_limit=2, initial_limit=2, increase=0)
+
+    def request():
+        with limiter.slot():
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = limiter.stats()
+    assert stats["peak_in_flight"] == 2
+    assert stats["requests"] == 6
+    assert stats["rate"] > 0
@@ -78,4 +78,52 @@ def test_config_partial_env_vars(monkeypatch):
         "password": "custom_pass",
         "host": "localhost",
         "port": "5432"
-    }
\ No newline at end of file
+    }
+
+def test_config_sync_mode(monkeypatch):
+    """Тест режима синхронизации по умолчанию и из переменной окружения."""
+    monkeypatch.setenv("DB_PASSWORD", "test_pass")
+    monkeypatch.delenv("SYNC_MODE", raising=False)
+    assert Config().sync_mode == "incremental"
+
+    monkeypatch.setenv("SYNC_MODE", "full")
+    assert Config().sync_mode == "full"
+
+
+def test_config_invalid_sync_mode(monkeypatch):
+    """Тест выброса исключения при неизвестном режиме синхронизации."""
+    monkeypatch.setenv("DB_PASSWORD", "test_pass")
+    monkeypatch.setenv("SYNC_MODE", "weekly")
+
+    with pytest.raises(ValueError, match="SYNC_MODE"):
+        Config()
+
+
+def test_config_offline(monkeypatch):
+    """Тест включения офлайн-режима API."""
+    monkeypatch.setenv("DB_PASSWORD", "test_pass")
+    monkeypatch.delenv("HH_OFFLINE", raising=False)
+    assert Config().hh_offline is False
+
+    monkeypatch.setenv("HH_OFFLINE", "1")
+    assert Config().hh_offline is True
+
+
+def test_config_record(monkeypatch):
+    """Тест включения записи всех ответов API в кеш."""
+    monkeypatch.setenv("DB_PASSWORD", "test_pass")
+    monkeypatch.delenv("HH_RECORD", raising=False)
+    assert Config().hh_record is False
+
+    monkeypatch.setenv("HH_RECORD", "1")
+    assert Config().hh_record is True
+
+
+def test_config_max_data_age(monkeypatch):
+    """Тест допустимого возраста данных: по умолчанию 6 часов."""
+    monkeypatch.setenv("DB_PASSWORD", "test_pass")
+    monkeypatch.delenv("MAX_DATA_AGE", raising=False)
+    assert Config().max_data_age == 6 * 60 * 60
+
+    monkeypatch.setenv("MAX_DATA_AGE", "0")
+    assert Config().max_data_age == 0
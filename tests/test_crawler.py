@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from src.crawler import PartitionedCrawler
+from src.records import vacancy_row
+
+
+class FakeSearch:
+    """Поиск вакансий одного работодателя с пределом выдачи, как у /vacancies."""
+
+    PER_PAGE = 10
+    max_workers = 4
+
+    def __init__(self, published, max_results=50, fail_pages=()):
+        self.vacancies = [
+            {"id": str(i), "employer": {"id": "1740"}, "name": f"Вакансия {i}", "salary": None,
+             "alternate_url": f"https://hh.ru/vacancy/{i}", "published": at}
+            for i, at in enumerate(published)
+        ]
+        self.max_results = max_results
+        self.fail_pages = fail_pages
+        self.requests = []
+
+    def _get_vacancies_page(self, employer_id, page, records=False, filters=None):
+        self.requests.append((page, filters))
+        if (page, filters) in self.fail_pages:
+            return None
+        matched = self.vacancies
+        if filters:
+            end = datetime.strptime(filters["date_to"], "%Y-%m-%dT%H:%M:%S%z")
+            matched = [vac for vac in matched if vac["published"] <= end]  # границы включаются
+            if "date_from" in filters:
+                start = datetime.strptime(filters["date_from"], "%Y-%m-%dT%H:%M:%S%z")
+                matched = [vac for vac in matched if start <= vac["published"]]
+        visible = matched[:self.max_results]
+        items = visible[page * self.PER_PAGE:(page + 1) * self.PER_PAGE]
+        return {"found": len(matched), "pages": -(-len(visible) // self.PER_PAGE),
+                "items": [vacancy_row(vac) for vac in items] if records else items}
+
+
+@pytest.fixture
+def now():
+    """Фикстура с текущим моментом без долей секунды."""
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def test_crawl_within_cap(now):
+    """Тест, что работодатель, помещающийся в выдачу, загружается без фильтров по датам."""
+    search = FakeSearch([now - timedelta(hours=i) for i in range(25)])
+
+    found, vacancies, coverage = PartitionedCrawler(search, max_results=50).crawl("1740")
+
+    assert found == 25
+    assert sorted(int(vac["id"]) for vac in vacancies) == list(range(25))
+    assert all(filters is None for _, filters in search.requests)
+    assert len(search.requests) == 3
+    assert coverage["splits"] == 0
+    assert coverage["complete"] is True
+    assert coverage["ratio"] == 1.0
+
+
+def test_crawl_partitions_by_publication_date(now):
+    """Тест обхода сверх предела выдачи: срезы делятся по датам, повторы на границах отбрасываются."""
+    # Каждый час по 3 вакансии, опубликованные в одну секунду: границы окон попадают в два среза
+    published = [now - timedelta(hours=i) for i in range(1, 100) for _ in range(3)]
+    search = FakeSearch(published, max_results=50)
+
+    found, vacancies, coverage = PartitionedCrawler(search, max_results=50).crawl("1740", records=True)
+
+    assert found == len(published)
+    assert sorted(int(vac.vacancy_id) for vac in vacancies) == list(range(len(published)))
+    assert coverage["vacancies"] == len(published)
+    assert coverage["splits"] > 0
+    assert coverage["ratio"] == 1.0
+    assert coverage["complete"] is True
+    assert max(page for page, _ in search.requests) < 5  # глубже предела выдачи страницы не запрашиваются
+
+
+def test_crawl_covers_vacancies_older_than_window(now):
+    """Тест, что вакансии старше окна дат загружаются открытым слева срезом."""
+    published = [now - timedelta(hours=i) for i in range(59)] + [now - timedelta(days=45)] * 10
+    search = FakeSearch(published, max_results=50)
+
+    found, vacancies, coverage = PartitionedCrawler(search, max_results=50).crawl("1740")
+
+    assert found == 69
+    assert sorted(int(vac["id"]) for vac in vacancies) == list(range(69))
+    assert coverage["ratio"] == 1.0
+    assert coverage["complete"] is True
+    assert any(filters and "date_from" not in filters for _, filters in search.requests)
+
+
+def test_crawl_incomplete_when_vacancies_missing(now):
+    """Тест, что обход не считается полным, если получено меньше found вакансий."""
+    search = FakeSearch([now - timedelta(hours=i) for i in range(25)])
+    original = search._get_vacancies_page
+
+    def hide_last(employer_id, page, records=False, filters=None):
+        data = original(employer_id, page, records, filters)
+        if page == 2:
+            data["items"] = data["items"][:2]  # вакансии сняты с публикации во время обхода
+        return data
+
+    search._get_vacancies_page = hide_last
+
+    _, vacancies, coverage = PartitionedCrawler(search, max_results=50).crawl("1740")
+
+    assert len(vacancies) == 22
+    assert coverage["complete"] is False
+
+
+def test_crawl_reports_truncated_slices(now):
+    """Тест покрытия, когда вакансии одной минуты не помещаются в выдачу."""
+    published = [now - timedelta(days=1)] * 80 + [now - timedelta(days=2)] * 10
+    search = FakeSearch(published, max_results=50)
+
+    found, vacancies, coverage = PartitionedCrawler(search, max_results=50).crawl("1740")
+
+    assert found == 90
+    assert len(vacancies) == 60
+    assert coverage["truncated"] == 1
+    assert coverage["ratio"] == pytest.approx(60 / 90)
+    assert coverage["complete"] is False
+
+
+def test_crawl_failed_page(now):
+    """Тест, что неуспешная страница пропускается и отмечается в покрытии."""
+    search = FakeSearch([now - timedelta(hours=i) for i in range(25)], fail_pages=[(1, None)])
+
+    found, vacancies, coverage = PartitionedCrawler(search, max_results=50).crawl("1740")
+
+    assert len(vacancies) == 15
+    assert coverage["failed_pages"] == 1
+    assert coverage["complete"] is False
@@ -1,6 +1,8 @@
 import pytest
 import json
-from src.data_processor import save_to_json, load_to_db
+from src.data_processor import (EMPLOYER_COLUMNS, BulkLoader, save_to_json, load_to_db, vacancy_row,
+                                archive_missing_vacancies, refresh_employer_summary, update_currency_rates)
+from src.records import Employer
 
 
 @pytest.fixture
@@ -33,18 +35,6 @@ def sample_vacancies():
     ]
 
 
-@pytest.fixture
-def mock_db_params():
-    """Фикстура с тестовыми параметрами подключения к БД."""
-    return {
-        "dbname": "test_db",
-        "user": "postgres",
-        "password": "test_pass",
-        "host": "localhost",
-        "port": "5432"
-    }
-
-
 def test_save_to_json(tmp_path, sample_employers):
     """Тест сохранения данных в JSON-файл."""
     file_path = tmp_path / "test.json"
@@ -57,55 +47,167 @@ def test_save_to_json(tmp_path, sample_employers):
     assert result[1]["name"] == "Альфа-Банк"
 
 
-def test_load_to_db(mocker, mock_db_params, sample_employers, sample_vacancies):
-    """Тест загрузки данных в базу данных."""
-    # Мокаем подключение и курсор
-    mock_conn = mocker.Mock()
-    mock_cursor = mocker.Mock()
-    mock_conn.cursor.return_value = mock_cursor  # Просто возвращаем mock_cursor
-    mocker.patch("psycopg2.connect", return_value=mock_conn)
+def test_load_to_db(mocker, mock_db_params, mock_conn, mock_cursor, sample_employers, sample_vacancies):
+    """Тест пакетной загрузки данных в базу данных через COPY."""
+    copied = []
+    mock_cursor.copy_expert.side_effect = lambda sql, buffer: copied.append((sql, buffer.read()))
 
     # Вызываем функцию
-    load_to_db(mock_db_params, sample_employers, sample_vacancies)
+    stats = load_to_db(mock_db_params, sample_employers, sample_vacancies)
 
-    # Проверяем вызовы для employers
-    assert mock_cursor.execute.call_count >= 4  # Минимум 2 для employers + 2 для vacancies
+    # Промежуточные таблицы создаются по одной на каждую основную
     mock_cursor.execute.assert_any_call(
-        """
-            INSERT INTO employers (employer_id, name, url)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (employer_id) DO NOTHING
-        """,
-        ("1740", "Яндекс", "https://hh.ru/employer/1740")
+        "CREATE TEMP TABLE employers_stage (LIKE employers INCLUDING DEFAULTS) ON COMMIT DROP"
     )
     mock_cursor.execute.assert_any_call(
-        """
-            INSERT INTO employers (employer_id, name, url)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (employer_id) DO NOTHING
-        """,
-        ("80", "Альфа-Банк", "https://hh.ru/employer/80")
+        "CREATE TEMP TABLE vacancies_stage (LIKE vacancies INCLUDING DEFAULTS) ON COMMIT DROP"
     )
 
-    # Проверяем вызовы для vacancies
-    mock_cursor.execute.assert_any_call(
-        """
-            INSERT INTO vacancies (vacancy_id, employer_id, name, salary_from, salary_to, url)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (vacancy_id) DO NOTHING
-        """,
-        ("123", "1740", "Программист", 100000, 150000, "https://hh.ru/vacancy/123")
-    )
-    mock_cursor.execute.assert_any_call(
-        """
-            INSERT INTO vacancies (vacancy_id, employer_id, name, salary_from, salary_to, url)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            ON CONFLICT (vacancy_id) DO NOTHING
-        """,
-        ("456", "80", "Аналитик", None, None, "https://hh.ru/vacancy/456")
-    )
+    # Данные передаются через COPY в формате CSV, NULL — полем \N
+    assert copied == [
+        (
+            "COPY employers_stage (employer_id, name, url) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            "1740,Яндекс,https://hh.ru/employer/1740\r\n80,Альфа-Банк,https://hh.ru/employer/80\r\n"
+        ),
+        (
+            "COPY vacancies_stage (vacancy_id, employer_id, name, salary_from, salary_to, url, currency, gross) "
+            "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            "123,1740,Программист,100000,150000,https://hh.ru/vacancy/123,\\N,\\N\r\n"
+            "456,80,Аналитик,\\N,\\N,https://hh.ru/vacancy/456,\\N,\\N\r\n"
+        )
+    ]
+
+    # Перенос в основные таблицы — по одному INSERT ... ON CONFLICT на таблицу
+    inserts = [call.args[0] for call in mock_cursor.execute.call_args_list if "INSERT INTO" in call.args[0]]
+    assert len(inserts) == 3
+    assert "INSERT INTO employer_summary" in inserts[2]
+    assert "INSERT INTO employers" in inserts[0] and "ON CONFLICT (employer_id) DO UPDATE" in inserts[0]
+    assert "INSERT INTO vacancies" in inserts[1] and "ON CONFLICT (vacancy_id) DO UPDATE" in inserts[1]
+    # Вакансия перезаписывается только при изменении хеша содержимого или возврате из архива
+    assert "content_hash" in inserts[1]
+    assert "WHERE vacancies.content_hash IS DISTINCT FROM EXCLUDED.content_hash OR vacancies.archived" in inserts[1]
+    # Зарплата в рублях вычисляется при переносе пачки по курсу из currency_rates
+    assert "FROM currency_rates WHERE code = COALESCE(currency, 'RUR')" in inserts[1]
+    assert "salary_rub = EXCLUDED.salary_rub" in inserts[1]
 
-    # Проверяем коммит и закрытие соединения
+    # Сводка пересчитывается для работодателей из загрузки в той же транзакции
+    summary = [call.args for call in mock_cursor.execute.call_args_list if "employer_summary" in call.args[0]]
+    assert len(summary) == 1
+    assert summary[0][1] == ([], [], ["1740", "80"])
+
+    assert stats["employers"] == 2
+    assert stats["vacancies"] == 2
+    assert stats["rows"] == 4
+    assert stats["rows_per_sec"] > 0
+
+    # Проверяем коммит и возврат соединения в пул
     mock_conn.commit.assert_called_once()
-    mock_cursor.close.assert_called_once()
-    mock_conn.close.assert_called_once()
\ No newline at end of file
+    mock_conn.close.assert_not_called()
+
+
+def test_copy_keeps_empty_strings(mock_cursor):
+    """Тест: пустое название передаётся пустой строкой, а не NULL, который нарушил бы NOT NULL."""
+    copied = []
+    mock_cursor.copy_expert.side_effect = lambda sql, buffer: copied.append(buffer.read())
+    loader = BulkLoader(mock_cursor, "employers", EMPLOYER_COLUMNS, "employer_id")
+
+    loader.copy([Employer("1740", "", None)])
+
+    assert copied == ["1740,,\\N\r\n"]
+
+
+def test_load_to_db_batches(mocker, mock_db_params, mock_cursor, sample_employers):
+    """Тест разбиения строк на пачки размера batch_size."""
+    vacancies = [
+        {"id": str(i), "employer": {"id": "1740"}, "name": "Программист", "salary": None,
+         "alternate_url": f"https://hh.ru/vacancy/{i}"}
+        for i in range(5)
+    ]
+
+    stats = load_to_db(mock_db_params, sample_employers, vacancies, batch_size=2)
+
+    # 1 пачка работодателей + 3 пачки вакансий (2 + 2 + 1)
+    assert mock_cursor.copy_expert.call_count == 4
+    assert stats["vacancies"] == 5
+
+
+def test_vacancy_row():
+    """Тест извлечения полей вакансии из ответа API."""
+    vacancy = {"id": "1", "employer": {"id": "2"}, "name": "Тестировщик",
+               "salary": {"from": None, "to": 90000}, "alternate_url": "https://hh.ru/vacancy/1"}
+    assert vacancy_row(vacancy) == ("1", "2", "Тестировщик", None, 90000, "https://hh.ru/vacancy/1", None, None)
+
+
+def test_vacancy_row_currency():
+    """Тест извлечения валюты и признака зарплаты до вычета налогов."""
+    vacancy = {"id": "1", "employer": {"id": "2"}, "name": "Developer",
+               "salary": {"from": 3000, "to": None, "currency": "USD", "gross": True},
+               "alternate_url": "https://hh.ru/vacancy/1"}
+    assert vacancy_row(vacancy)[3:] == (3000, None, "https://hh.ru/vacancy/1", "USD", True)
+
+
+def test_update_currency_rates(mocker):
+    """Тест обновления курсов: salary_rub пересчитывается только для валют с изменившимся курсом."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.side_effect = [[("USD",)], [("1740", 5), ("80", 2)]]
+
+    assert update_currency_rates(mock_cursor, {"RUR": 1.0, "USD": 0.011, "XXX": 0}) == 7
+
+    upsert, recalculate, summary = mock_cursor.execute.call_args_list
+    assert "INSERT INTO currency_rates" in upsert.args[0]
+    assert upsert.args[1] == (["RUR", "USD"], [1.0, 0.011])
+    assert "UPDATE vacancies SET salary_rub" in recalculate.args[0]
+    assert recalculate.args[1] == (["USD"],)
+    # Сводка пересчитывается для всех работодателей с пересчитанными вакансиями
+    assert "INSERT INTO employer_summary" in summary.args[0]
+    assert summary.args[1] == ([], [], ["1740", "80"])
+
+
+def test_update_currency_rates_unchanged(mocker):
+    """Тест: если курсы не изменились, вакансии не пересчитываются."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.return_value = []
+
+    assert update_currency_rates(mock_cursor, {"RUR": 1.0}) == 0
+    mock_cursor.execute.assert_called_once()
+
+
+def test_archive_missing_vacancies(mocker):
+    """Тест пометки архивными вакансий, не встретившихся при синхронизации."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.rowcount = 3
+
+    assert archive_missing_vacancies(mock_cursor, ["1740", "80"]) == 3
+    sql, params = mock_cursor.execute.call_args.args
+    assert "SET archived = TRUE" in sql
+    assert "vacancies_seen" in sql
+    assert params == (["1740", "80"],)
+
+
+def test_archive_missing_vacancies_no_employers(mocker):
+    """Тест, что без полностью загруженных работодателей ничего не архивируется."""
+    mock_cursor = mocker.Mock()
+
+    assert archive_missing_vacancies(mock_cursor, []) == 0
+    mock_cursor.execute.assert_not_called()
+
+
+def test_refresh_employer_summary(mocker):
+    """Тест пересчёта сводки по работодателям с числом вакансий из API."""
+    mock_cursor = mocker.Mock()
+
+    refresh_employer_summary(mock_cursor, ["1740", "80"], {"1740": 42})
+
+    sql, params = mock_cursor.execute.call_args.args
+    assert "INSERT INTO employer_summary" in sql
+    assert "ON CONFLICT (employer_id) DO UPDATE" in sql
+    assert "WHERE e.employer_id = ANY(%s)" in sql
+    assert params == (["1740"], [42], ["1740", "80"])
+
+
+def test_refresh_employer_summary_no_employers(mocker):
+    """Тест, что без работодателей сводка не пересчитывается."""
+    mock_cursor = mocker.Mock()
+
+    refresh_employer_summary(mock_cursor, [])
+    mock_cursor.execute.assert_not_called()
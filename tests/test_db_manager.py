@@ -1,53 +1,48 @@
+from decimal import Decimal
+
 import pytest
 from src.db_manager import DBManager
 
 
 @pytest.fixture
-def mock_db_params():
-    """Фикстура с тестовыми параметрами подключения к БД."""
-    return {
-        "dbname": "test_db",
-        "user": "postgres",
-        "password": "test_pass",
-        "host": "localhost",
-        "port": "5432"
-    }
-
-
-@pytest.fixture
-def db_manager(mocker, mock_db_params):
-    """Фикстура для создания экземпляра DBManager с замоканным соединением."""
-    mocker.patch("psycopg2.connect")
+def db_manager(mock_conn, mock_db_params):
+    """Фикстура для создания экземпляра DBManager с замоканным соединением пула."""
     return DBManager(mock_db_params)
 
 
-def test_get_companies_and_vacancies_count(db_manager, mocker):
+def test_get_companies_and_vacancies_count(db_manager, mock_conn, mocker):
     """Тест получения списка компаний и количества вакансий."""
     mock_cursor = mocker.Mock()
-    mock_cursor.fetchall.return_value = [("Яндекс", 5), ("СБЕР", 10)]
-    db_manager.conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_cursor.fetchall.return_value = [
+        ("СБЕР", 10, 12, 90000, Decimal("120000.5"), 150000),
+        ("Яндекс", 5, 5, None, None, None)
+    ]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     result = db_manager.get_companies_and_vacancies_count()
 
     assert len(result) == 2
-    assert result[0] == {"company": "Яндекс", "vacancies_count": 5}
-    assert result[1] == {"company": "СБЕР", "vacancies_count": 10}
+    assert result[0] == {"company": "СБЕР", "vacancies_count": 10, "found": 12, "min_salary": 90000,
+                         "avg_salary": 120000.5, "max_salary": 150000}
+    assert result[1]["company"] == "Яндекс"
+    assert result[1]["avg_salary"] is None
+    # Данные берутся из сводки, без агрегации по таблице вакансий; работодатели без сводки не теряются
     mock_cursor.execute.assert_called_once_with("""
-                SELECT e.name, COUNT(v.vacancy_id) as vacancies_count
+                SELECT e.name, COALESCE(s.vacancies_count, 0), s.found, s.min_salary, s.avg_salary, s.max_salary
                 FROM employers e
-                LEFT JOIN vacancies v ON e.employer_id = v.employer_id
-                GROUP BY e.name
+                LEFT JOIN employer_summary s ON s.employer_id = e.employer_id
+                ORDER BY e.name
             """)
 
 
-def test_get_all_vacancies(db_manager, mocker):
+def test_get_all_vacancies(db_manager, mock_conn, mocker):
     """Тест получения списка всех вакансий."""
     mock_cursor = mocker.Mock()
     mock_cursor.fetchall.return_value = [
         ("Яндекс", "Программист", 100000, 150000, "https://hh.ru/vacancy/123"),
         ("СБЕР", "Аналитик", 120000, None, "https://hh.ru/vacancy/456")
     ]
-    db_manager.conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     result = db_manager.get_all_vacancies()
 
@@ -70,30 +65,31 @@ def test_get_all_vacancies(db_manager, mocker):
                 SELECT e.name, v.name, v.salary_from, v.salary_to, v.url
                 FROM vacancies v
                 JOIN employers e ON v.employer_id = e.employer_id
+                WHERE NOT v.archived
             """)
 
 
-def test_get_avg_salary(db_manager, mocker):
+def test_get_avg_salary(db_manager, mock_conn, mocker):
     """Тест получения средней зарплаты."""
     mock_cursor = mocker.Mock()
     mock_cursor.fetchone.return_value = [125000.0]
-    db_manager.conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     result = db_manager.get_avg_salary()
 
     assert result == 125000.0
     mock_cursor.execute.assert_called_once_with("""
-                SELECT AVG(COALESCE(salary_from, salary_to)) 
-                FROM vacancies 
-                WHERE salary_from IS NOT NULL OR salary_to IS NOT NULL
+                SELECT AVG(salary_rub)
+                FROM vacancies
+                WHERE salary_rub IS NOT NULL AND NOT archived
             """)
 
 
-def test_get_avg_salary_no_data(db_manager, mocker):
+def test_get_avg_salary_no_data(db_manager, mock_conn, mocker):
     """Тест получения средней зарплаты при отсутствии данных."""
     mock_cursor = mocker.Mock()
     mock_cursor.fetchone.return_value = [None]  # Нет данных
-    db_manager.conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     result = db_manager.get_avg_salary()
 
@@ -101,16 +97,15 @@ def test_get_avg_salary_no_data(db_manager, mocker):
     mock_cursor.execute.assert_called_once()
 
 
-def test_get_vacancies_with_higher_salary(db_manager, mocker):
-    """Тест получения вакансий с зарплатой выше средней."""
-    # Мокаем get_avg_salary
-    mocker.patch.object(db_manager, "get_avg_salary", return_value=125000.0)
+def test_get_vacancies_with_higher_salary(db_manager, mock_conn, mocker):
+    """Тест получения вакансий с зарплатой выше средней одним запросом."""
+    get_avg_salary = mocker.patch.object(db_manager, "get_avg_salary")
 
     mock_cursor = mocker.Mock()
     mock_cursor.fetchall.return_value = [
         ("Яндекс", "Программист", 150000, 200000, "https://hh.ru/vacancy/123")
     ]
-    db_manager.conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     result = db_manager.get_vacancies_with_higher_salary()
 
@@ -122,21 +117,27 @@ def test_get_vacancies_with_higher_salary(db_manager, mocker):
         "salary_to": 200000,
         "url": "https://hh.ru/vacancy/123"
     }
+    # Средняя считается подзапросом, отдельного запроса get_avg_salary нет
+    get_avg_salary.assert_not_called()
     mock_cursor.execute.assert_called_once_with("""
                 SELECT e.name, v.name, v.salary_from, v.salary_to, v.url
                 FROM vacancies v
                 JOIN employers e ON v.employer_id = e.employer_id
-                WHERE COALESCE(v.salary_from, v.salary_to) > %s
-            """, (125000.0,))
+                WHERE v.salary_rub > (
+                    SELECT AVG(salary_rub)
+                    FROM vacancies
+                    WHERE salary_rub IS NOT NULL AND NOT archived
+                ) AND NOT v.archived
+            """)
 
 
-def test_get_vacancies_with_keyword(db_manager, mocker):
+def test_get_vacancies_with_keyword(db_manager, mock_conn, mocker):
     """Тест получения вакансий по ключевому слову."""
     mock_cursor = mocker.Mock()
     mock_cursor.fetchall.return_value = [
         ("Яндекс", "Программист Python", 100000, 150000, "https://hh.ru/vacancy/123")
     ]
-    db_manager.conn.cursor.return_value.__enter__.return_value = mock_cursor
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
 
     result = db_manager.get_vacancies_with_keyword("Python")
 
@@ -152,5 +153,201 @@ def test_get_vacancies_with_keyword(db_manager, mocker):
                 SELECT e.name, v.name, v.salary_from, v.salary_to, v.url
                 FROM vacancies v
                 JOIN employers e ON v.employer_id = e.employer_id
-                WHERE v.name ILIKE %s
-            """, ("%Python%",))
\ No newline at end of file
+                WHERE v.name ILIKE %s AND NOT v.archived
+            """, ("%Python%",))
+
+
+def test_search_vacancies(db_manager, mock_conn, mocker):
+    """Тест ранжированного полнотекстового поиска вакансий."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.return_value = [
+        ("Яндекс", "Программист Python", 100000, 150000, "https://hh.ru/vacancy/123", 0.9),
+        ("СБЕР", "Python-разработчик", None, None, "https://hh.ru/vacancy/456", 0.4)
+    ]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    result = db_manager.search_vacancies("python программист", limit=10)
+
+    assert [vac["vacancy"] for vac in result] == ["Программист Python", "Python-разработчик"]
+    assert result[0]["rank"] == 0.9
+    sql, params = mock_cursor.execute.call_args.args
+    assert "v.search_vector @@ q.query" in sql
+    assert "plainto_tsquery('russian', %(query)s) || plainto_tsquery('english', %(query)s)" in sql
+    assert "ORDER BY rank DESC" in sql
+    assert params == {"query": "python программист", "pattern": "%python программист%", "limit": 10}
+
+
+def test_iter_all_vacancies(db_manager, mock_conn, mocker):
+    """Тест потоковой выдачи вакансий через именованный серверный курсор."""
+    mock_cursor = mocker.MagicMock()
+    mock_cursor.__iter__.return_value = iter([
+        ("123", "Яндекс", "Программист", 100000, None, "https://hh.ru/vacancy/123")
+    ])
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    result = list(db_manager.iter_all_vacancies(batch_size=500))
+
+    assert result == [{"vacancy_id": "123", "company": "Яндекс", "vacancy": "Программист",
+                       "salary_from": 100000, "salary_to": None, "url": "https://hh.ru/vacancy/123"}]
+    assert mock_conn.cursor.call_args.kwargs["name"].startswith("dbmanager_")
+    assert mock_cursor.itersize == 500
+    mock_cursor.execute.assert_called_once_with(DBManager.VACANCY_QUERY, ())
+
+
+def test_iter_vacancies_with_keyword(db_manager, mock_conn, mocker):
+    """Тест потоковой выдачи вакансий по ключевому слову."""
+    mock_cursor = mocker.MagicMock()
+    mock_cursor.__iter__.return_value = iter([])
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    assert list(db_manager.iter_vacancies_with_keyword("Python")) == []
+    mock_cursor.execute.assert_called_once_with(DBManager.VACANCY_QUERY + " AND v.name ILIKE %s", ("%Python%",))
+
+
+def test_get_all_vacancies_page(db_manager, mock_conn, mocker):
+    """Тест постраничной выборки по ключу vacancy_id."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.return_value = [
+        ("124", "Яндекс", "Аналитик", None, None, "https://hh.ru/vacancy/124")
+    ]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    result = db_manager.get_all_vacancies_page(after="123", limit=1)
+
+    assert result[0]["vacancy_id"] == "124"
+    sql, params = mock_cursor.execute.call_args.args
+    assert "AND v.vacancy_id > %s" in sql
+    assert sql.rstrip().endswith("ORDER BY v.vacancy_id\n                LIMIT %s")
+    assert params == ("123", 1)
+
+
+def test_get_vacancies_with_higher_salary_page_first(db_manager, mock_conn, mocker):
+    """Тест первой страницы вакансий с зарплатой выше средней."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.return_value = []
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    assert db_manager.get_vacancies_with_higher_salary_page(limit=20) == []
+    sql, params = mock_cursor.execute.call_args.args
+    assert "vacancy_id >" not in sql
+    assert DBManager.AVG_SALARY_SUBQUERY in sql
+    assert params == (20,)
+
+
+def test_get_salary_stats(db_manager, mock_conn, mocker):
+    """Тест статистики зарплат по компаниям."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.return_value = [
+        ("Яндекс", 3, Decimal("150000"), [110000.0, 150000.0, 190000.0], 100000, 200001, {"1": 1, "4": 2})
+    ]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    result = db_manager.get_salary_stats(buckets=4)
+
+    assert result == [{
+        "company": "Яндекс",
+        "vacancies_count": 3,
+        "avg_salary": 150000.0,
+        "p10": 110000.0,
+        "median": 150000.0,
+        "p90": 190000.0,
+        "histogram": [1, 0, 0, 2],
+        "bucket_edges": [100000, 125000.25, 150000.5, 175000.75, 200001.0]
+    }]
+    sql, params = mock_cursor.execute.call_args.args
+    assert "percentile_cont(ARRAY[0.1, 0.5, 0.9])" in sql
+    assert "width_bucket" in sql
+    assert params == {"buckets": 4}
+    mock_cursor.execute.assert_called_once()
+
+
+def _cached_manager(mock_db_params, mock_conn, mocker, generations, cache_size=2, generation_check_interval=0):
+    """DBManager с кешем и курсором, который возвращает заданные поколения данных."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchone.side_effect = [(generation,) for generation in generations]
+    mock_cursor.fetchall.return_value = [("Яндекс", "Программист", 100000, None, "https://hh.ru/vacancy/1")]
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+    return DBManager(mock_db_params, cache_size=cache_size,
+                     generation_check_interval=generation_check_interval), mock_cursor
+
+
+def _queries(mock_cursor):
+    """SQL выполненных запросов, кроме проверки поколения данных."""
+    return [call.args[0] for call in mock_cursor.execute.call_args_list if "sync_state" not in call.args[0]]
+
+
+def test_cache_disabled_by_default(db_manager, mock_conn, mocker):
+    """Тест: без cache_size каждый вызов выполняет запрос, поколение данных не проверяется."""
+    mock_cursor = mocker.Mock()
+    mock_cursor.fetchall.return_value = []
+    mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+    db_manager.get_all_vacancies()
+    db_manager.get_all_vacancies()
+
+    assert mock_cursor.execute.call_count == 2
+    assert not any("sync_state" in call.args[0] for call in mock_cursor.execute.call_args_list)
+
+
+def test_cache_hit(mock_db_params, mock_conn, mocker):
+    """Тест: повторный запрос с теми же аргументами берётся из кеша."""
+    db_manager, mock_cursor = _cached_manager(mock_db_params, mock_conn, mocker, [1, 1, 1])
+
+    first = db_manager.get_vacancies_with_keyword("python")
+    second = db_manager.get_vacancies_with_keyword("python")
+    db_manager.get_vacancies_with_keyword("java")
+
+    assert first == second
+    assert len(_queries(mock_cursor)) == 2
+
+
+def test_cache_invalidated_by_new_generation(mock_db_params, mock_conn, mocker):
+    """Тест: после загрузки данных (новое поколение) запрос выполняется заново."""
+    db_manager, mock_cursor = _cached_manager(mock_db_params, mock_conn, mocker, [1, 1, 2])
+
+    db_manager.get_all_vacancies()
+    db_manager.get_all_vacancies()
+    db_manager.get_all_vacancies()
+
+    assert len(_queries(mock_cursor)) == 2
+
+
+def test_cache_evicts_least_recently_used(mock_db_params, mock_conn, mocker):
+    """Тест: при переполнении вытесняется давно не использовавшийся результат."""
+    db_manager, mock_cursor = _cached_manager(mock_db_params, mock_conn, mocker, [1] * 5, cache_size=2)
+
+    db_manager.get_vacancies_with_keyword("a")
+    db_manager.get_vacancies_with_keyword("b")
+    db_manager.get_vacancies_with_keyword("a")  # из кеша, "b" становится самым старым
+    db_manager.get_vacancies_with_keyword("c")  # вытесняет "b"
+    db_manager.get_vacancies_with_keyword("a")  # из кеша
+
+    assert len(_queries(mock_cursor)) == 3
+
+
+def test_cache_checks_generation_once_per_interval(mock_db_params, mock_conn, mocker):
+    """Тест: в пределах generation_check_interval попадания в кеш не обращаются к БД."""
+    clock = mocker.patch("src.db_manager.time.monotonic", return_value=100.0)
+    db_manager, mock_cursor = _cached_manager(mock_db_params, mock_conn, mocker, [1, 2],
+                                              generation_check_interval=5.0)
+
+    db_manager.get_all_vacancies()
+    db_manager.get_all_vacancies()
+    assert mock_cursor.execute.call_count == 2  # поколение и сам запрос
+
+    clock.return_value = 106.0  # интервал истёк, другая загрузка увеличила поколение
+    db_manager.get_all_vacancies()
+    assert len(_queries(mock_cursor)) == 2
+
+
+def test_clear_cache_rereads_generation(mock_db_params, mock_conn, mocker):
+    """Тест: после clear_cache поколение данных читается заново, не дожидаясь интервала."""
+    db_manager, mock_cursor = _cached_manager(mock_db_params, mock_conn, mocker, [1, 2],
+                                              generation_check_interval=60.0)
+
+    db_manager.get_all_vacancies()
+    db_manager.clear_cache()
+    db_manager.get_all_vacancies()
+
+    assert len(_queries(mock_cursor)) == 2
+    assert db_manager._cache_generation == 2
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from src.db_pool import ConnectionPool, connection, get_pool
+
+
+@pytest.fixture
+def connections(mocker):
+    """Мокает psycopg2.connect так, чтобы каждый вызов возвращал новое соединение."""
+    created = []
+
+    def connect(**kwargs):
+        conn = mocker.MagicMock()
+        conn.closed = 0
+        created.append(conn)
+        return conn
+
+    mocker.patch("psycopg2.connect", side_effect=connect)
+    return created
+
+
+def test_connection_is_reused(mock_db_params, connections):
+    """Тест повторного использования соединения вместо нового подключения."""
+    with connection(mock_db_params) as first:
+        pass
+    with connection(mock_db_params) as second:
+        pass
+
+    assert first is second
+    assert len(connections) == 1
+    assert first.commit.call_count == 2
+    assert get_pool(mock_db_params) is get_pool(dict(mock_db_params))
+
+
+def test_rollback_on_error(mock_db_params, connections):
+    """Тест отката транзакции при исключении в блоке."""
+    with pytest.raises(ValueError):
+        with connection(mock_db_params) as conn:
+            raise ValueError("ошибка")
+
+    conn.rollback.assert_called()
+    conn.commit.assert_not_called()
+    conn.close.assert_not_called()
+
+
+def test_broken_connection_is_replaced(mock_db_params, connections):
+    """Тест замены соединения после ошибки связи с сервером."""
+    with pytest.raises(psycopg2.OperationalError):
+        with connection(mock_db_params) as broken:
+            raise psycopg2.OperationalError("server closed the connection")
+    with connection(mock_db_params) as fresh:
+        pass
+
+    broken.close.assert_called()
+    assert fresh is not broken
+    assert len(connections) == 2
+
+
+def test_health_check_of_idle_connection(mock_db_params, connections):
+    """Тест проверки простаивающего соединения и переподключения при сбое."""
+    pool = ConnectionPool(mock_db_params, health_check_interval=0)
+    with pool.connection() as stale:
+        pass
+    stale.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+
+    with pool.connection() as conn:
+        pass
+
+    assert conn is not stale
+    stale.close.assert_called()
+    pool.closeall()
+
+
+def test_autocommit_connection(mock_db_params, connections):
+    """Тест выдачи соединения в режиме autocommit и его сброса при возврате."""
+    with connection(mock_db_params, autocommit=True) as conn:
+        assert conn.autocommit is True
+
+    assert conn.autocommit is False
+    conn.commit.assert_not_called()
+
+
+def test_waits_for_free_connection(mock_db_params, connections):
+    """Тест, что при исчерпании maxconn поток ждёт освобождения соединения."""
+    pool = ConnectionPool(mock_db_params, minconn=1, maxconn=1)
+    acquired = []
+
+    def worker():
+        with pool.connection() as conn:
+            acquired.append(conn)
+
+    with pool.connection():
+        thread = threading.Thread(target=worker)
+        thread.start()
+        time.sleep(0.05)
+        assert acquired == []  # второй поток ждёт
+    thread.join(timeout=1)
+
+    assert len(acquired) == 1
+    pool.closeall()
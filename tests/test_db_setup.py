@@ -1,110 +1,86 @@
 import pytest
 import psycopg2
-from src.db_setup import create_database, drop_tables, create_tables
+from decimal import Decimal
+from src.db_setup import MIGRATIONS, SCHEMA_VERSION, create_database, drop_tables, create_tables, get_data_age
 
 
-@pytest.fixture
-def mock_db_params():
-    """Фикстура с тестовыми параметрами подключения к БД."""
-    return {
-        "dbname": "test_db",
-        "user": "postgres",
-        "password": "test_pass",
-        "host": "localhost",
-        "port": "5432"
-    }
-
-
-def test_create_database_new_db(mocker, mock_db_params):
+def test_create_database_new_db(mocker, mock_db_params, mock_conn, mock_cursor):
     """Тест создания новой базы данных, если она не существует."""
-    # Мокаем подключение и курсор
-    mock_conn = mocker.Mock()
-    mock_cursor = mocker.Mock()
-    mock_conn.cursor.return_value = mock_cursor
     mock_cursor.fetchone.return_value = None  # База ещё не существует
-    mocker.patch("psycopg2.connect", return_value=mock_conn)
 
     # Вызываем функцию
     create_database(mock_db_params)
 
     # Проверяем вызовы
-    mock_conn.set_isolation_level.assert_called_once_with(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    psycopg2.connect.assert_called_once_with(
+        dbname="postgres", user="postgres", password="test_pass", host="localhost", port="5432"
+    )
+    assert mock_conn.commit.call_count == 0  # CREATE DATABASE выполняется в режиме autocommit
     mock_cursor.execute.assert_any_call("SELECT 1 FROM pg_database WHERE datname = 'test_db'")
     mock_cursor.execute.assert_any_call("CREATE DATABASE test_db")
     assert mock_cursor.execute.call_count == 2
-    mock_cursor.close.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()  # соединение возвращается в пул
 
 
-def test_create_database_existing_db(mocker, mock_db_params):
+def test_create_database_existing_db(mocker, mock_db_params, mock_conn, mock_cursor):
     """Тест, когда база данных уже существует."""
-    # Мокаем подключение и курсор
-    mock_conn = mocker.Mock()
-    mock_cursor = mocker.Mock()
-    mock_conn.cursor.return_value = mock_cursor
     mock_cursor.fetchone.return_value = (1,)  # База уже существует
-    mocker.patch("psycopg2.connect", return_value=mock_conn)
 
     # Вызываем функцию
     create_database(mock_db_params)
 
     # Проверяем вызовы
-    mock_conn.set_isolation_level.assert_called_once_with(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    psycopg2.connect.assert_called_once_with(
+        dbname="postgres", user="postgres", password="test_pass", host="localhost", port="5432"
+    )
+    assert mock_conn.commit.call_count == 0  # CREATE DATABASE выполняется в режиме autocommit
     mock_cursor.execute.assert_called_once_with("SELECT 1 FROM pg_database WHERE datname = 'test_db'")
-    mock_cursor.close.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()  # соединение возвращается в пул
     # Убеждаемся, что CREATE DATABASE не вызывался
     assert "CREATE DATABASE" not in [call.args[0] for call in mock_cursor.execute.call_args_list]
 
 
-def test_drop_tables_success(mocker, mock_db_params):
+def test_drop_tables_success(mocker, mock_db_params, mock_conn, mock_cursor):
     """Тест успешного удаления таблиц."""
-    # Мокаем подключение и курсор
-    mock_conn = mocker.Mock()
-    mock_cursor = mocker.Mock()
-    mock_conn.cursor.return_value = mock_cursor
-    mocker.patch("psycopg2.connect", return_value=mock_conn)
 
     # Вызываем функцию
     drop_tables(mock_db_params)
 
     # Проверяем вызовы
-    mock_cursor.execute.assert_called_once_with("DROP TABLE IF EXISTS vacancies, employers CASCADE")
+    mock_cursor.execute.assert_called_once_with("DROP TABLE IF EXISTS schema_version, sync_state, currency_rates, employer_summary, "
+                                                "vacancies, employers CASCADE")
     mock_conn.commit.assert_called_once()
-    mock_cursor.close.assert_called_once()
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()  # соединение возвращается в пул
 
 
-def test_drop_tables_error(mocker, mock_db_params):
+def test_drop_tables_error(mocker, mock_db_params, mock_conn, mock_cursor):
     """Тест обработки исключения в drop_tables."""
-    # Мокаем подключение с выбросом ошибки
-    mock_conn = mocker.Mock()
-    mock_cursor = mocker.Mock()
-    mock_conn.cursor.return_value = mock_cursor
+    # Мокаем курсор с выбросом ошибки
     mock_cursor.execute.side_effect = psycopg2.Error("Тестовая ошибка")
-    mocker.patch("psycopg2.connect", return_value=mock_conn)
 
     # Проверяем, что выбрасывается исключение
     with pytest.raises(psycopg2.Error, match="Тестовая ошибка"):
         drop_tables(mock_db_params)
 
-    # Проверяем, что ошибка логируется (print вызывается)
-    mock_cursor.execute.assert_called_once_with("DROP TABLE IF EXISTS vacancies, employers CASCADE")
+    # Проверяем, что ошибка логируется (print вызывается), а транзакция откатывается
+    mock_cursor.execute.assert_called_once_with("DROP TABLE IF EXISTS schema_version, sync_state, currency_rates, employer_summary, "
+                                                "vacancies, employers CASCADE")
+    mock_conn.rollback.assert_called()
+    mock_conn.commit.assert_not_called()
 
 
-def test_create_tables(mocker, mock_db_params):
-    """Тест создания таблиц."""
-    # Мокаем подключение и курсор
-    mock_conn = mocker.Mock()
-    mock_cursor = mocker.Mock()
-    mock_conn.cursor.return_value = mock_cursor
-    mocker.patch("psycopg2.connect", return_value=mock_conn)
+def test_create_tables(mocker, mock_db_params, mock_conn, mock_cursor):
+    """Тест создания таблиц в новой базе: применяются все миграции."""
+    # Таблицы schema_version нет, после её создания версия 0
+    mock_cursor.fetchone.side_effect = [(None,), ("schema_version",), (0,)]
 
     # Вызываем функцию
-    create_tables(mock_db_params)
+    assert create_tables(mock_db_params) == len(MIGRATIONS)
 
     # Проверяем вызовы
-    assert mock_cursor.execute.call_count == 2
+    statements = sum(len(migration[2]) for migration in MIGRATIONS)
+    # проверка версии, создание schema_version, блокировка, повторная проверка версии, DDL и записи версий
+    assert mock_cursor.execute.call_count == 1 + 1 + 1 + 2 + statements + len(MIGRATIONS)
     mock_cursor.execute.assert_any_call("""
         CREATE TABLE IF NOT EXISTS employers (
             employer_id VARCHAR(20) PRIMARY KEY,
@@ -122,6 +98,72 @@ def test_create_tables(mocker, mock_db_params):
             url VARCHAR(255)
         )
     """)
+    mock_cursor.execute.assert_any_call("ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS content_hash CHAR(32)")
+    mock_cursor.execute.assert_any_call(
+        "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS archived BOOLEAN NOT NULL DEFAULT FALSE"
+    )
+    mock_cursor.execute.assert_any_call("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    mock_cursor.execute.assert_any_call(
+        "CREATE INDEX IF NOT EXISTS vacancies_search_vector_idx ON vacancies USING GIN (search_vector)"
+    )
+    mock_cursor.execute.assert_any_call(
+        "CREATE INDEX IF NOT EXISTS vacancies_name_trgm_idx ON vacancies USING GIN (name gin_trgm_ops)"
+    )
+    mock_cursor.execute.assert_any_call(
+        "CREATE INDEX IF NOT EXISTS vacancies_employer_id_idx ON vacancies (employer_id) WHERE NOT archived"
+    )
+    mock_cursor.execute.assert_called_with(
+        "INSERT INTO schema_version (version, description) VALUES (%s, %s)", (SCHEMA_VERSION, MIGRATIONS[-1][1])
+    )
     mock_conn.commit.assert_called_once()
-    mock_cursor.close.assert_called_once()
-    mock_conn.close.assert_called_once()
\ No newline at end of file
+    mock_conn.close.assert_not_called()  # соединение возвращается в пул
+
+
+def test_create_tables_schema_current(mocker, mock_db_params, mock_conn, mock_cursor):
+    """Тест, что при актуальной схеме DDL не выполняется."""
+    mock_cursor.fetchone.side_effect = [("schema_version",), (SCHEMA_VERSION,)]
+
+    assert create_tables(mock_db_params) == 0
+
+    executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert executed == ["SELECT to_regclass('schema_version')", "SELECT COALESCE(MAX(version), 0) FROM schema_version"]
+
+
+def test_create_tables_pending_migrations(mocker, mock_db_params, mock_conn, mock_cursor):
+    """Тест применения только недостающих миграций."""
+    previous = SCHEMA_VERSION - 1
+    mock_cursor.fetchone.side_effect = [
+        ("schema_version",), (previous,),  # проверка до блокировки
+        ("schema_version",), (previous,)  # проверка под блокировкой
+    ]
+
+    assert create_tables(mock_db_params) == 1
+
+    inserts = [call.args[1] for call in mock_cursor.execute.call_args_list if "INSERT INTO schema_version" in call.args[0]]
+    assert inserts == [(SCHEMA_VERSION, MIGRATIONS[-1][1])]
+    executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+    assert "CREATE EXTENSION IF NOT EXISTS pg_trgm" not in executed
+    mock_cursor.execute.assert_any_call("SELECT pg_advisory_xact_lock(%s)", (mocker.ANY,))
+    # Таблица версий создаётся только под блокировкой
+    lock = executed.index("SELECT pg_advisory_xact_lock(%s)")
+    assert lock < next(i for i, sql in enumerate(executed) if "CREATE TABLE IF NOT EXISTS schema_version" in sql)
+
+
+def test_get_data_age_fresh(mock_db_params, mock_conn, mock_cursor):
+    """Тест возраста данных при актуальной схеме и завершённой загрузке."""
+    mock_cursor.fetchone.side_effect = [("schema_version",), (SCHEMA_VERSION,), (Decimal("120.5"),)]
+
+    assert get_data_age(mock_db_params) == 120.5
+    mock_cursor.execute.assert_called_with("SELECT EXTRACT(EPOCH FROM now() - loaded_at) FROM sync_state WHERE id = 1")
+
+
+def test_get_data_age_needs_load(mocker, mock_db_params, mock_conn, mock_cursor):
+    """Тест, что устаревшая схема, незавершённая загрузка и отсутствие БД требуют загрузки."""
+    mock_cursor.fetchone.side_effect = [("schema_version",), (SCHEMA_VERSION - 1,)]
+    assert get_data_age(mock_db_params) is None
+
+    mock_cursor.fetchone.side_effect = [("schema_version",), (SCHEMA_VERSION,), (None,)]
+    assert get_data_age(mock_db_params) is None
+
+    mocker.patch("psycopg2.connect", side_effect=psycopg2.OperationalError("database does not exist"))
+    assert get_data_age({**mock_db_params, "dbname": "missing_db"}) is None
@@ -1,5 +1,12 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
+from src.concurrency import AdaptiveLimiter
 from src.hh_api import HhApi
+from src.metrics import metrics
+from src.records import Employer, Vacancy
 
 
 @pytest.fixture
@@ -8,17 +15,15 @@ def hh_api():
     return HhApi()
 
 
-def test_get_employers_success(mocker, hh_api):
+def test_get_employers_success(mocker, hh_api, make_response):
     """Тест получения данных о работодателях при успешном ответе API."""
-    # Мокаем requests.get один раз
-    mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
+    # Мокаем session.get один раз
+    mock_response = make_response(200, {
         "id": "1740",
         "name": "Яндекс",
         "alternate_url": "https://hh.ru/employer/1740"
-    }
-    mock_get = mocker.patch("requests.get", return_value=mock_response)
+    })
+    mock_get = mocker.patch.object(hh_api.session, "get", return_value=mock_response)
 
     employer_ids = ["1740", "80"]
     result = hh_api.get_employers(employer_ids)
@@ -28,30 +33,27 @@ def test_get_employers_success(mocker, hh_api):
     assert result[0]["name"] == "Яндекс"
     assert result[1]["id"] == "1740"  # Второй запрос возвращает тот же мок
     assert mock_get.call_count == 2
-    mock_get.assert_any_call("https://api.hh.ru/employers/1740")
-    mock_get.assert_any_call("https://api.hh.ru/employers/80")
+    mock_get.assert_any_call("https://api.hh.ru/employers/1740", params=None, timeout=10.0)
+    mock_get.assert_any_call("https://api.hh.ru/employers/80", params=None, timeout=10.0)
 
 
-def test_get_employers_failure(mocker, hh_api):
+def test_get_employers_failure(mocker, hh_api, make_response):
     """Тест получения данных о работодателях при неудачном ответе API."""
-    # Мокаем requests.get один раз
-    mock_response = mocker.Mock()
-    mock_response.status_code = 404
-    mock_get = mocker.patch("requests.get", return_value=mock_response)
+    # Мокаем session.get один раз
+    mock_response = make_response(404)
+    mock_get = mocker.patch.object(hh_api.session, "get", return_value=mock_response)
 
     employer_ids = ["9999"]
     result = hh_api.get_employers(employer_ids)
 
     assert len(result) == 0  # Нет данных при ошибке
-    mock_get.assert_called_once_with("https://api.hh.ru/employers/9999")
+    mock_get.assert_called_once_with("https://api.hh.ru/employers/9999", params=None, timeout=10.0)
 
 
-def test_get_vacancies_success(mocker, hh_api):
+def test_get_vacancies_success(mocker, hh_api, make_response):
     """Тест получения вакансий при успешном ответе API."""
-    # Мокаем requests.get один раз
-    mock_response = mocker.Mock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
+    # Мокаем session.get один раз
+    mock_response = make_response(200, {
         "found": 150,
         "items": [
             {
@@ -63,8 +65,8 @@ def test_get_vacancies_success(mocker, hh_api):
             }
         ],
         "pages": 2
-    }
-    mock_get = mocker.patch("requests.get", return_value=mock_response)
+    })
+    mock_get = mocker.patch.object(hh_api.session, "get", return_value=mock_response)
 
     total_vacancies, vacancies = hh_api.get_vacancies("1740")
 
@@ -74,16 +76,16 @@ def test_get_vacancies_success(mocker, hh_api):
     assert vacancies[0]["name"] == "Программист"
     mock_get.assert_called_once_with(
         "https://api.hh.ru/vacancies",
-        params={"employer_id": "1740", "per_page": 100, "page": 0}
+        params={"employer_id": "1740", "per_page": 100, "page": 0},
+        timeout=10.0
     )
 
 
-def test_get_vacancies_failure(mocker, hh_api):
+def test_get_vacancies_failure(mocker, hh_api, make_response):
     """Тест получения вакансий при неудачном ответе API."""
-    # Мокаем requests.get один раз
-    mock_response = mocker.Mock()
-    mock_response.status_code = 404
-    mock_get = mocker.patch("requests.get", return_value=mock_response)
+    # Мокаем session.get один раз
+    mock_response = make_response(404)
+    mock_get = mocker.patch.object(hh_api.session, "get", return_value=mock_response)
 
     total_vacancies, vacancies = hh_api.get_vacancies("9999")
 
@@ -91,5 +93,219 @@ def test_get_vacancies_failure(mocker, hh_api):
     assert vacancies == []
     mock_get.assert_called_once_with(
         "https://api.hh.ru/vacancies",
-        params={"employer_id": "9999", "per_page": 100, "page": 0}
-    )
\ No newline at end of file
+        params={"employer_id": "9999", "per_page": 100, "page": 0},
+        timeout=10.0
+    )
+
+
+def test_get_currency_rates(mocker, hh_api, make_response):
+    """Тест получения курсов валют из справочника hh.ru."""
+    mock_response = make_response(200, {"currency": [
+        {"code": "RUR", "abbr": "₽", "rate": 1.0},
+        {"code": "USD", "abbr": "$", "rate": 0.0125},
+        {"code": "XXX", "abbr": "?", "rate": None}
+    ]})
+    mock_get = mocker.patch.object(hh_api.session, "get", return_value=mock_response)
+
+    received = metrics.counter("hh_api_response_bytes_total", endpoint="/dictionaries")
+
+    assert hh_api.get_currency_rates() == {"RUR": 1.0, "USD": 0.0125}
+    assert metrics.counter("hh_api_response_bytes_total", endpoint="/dictionaries") - received == \
+        len(mock_response.content)
+    mock_get.assert_called_once_with("https://api.hh.ru/dictionaries", params=None, timeout=10.0)
+
+
+def test_get_vacancies_all_pages(mocker, hh_api, make_response):
+    """Тест загрузки всех страниц вакансий с сохранением порядка страниц."""
+    def fake_get(url, params, timeout):
+        page = params["page"]
+        return make_response(200, {
+            "found": 250,
+            "pages": 3,
+            "items": [{"id": f"{page}-{i}"} for i in range(2)]
+        })
+
+    mock_get = mocker.patch.object(hh_api.session, "get", side_effect=fake_get)
+
+    total_vacancies, vacancies = hh_api.get_vacancies("1740", all_pages=True)
+
+    assert total_vacancies == 250
+    assert [vac["id"] for vac in vacancies] == ["0-0", "0-1", "1-0", "1-1", "2-0", "2-1"]
+    assert mock_get.call_count == 3
+    mock_get.assert_any_call(
+        "https://api.hh.ru/vacancies",
+        params={"employer_id": "1740", "per_page": 100, "page": 2},
+        timeout=10.0
+    )
+
+
+def test_get_vacancies_records(mocker, hh_api, make_response):
+    """Тест получения вакансий и работодателей в виде компактных записей."""
+    def fake_get(url, params, timeout):
+        if url.endswith("/vacancies"):
+            return make_response(200, {"found": 1, "pages": 1, "items": [
+                {"id": "1", "employer": {"id": "1740"}, "name": "Программист", "salary": None,
+                 "alternate_url": "https://hh.ru/vacancy/1"}
+            ]})
+        return make_response(200, {"id": "1740", "name": "Яндекс",
+                                           "alternate_url": "https://hh.ru/employer/1740"})
+
+    mocker.patch.object(hh_api.session, "get", side_effect=fake_get)
+
+    total, vacancies = hh_api.get_vacancies("1740", records=True)
+
+    assert total == 1
+    assert vacancies == [Vacancy("1", "1740", "Программист", None, None, "https://hh.ru/vacancy/1", None, None)]
+    assert hh_api.get_employers(["1740"], records=True) == [Employer("1740", "Яндекс", "https://hh.ru/employer/1740")]
+
+
+def test_get_vacancies_all_pages_skips_failed_page(mocker, hh_api, make_response):
+    """Тест, что неудачная страница пропускается, а остальные сохраняются."""
+    def fake_get(url, params, timeout):
+        page = params["page"]
+        return make_response(500 if page == 1 else 200, {"found": 3, "pages": 3, "items": [{"id": str(page)}]})
+
+    mocker.patch.object(hh_api.session, "get", side_effect=fake_get)
+
+    total_vacancies, vacancies = hh_api.get_vacancies("1740", all_pages=True)
+
+    assert total_vacancies == 3
+    assert [vac["id"] for vac in vacancies] == ["0", "2"]
+
+
+def test_session_pool_and_retry_config():
+    """Тест настройки пула соединений и политики повторов сессии."""
+    api = HhApi(max_workers=20, max_retries=4, backoff_factor=1.0)
+    adapter = api.session.get_adapter("https://api.hh.ru")
+
+    assert adapter._pool_maxsize == 20
+    assert adapter.max_retries.total == 4
+    assert adapter.max_retries.backoff_factor == 1.0
+    assert adapter.max_retries.respect_retry_after_header is True
+    assert 503 in adapter.max_retries.status_forcelist
+    assert api.session.headers["User-Agent"] == HhApi.USER_AGENT
+
+
+def test_custom_session_is_used(mocker, make_response):
+    """Тест использования переданной сессии вместо создаваемой."""
+    session = mocker.Mock()
+    session.get.return_value = make_response(200, {"id": "1"})
+    api = HhApi(session=session, timeout=3)
+
+    assert api.get_employers(["1"]) == [{"id": "1"}]
+    session.get.assert_called_once_with("https://api.hh.ru/employers/1", params=None, timeout=3)
+
+
+@pytest.fixture
+def flaky_server():
+    """Локальный сервер, отвечающий 503 с Retry-After на первый запрос и 200 на следующие."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            calls.append(self.path)
+            if len(calls) == 1:
+                status, body = 503, b"{}"
+            else:
+                status, body = 200, json.dumps({"id": "1740", "name": "Яндекс"}).encode()
+            self.send_response(status)
+            if status == 503:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}", calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_retry_on_transient_error(flaky_server):
+    """Тест повтора запроса после временной ошибки 503."""
+    base_url, calls = flaky_server
+    api = HhApi(backoff_factor=0, base_url=base_url)
+
+    result = api.get_employers(["1740"])
+
+    assert result == [{"id": "1740", "name": "Яндекс"}]
+    assert calls == ["/employers/1740", "/employers/1740"]
+    # Повтор после 503, выполненный urllib3, сообщается адаптивному ограничителю
+    assert api.limiter.stats()["overloaded"] == 1
+    api.close()
+
+
+def test_limiter_shared_by_employers_and_vacancies(mocker, make_response):
+    """Тест: работодатели загружаются параллельно в исходном порядке через общий ограничитель."""
+    limiter = AdaptiveLimiter(max_limit=4)
+    api = HhApi(max_workers=4, limiter=limiter)
+    mocker.patch.object(api.session, "get", side_effect=lambda url, **kwargs: make_response(
+        200, {"id": url.rsplit("/", 1)[1]} if "/employers/" in url else {"found": 0, "items": []}))
+
+    employers = api.get_employers([str(i) for i in range(10)])
+    api.get_vacancies("1740")
+
+    assert [emp["id"] for emp in employers] == [str(i) for i in range(10)]
+    assert limiter.stats()["requests"] == 11
+    assert limiter.in_flight == 0
+
+
+def test_overloaded_response_reduces_limit(mocker, make_response):
+    """Тест: ответ 429 уменьшает лимит запросов в полёте."""
+    api = HhApi(max_workers=8, limiter=AdaptiveLimiter(max_limit=8, initial_limit=8))
+    mocker.patch.object(api.session, "get", return_value=make_response(429))
+
+    assert api.get_employers(["1740"]) == []
+    assert api.limiter.limit == 4
+
+
+def employers_page(page, pages, ids, open_vacancies=3):
+    """Создаёт страницу ответа /employers."""
+    return {"found": pages * 2, "pages": pages, "page": page, "items": [
+        {"id": emp_id, "name": f"Компания {emp_id}", "alternate_url": f"https://hh.ru/employer/{emp_id}",
+         "open_vacancies": open_vacancies}
+        for emp_id in ids
+    ]}
+
+
+def test_search_employers_all_pages(mocker, hh_api, make_response):
+    """Тест поиска работодателей: все страницы, порядок выдачи, без повторов при сдвиге выдачи."""
+    pages = {0: ["1", "2"], 1: ["2", "3"], 2: ["4", "5"]}  # «2» сдвинулся на вторую страницу
+
+    def fake_get(url, params, timeout):
+        return make_response(200, employers_page(params["page"], 3, pages[params["page"]]))
+
+    mock_get = mocker.patch.object(hh_api.session, "get", side_effect=fake_get)
+
+    employers = hh_api.search_employers("банк", area="1", type="company")
+
+    assert [emp["id"] for emp in employers] == ["1", "2", "3", "4", "5"]
+    assert mock_get.call_count == 3
+    mock_get.assert_any_call(
+        "https://api.hh.ru/employers",
+        params={"type": "company", "per_page": 100, "text": "банк", "area": "1", "only_with_vacancies": "true",
+                "page": 2},
+        timeout=10.0
+    )
+    assert hh_api.search_employers("банк", records=True)[0] == Employer("1", "Компания 1", "https://hh.ru/employer/1")
+
+
+def test_discover_employers_records_without_details(mocker, hh_api, make_response):
+    """Тест: для записей Employer хватает выдачи поиска, работодатели без вакансий отбрасываются."""
+    page = employers_page(0, 1, ["1", "2"])
+    page["items"][1]["open_vacancies"] = 0
+    mock_get = mocker.patch.object(hh_api.session, "get",
+                                   return_value=make_response(200, page))
+
+    employers = hh_api.discover_employers("банк", records=True)
+
+    assert employers == [Employer("1", "Компания 1", "https://hh.ru/employer/1")]
+    mock_get.assert_called_once()
@@ -0,0 +1,237 @@
+import json
+import sqlite3
+
+import pytest
+from src.hh_api import HhApi
+from src.http_cache import ResponseCache
+
+EMPLOYER_URL = "https://api.hh.ru/employers/1740"
+EMPLOYER_BODY = '{"id": "1740", "name": "Яндекс"}'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Фикстура с кешем во временном файле."""
+    response_cache = ResponseCache(str(tmp_path / "cache" / "http.sqlite"))
+    yield response_cache
+    response_cache.close()
+
+
+def test_put_and_get(cache):
+    """Тест сохранения и чтения записи по URL и параметрам."""
+    cache.put("https://api.hh.ru/vacancies", {"page": 1, "employer_id": "1"}, "{}", etag='"abc"')
+
+    cached = cache.get("https://api.hh.ru/vacancies", {"employer_id": "1", "page": 1})
+    assert cached.body == "{}"
+    assert cached.etag == '"abc"'
+    assert cache.get("https://api.hh.ru/vacancies", {"employer_id": "1", "page": 2}) is None
+
+
+def test_cache_persists_between_instances(tmp_path):
+    """Тест, что записи сохраняются на диске между запусками."""
+    path = str(tmp_path / "http.sqlite")
+    first = ResponseCache(path)
+    first.put(EMPLOYER_URL, None, EMPLOYER_BODY)
+    first.close()
+
+    second = ResponseCache(path)
+    assert second.get(EMPLOYER_URL).body == EMPLOYER_BODY
+    assert second.total_bytes == len(EMPLOYER_BODY.encode("utf-8"))
+    second.close()
+
+
+def test_ttl_by_path_prefix(cache, mocker):
+    """Тест времени жизни записей по префиксу пути."""
+    cache.ttls = {"/employers/": 100, "/employers/1740": 10}
+    mocker.patch("src.http_cache.time.time", return_value=1000.0)
+    cache.put(EMPLOYER_URL, None, EMPLOYER_BODY)
+    cached = cache.get(EMPLOYER_URL)
+
+    assert cache.ttl_for("/employers/80") == 100
+    assert cache.ttl_for("/employers/1740") == 10
+    assert cache.ttl_for("/vacancies") == 0
+    mocker.patch("src.http_cache.time.time", return_value=1005.0)
+    assert cache.is_fresh("/employers/1740", cached)
+    mocker.patch("src.http_cache.time.time", return_value=1011.0)
+    assert not cache.is_fresh("/employers/1740", cached)
+
+
+def test_lru_eviction(tmp_path, mocker):
+    """Тест вытеснения давно не использованных записей при превышении размера."""
+    cache = ResponseCache(str(tmp_path / "http.sqlite"), max_bytes=25)
+    clock = mocker.patch("src.http_cache.time.time", return_value=1.0)
+    cache.put("a", None, "x" * 10)
+    clock.return_value = 2.0
+    cache.put("b", None, "x" * 10)
+    clock.return_value = 3.0
+    cache.get("a")  # a становится недавно использованной
+    clock.return_value = 4.0
+    cache.put("c", None, "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_bytes == 20
+    cache.close()
+
+
+def test_vacancy_pages_do_not_evict_employers(tmp_path):
+    """Тест: страницы вакансий вытесняют только друг друга, записи работодателей остаются."""
+    cache = ResponseCache(str(tmp_path / "http.sqlite"), max_bytes=100, budgets={"/vacancies": 25})
+    cache.put(EMPLOYER_URL, None, EMPLOYER_BODY)
+    for page in range(10):
+        cache.put("https://api.hh.ru/vacancies", {"page": page}, "x" * 10)
+
+    assert cache.get(EMPLOYER_URL) is not None
+    assert cache.get("https://api.hh.ru/vacancies", {"page": 9}) is not None
+    assert cache.get("https://api.hh.ru/vacancies", {"page": 0}) is None
+    assert cache.total_bytes == len(EMPLOYER_BODY.encode("utf-8")) + 20
+    cache.close()
+
+
+def test_get_does_not_write_until_close(tmp_path, mocker):
+    """Тест: чтение не пишет в файл, время использования сохраняется при закрытии."""
+    path = str(tmp_path / "http.sqlite")
+    clock = mocker.patch("src.http_cache.time.time", return_value=1.0)
+    cache = ResponseCache(path)
+    cache.put(EMPLOYER_URL, None, EMPLOYER_BODY)
+    clock.return_value = 5.0
+    cache.get(EMPLOYER_URL)
+    assert cache._conn.total_changes == 1  # только вставка записи
+    cache.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT accessed_at FROM responses").fetchone()[0] == 5.0
+    conn.close()
+
+
+def test_put_commits_in_batches(tmp_path):
+    """Тест: записи фиксируются пакетами по commit_every и при закрытии."""
+    path = str(tmp_path / "http.sqlite")
+    cache = ResponseCache(path, commit_every=3)
+    reader = sqlite3.connect(path)
+    for page in range(4):
+        cache.put("https://api.hh.ru/vacancies", {"page": page}, "{}")
+
+    assert reader.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 3
+    cache.close()
+    assert reader.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 4
+    reader.close()
+
+
+def test_should_store(cache):
+    """Тест: ответы без срока жизни и валидаторов сохраняются только в режиме record."""
+    assert cache.should_store("/employers/1740")
+    assert cache.should_store("/vacancies", etag='"v1"')
+    assert cache.should_store("/vacancies", last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert not cache.should_store("/vacancies")
+    cache.record = True
+    assert cache.should_store("/vacancies")
+
+
+def test_cache_file_without_sections_is_upgraded(tmp_path):
+    """Тест: файл кеша без столбца section дополняется, записи распределяются по разделам."""
+    path = str(tmp_path / "http.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE responses (key TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT, "
+                 "stored_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)")
+    conn.execute("INSERT INTO responses VALUES (?, '{}', NULL, NULL, 1, 1, 2)",
+                 ("https://api.hh.ru/vacancies?page=0",))
+    conn.commit()
+    conn.close()
+
+    cache = ResponseCache(path)
+
+    assert cache.get("https://api.hh.ru/vacancies", {"page": 0}).body == "{}"
+    assert cache._section_bytes == {"/vacancies": 2}
+    cache.close()
+
+
+def test_hh_api_serves_fresh_entry_without_request(cache, mocker, make_response):
+    """Тест, что свежая запись отдаётся без обращения к сети."""
+    session = mocker.Mock()
+    session.get.return_value = make_response(200, text=EMPLOYER_BODY, headers={"ETag": '"v1"'})
+    api = HhApi(session=session, cache=cache)
+
+    assert api.get_employers(["1740"]) == [{"id": "1740", "name": "Яндекс"}]
+    assert api.get_employers(["1740"]) == [{"id": "1740", "name": "Яндекс"}]
+    session.get.assert_called_once_with(EMPLOYER_URL, params=None, timeout=10.0)
+
+
+def test_hh_api_revalidates_stale_entry(cache, mocker, make_response):
+    """Тест условного запроса для устаревшей записи и обработки 304."""
+    cache.ttls = {}
+    cache.put(EMPLOYER_URL, None, EMPLOYER_BODY, etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    session = mocker.Mock()
+    session.get.return_value = make_response(304)
+    api = HhApi(session=session, cache=cache)
+
+    assert api.get_employers(["1740"]) == [{"id": "1740", "name": "Яндекс"}]
+    session.get.assert_called_once_with(
+        EMPLOYER_URL, params=None, timeout=10.0,
+        headers={"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    )
+
+
+def test_hh_api_skips_unusable_vacancy_pages(cache, mocker, make_response):
+    """Тест: страница вакансий без ETag/Last-Modified не сохраняется — она не бывает свежей."""
+    session = mocker.Mock()
+    session.get.return_value = make_response(200, {"found": 0, "items": []})
+    api = HhApi(session=session, cache=cache)
+
+    api.get_vacancies("1740")
+    assert cache.get("https://api.hh.ru/vacancies", {"employer_id": "1740", "per_page": 100, "page": 0}) is None
+
+    cache.record = True  # запись ответов для работы без сети
+    api.get_vacancies("1740")
+    assert cache.get("https://api.hh.ru/vacancies", {"employer_id": "1740", "per_page": 100, "page": 0}) is not None
+
+
+def test_hh_api_close_closes_cache(tmp_path, mocker):
+    """Тест: закрытие клиента закрывает кеш и сохраняет время использования записей."""
+    path = str(tmp_path / "http.sqlite")
+    clock = mocker.patch("src.http_cache.time.time", return_value=1.0)
+    cache = ResponseCache(path)
+    cache.put(EMPLOYER_URL, None, EMPLOYER_BODY)
+    api = HhApi(session=mocker.Mock(), cache=cache)
+    clock.return_value = 5.0
+    api.get_employers(["1740"])
+
+    api.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT accessed_at FROM responses").fetchone()[0] == 5.0
+    conn.close()
+
+
+def test_hh_api_offline_mode(cache, mocker):
+    """Тест офлайн-режима: только кеш, без сетевых запросов."""
+    cache.ttls = {}
+    cache.offline = True
+    cache.put(EMPLOYER_URL, None, EMPLOYER_BODY)
+    session = mocker.Mock()
+    api = HhApi(session=session, cache=cache)
+
+    assert api.get_employers(["1740", "80"]) == [{"id": "1740", "name": "Яндекс"}]
+    session.get.assert_not_called()
+
+
+def test_hh_api_discovery_uses_cached_search(cache, mocker, make_response):
+    """Тест обнаружения работодателей: только страницы поиска, повторное обнаружение — из кеша."""
+    body = json.dumps({"found": 2, "pages": 1, "items": [
+        {"id": emp_id, "name": f"Компания {emp_id}", "alternate_url": "", "open_vacancies": 1}
+        for emp_id in ("1740", "80")
+    ]})
+    session = mocker.Mock()
+    session.get.return_value = make_response(200, text=body)
+    api = HhApi(session=session, cache=cache)
+
+    employers = api.discover_employers("банк")
+
+    assert [emp["id"] for emp in employers] == ["1740", "80"]
+    session.get.assert_called_once()
+    assert session.get.call_args.args[0] == "https://api.hh.ru/employers"
+    # Повторное обнаружение в пределах времени жизни выдачи — без запросов
+    assert api.discover_employers("банк") == employers
+    session.get.assert_called_once()
+    assert cache.ttl_for("/employers") == 60 * 60
@@ -1,5 +1,11 @@
+import subprocess
+import sys
 import pytest
+import main as main_module
 from main import main
+from src.columnar import ColumnarVacancies
+from src import hh_api, pipeline
+from src.records import Employer
 
 
 @pytest.fixture
@@ -17,45 +23,46 @@ def mock_dependencies(mocker):
         "host": "localhost",
         "port": "5432"
     }
+    mock_config_instance.metrics_path = None
 
     # Мокаем функции db_setup
     mocker.patch("main.create_database")
     mocker.patch("main.drop_tables")
     mocker.patch("main.create_tables")
+    mocker.patch("main.get_data_age", return_value=None)  # данных ещё нет
 
-    # Мокаем HhApi
-    mock_hh_api = mocker.patch("main.HhApi")
-    mock_hh_api_instance = mock_hh_api.return_value
+    # Мокаем HhApi и потоковую загрузку
+    mocker.patch("src.hh_api.HhApi")
+    mocker.patch("src.http_cache.ResponseCache")
     employer_ids = ["1740", "80", "15478", "3529", "78638", "2180", "39305", "4219", "676", "1455"]
-    mock_hh_api_instance.get_employers.return_value = [
+    employers = [
         {"id": emp_id, "name": f"Компания {i}", "alternate_url": f"https://hh.ru/employer/{emp_id}"}
         for i, emp_id in enumerate(employer_ids, 1)
     ]
-    mock_hh_api_instance.get_vacancies.side_effect = [
-        (150, [{"id": f"{emp_id}-{j}", "employer": {"id": emp_id}, "name": "Программист"}] * 150)
-        for j, emp_id in enumerate(employer_ids, 1)
-    ]
-
-    # Мокаем save_to_json и load_to_db
-    mocker.patch("main.save_to_json")
-    mocker.patch("main.load_to_db")
+    employer_vacancy_counts = {emp_id: 150 for emp_id in employer_ids}
+    mocker.patch("src.pipeline.run_pipeline", return_value=(employers, employer_vacancy_counts, {}))
 
     # Мокаем DBManager
     mock_db_manager = mocker.patch("main.DBManager")
     mock_db_manager_instance = mock_db_manager.return_value
     mock_db_manager_instance.get_companies_and_vacancies_count.return_value = [
-        {"company": "Компания 1", "vacancies_count": 150}
+        {"company": "Компания 1", "vacancies_count": 150, "found": 170},
+        {"company": "Компания 2", "vacancies_count": 0, "found": None}  # работодатель без сводки
     ]
-    mock_db_manager_instance.get_all_vacancies.return_value = [
+    mock_db_manager_instance.iter_all_vacancies.return_value = [
         {"company": "Компания 1", "vacancy": "Программист", "salary_from": 100000, "salary_to": 150000,
          "url": "https://hh.ru/vacancy/123"}
     ]
     mock_db_manager_instance.get_avg_salary.return_value = 125000.0
-    mock_db_manager_instance.get_vacancies_with_higher_salary.return_value = [
+    mock_db_manager_instance.iter_vacancies_with_higher_salary.return_value = [
         {"company": "Компания 1", "vacancy": "Программист", "salary_from": 150000, "salary_to": 200000,
          "url": "https://hh.ru/vacancy/123"}
     ]
-    mock_db_manager_instance.get_vacancies_with_keyword.return_value = [
+    mock_db_manager_instance.get_salary_stats.return_value = [
+        {"company": "Компания 1", "vacancies_count": 2, "avg_salary": 125000.0, "p10": 105000.0,
+         "median": 125000.0, "p90": 145000.0, "histogram": [1, 1], "bucket_edges": [100000, 125000.5, 150001]}
+    ]
+    mock_db_manager_instance.search_vacancies.return_value = [
         {"company": "Компания 1", "vacancy": "Программист Python", "salary_from": 100000, "salary_to": 150000,
          "url": "https://hh.ru/vacancy/123"}
     ]
@@ -77,7 +84,9 @@ def test_main_option_1(mock_dependencies, mocker, capsys):
     main()
 
     captured = capsys.readouterr()
-    assert "Компания: Компания 1, Вакансий: 150" in captured.out
+    # Как и до сводки, выводится число вакансий по данным API
+    assert "Компания: Компания 1, Вакансий: 170" in captured.out
+    assert "Компания: Компания 2, Вакансий: 0" in captured.out
     # Убираем проверку "Общее количество вакансий всех компаний: 1500", так как она отсутствует в опции "1"
 
 
@@ -115,5 +124,136 @@ def test_main_option_5_with_keyword(mock_dependencies, mocker, capsys):
     mocker.patch("builtins.input", side_effect=["5", "Python", "0"])
     main()
 
+    main_module.DBManager.return_value.search_vacancies.assert_called_once_with("Python", limit=None)
+
+    captured = capsys.readouterr()
+    assert "Компания: Компания 1, Вакансия: Программист Python, Зарплата: от 100000 до 150000, Ссылка: https://hh.ru/vacancy/123" in captured.out
+
+
+def test_main_option_6(mock_dependencies, mocker, capsys):
+    """Тест выполнения опции 6 (статистика зарплат)."""
+    mocker.patch("builtins.input", side_effect=["6", "0"])
+    main()
+
+    captured = capsys.readouterr()
+    assert "Компания: Компания 1, Средняя: 125000, Медиана: 125000, P10: 105000, P90: 145000" in captured.out
+
+
+def test_main_replay(mock_dependencies, mocker, capsys):
+    """Тест режима воспроизведения: БД пересобирается из снапшотов без обращения к API."""
+    replay = mocker.patch("src.replay.replay_snapshots", return_value=({"1740": 7}, {}))
+    mocker.patch("builtins.input", side_effect=["2", "0"])
+
+    main(["--replay", "--vacancies", "backup/vacancies.ndjson"])
+
+    replay.assert_called_once_with(mocker.ANY, "data/companies.ndjson.gz", "backup/vacancies.ndjson")
+    hh_api.HhApi.assert_not_called()
+    pipeline.run_pipeline.assert_not_called()
+    main_module.drop_tables.assert_not_called()  # данные заменяются в транзакции воспроизведения
+    main_module.get_data_age.assert_not_called()
+    assert "Общее количество вакансий всех компаний: 7" in capsys.readouterr().out
+
+
+def test_main_writes_metrics(mock_dependencies, mocker, tmp_path):
+    """Тест записи метрик в файл METRICS_PATH при завершении."""
+    metrics_path = tmp_path / "metrics.prom"
+    main_module.Config.return_value.metrics_path = str(metrics_path)
+    mocker.patch("builtins.input", side_effect=["0"])
+
+    main()
+
+    assert metrics_path.exists()
+
+
+def test_main_columnar(mock_dependencies, mocker, capsys):
+    """Тест режима --columnar: опции 3 и 5 обслуживаются снимком в памяти, без запросов к БД."""
+    columnar = ColumnarVacancies([
+        ("1", "Компания 1", "Программист Python", 100000, None, "https://hh.ru/vacancy/1", 100000),
+        ("2", "Компания 1", "Аналитик", 200000, None, "https://hh.ru/vacancy/2", 200000)
+    ])
+    load = mocker.patch("main.ColumnarVacancies.load", return_value=columnar)
+    mocker.patch("builtins.input", side_effect=["3", "5", "python", "0"])
+
+    main(["--columnar"])
+
+    captured = capsys.readouterr()
+    load.assert_called_once()
+    assert "Средняя зарплата: 150000.00" in captured.out
+    assert "Вакансия: Программист Python, Зарплата: от 100000, Ссылка: https://hh.ru/vacancy/1" in captured.out
+    main_module.DBManager.return_value.get_avg_salary.assert_not_called()
+    main_module.DBManager.return_value.search_vacancies.assert_not_called()
+
+
+def test_main_skips_fresh_data(mock_dependencies, mocker, capsys):
+    """Тест быстрого запуска: свежие данные актуальной схемы не перезагружаются."""
+    main_module.get_data_age.return_value = 600.0
+    main_module.Config.return_value.max_data_age = 3600.0
+    main_module.DBManager.return_value.get_companies_and_vacancies_count.return_value = [
+        {"company": "Компания 1", "vacancies_count": 150, "found": 170},
+        {"company": "Компания 2", "vacancies_count": 12, "found": None}  # сводка без found из API
+    ]
+    mocker.patch("builtins.input", side_effect=["2", "0"])
+
+    main()
+
     captured = capsys.readouterr()
-    assert "Компания: Компания 1, Вакансия: Программист Python, Зарплата: от 100000 до 150000, Ссылка: https://hh.ru/vacancy/123" in captured.out
\ No newline at end of file
+    assert "Данные загружены 10 мин назад, загрузка пропущена" in captured.out
+    assert "Общее количество вакансий всех компаний: 182" in captured.out
+    main_module.create_database.assert_not_called()
+    main_module.drop_tables.assert_not_called()
+    main_module.create_tables.assert_not_called()
+    pipeline.run_pipeline.assert_not_called()
+
+
+def test_main_reloads_stale_data(mock_dependencies, mocker):
+    """Тест загрузки при устаревших данных и при --refresh."""
+    main_module.get_data_age.return_value = 7200.0
+    main_module.Config.return_value.max_data_age = 3600.0
+    main_module.Config.return_value.sync_mode = "incremental"
+    mocker.patch("builtins.input", return_value="0")
+
+    main()
+    main(["--refresh"])
+
+    main_module.get_data_age.assert_called_once()
+    assert pipeline.run_pipeline.call_count == 2
+    assert main_module.create_tables.call_count == 2
+
+
+def test_main_closes_api_client_on_error(mock_dependencies, mocker, capsys):
+    """Тест, что клиент API и его кеш закрываются и при ошибке загрузки."""
+    pipeline.run_pipeline.side_effect = RuntimeError("Ошибка загрузки")
+    mocker.patch("builtins.input", return_value="0")
+
+    main()
+
+    hh_api.HhApi.return_value.close.assert_called_once()
+    assert "Произошла ошибка:" in capsys.readouterr().out
+
+
+def test_main_import_is_lightweight():
+    """Тест, что импорт main не загружает клиент API и requests."""
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('requests' in sys.modules, 'src.hh_api' in sys.modules)"],
+        capture_output=True, text=True, check=True
+    )
+    assert result.stdout.split() == ["False", "False"]
+
+
+def test_main_discover(mock_dependencies, mocker, capsys):
+    """Тест --discover: загружаются работодатели из поиска hh.ru, даже если данные свежие."""
+    main_module.get_data_age.return_value = 60.0
+    main_module.Config.return_value.max_data_age = 3600.0
+    hh_api.HhApi.return_value.discover_employers.return_value = [
+        Employer("1740", "Яндекс", "https://hh.ru/employer/1740"), Employer("80", "Альфа-Банк", "")
+    ]
+    mocker.patch("builtins.input", return_value="0")
+
+    main(["--discover", "банк", "--area", "1"])
+
+    hh_api.HhApi.return_value.discover_employers.assert_called_once_with("банк", "1", records=True)
+    assert pipeline.run_pipeline.call_args.args[2] == ["1740", "80"]
+    # Данные работодателей из выдачи поиска передаются в конвейер без повторных запросов
+    assert pipeline.run_pipeline.call_args.kwargs["employers"] == \
+        hh_api.HhApi.return_value.discover_employers.return_value
+    assert "Найдено работодателей: 2" in capsys.readouterr().out
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from src.db_manager import DBManager
+from src.hh_api import HhApi
+from src.metrics import Metrics, endpoint, metrics, track_query
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Очищает общий реестр метрик до и после теста."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_histogram_and_counters():
+    """Тест записи гистограммы длительности и счётчика."""
+    registry = Metrics()
+    for value in (0.002, 0.02, 0.2, 2.0):
+        registry.observe("duration_seconds", value, endpoint="/vacancies")
+    registry.inc("bytes_total", 100, endpoint="/vacancies")
+    registry.inc("bytes_total", 50, endpoint="/vacancies")
+
+    histogram = registry.histogram("duration_seconds", endpoint="/vacancies")
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.222)
+    assert histogram.quantile(0.5) == 0.025
+    assert histogram.quantile(1.0) == 2.0
+    assert registry.counter("bytes_total", endpoint="/vacancies") == 150
+
+
+def test_spans_are_nested():
+    """Тест вложенных спанов этапов и их атрибутов."""
+    registry = Metrics()
+    with registry.span("pipeline", employers=2) as span:
+        with registry.span("load_employers"):
+            pass
+        span["vacancies"] = 10
+
+    spans = registry.to_dict()["spans"]
+    assert [(s["name"], s["parent"]) for s in spans] == [("load_employers", "pipeline"), ("pipeline", None)]
+    assert spans[1]["attributes"] == {"employers": 2, "vacancies": 10}
+    assert registry.histogram("span_duration_seconds", span="pipeline").count == 1
+
+
+def test_span_records_error():
+    """Тест, что спан с исключением помечается ошибкой."""
+    registry = Metrics()
+    with pytest.raises(ValueError):
+        with registry.span("load"):
+            raise ValueError("сбой")
+
+    assert registry.to_dict()["spans"][0]["error"] == "ValueError"
+
+
+def test_disabled_registry():
+    """Тест отключённого реестра: метрики не накапливаются."""
+    registry = Metrics()
+    registry.enabled = False
+    registry.inc("requests_total")
+    with registry.span("pipeline"):
+        pass
+
+    assert registry.to_dict()["counters"] == []
+    assert registry.to_dict()["spans"] == []
+
+
+def test_prometheus_export(tmp_path):
+    """Тест экспорта в текстовый формат Prometheus."""
+    registry = Metrics()
+    registry.inc("db_query_rows_total", 3, query="get_all_vacancies")
+    registry.observe("db_query_duration_seconds", 0.003, query="get_all_vacancies")
+    registry.set("hh_api_concurrency_limit", 6, limiter="hh_api")
+    path = tmp_path / "metrics.prom"
+
+    registry.write(str(path))
+
+    text = path.read_text(encoding="utf-8")
+    assert "# TYPE db_query_rows_total counter" in text
+    assert 'db_query_rows_total{query="get_all_vacancies"} 3' in text
+    assert "# TYPE hh_api_concurrency_limit gauge" in text
+    assert 'hh_api_concurrency_limit{limiter="hh_api"} 6' in text
+    assert 'db_query_duration_seconds_bucket{query="get_all_vacancies",le="0.0025"} 0' in text
+    assert 'db_query_duration_seconds_bucket{query="get_all_vacancies",le="0.005"} 1' in text
+    assert 'db_query_duration_seconds_bucket{query="get_all_vacancies",le="+Inf"} 1' in text
+    assert 'db_query_duration_seconds_count{query="get_all_vacancies"} 1' in text
+
+
+def test_json_export(tmp_path):
+    """Тест экспорта JSON-отчёта."""
+    registry = Metrics()
+    registry.observe("hh_api_request_duration_seconds", 0.1, endpoint="/vacancies", status=200)
+    path = tmp_path / "metrics.json"
+
+    registry.write(str(path))
+
+    report = json.loads(path.read_text(encoding="utf-8"))
+    assert report["histograms"][0]["labels"] == {"endpoint": "/vacancies", "status": "200"}
+    assert report["histograms"][0]["count"] == 1
+
+
+def test_endpoint_template():
+    """Тест шаблона пути без идентификаторов."""
+    assert endpoint("/employers/1740") == "/employers/{id}"
+    assert endpoint("/vacancies") == "/vacancies"
+
+
+def test_track_query_generator():
+    """Тест учёта строк потоковой выборки до исчерпания генератора."""
+    @track_query
+    def iter_rows():
+        yield from range(3)
+
+    assert list(iter_rows()) == [0, 1, 2]
+    assert metrics.counter("db_query_rows_total", query="iter_rows") == 3
+    assert metrics.histogram("db_query_duration_seconds", query="iter_rows").count == 1
+
+
+def test_hh_api_request_metrics(mocker):
+    """Тест метрик запросов HhApi: задержка по эндпоинту и статусу, байты ответа."""
+    response = mocker.Mock(status_code=200, content=b'{"id": "1740"}')
+    response.json.return_value = {"id": "1740"}
+    session = mocker.Mock()
+    session.get.return_value = response
+
+    HhApi(session=session).get_employers(["1740", "80"])
+
+    assert metrics.histogram("hh_api_request_duration_seconds", endpoint="/employers/{id}", status=200).count == 2
+    assert metrics.counter("hh_api_response_bytes_total", endpoint="/employers/{id}") == 28
+
+
+def test_db_manager_query_metrics(mock_conn, mock_cursor):
+    """Тест метрик запросов DBManager: время и число строк."""
+    mock_cursor.fetchall.return_value = [("Яндекс", "Программист", 1, 2, "url"), ("СБЕР", "Аналитик", 3, 4, "url")]
+    db_manager = DBManager({"dbname": "test_db"})
+
+    db_manager.get_all_vacancies()
+
+    assert metrics.counter("db_query_rows_total", query="get_all_vacancies") == 2
+    assert metrics.histogram("db_query_duration_seconds", query="get_all_vacancies").count == 1
+
+
+def test_db_manager_cache_hit_metrics(mock_conn, mock_cursor):
+    """Тест: попадание в кеш DBManager учитывается в db_cache_total, а не в метриках запросов."""
+    mock_cursor.fetchone.return_value = (1,)
+    mock_cursor.fetchall.return_value = [("Яндекс", "Программист", 1, 2, "url")]
+    db_manager = DBManager({"dbname": "test_db"}, cache_size=8)
+
+    db_manager.get_all_vacancies()
+    db_manager.get_all_vacancies()
+
+    assert metrics.histogram("db_query_duration_seconds", query="get_all_vacancies").count == 1
+    assert metrics.counter("db_cache_total", result="hit", query="get_all_vacancies") == 1
+    assert metrics.counter("db_cache_total", result="miss", query="get_all_vacancies") == 1
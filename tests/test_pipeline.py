@@ -0,0 +1,171 @@
+import json
+
+import pytest
+from src.pipeline import run_pipeline
+from src.records import Employer, vacancy_row
+from src.snapshot import SnapshotReader, read_snapshot
+
+
+def make_page(emp_id, page, size, found, records=False):
+    """Создаёт страницу ответа /vacancies (с записями Vacancy вместо ответов при records)."""
+    items = [
+        {"id": f"{emp_id}-{page}-{i}", "employer": {"id": emp_id}, "name": "Программист",
+         "salary": None, "alternate_url": f"https://hh.ru/vacancy/{emp_id}-{page}-{i}"}
+        for i in range(size)
+    ]
+    return {"found": found, "pages": 2, "items": [vacancy_row(vac) for vac in items] if records else items}
+
+
+@pytest.fixture
+def mock_hh_api(mocker):
+    """Фикстура с клиентом API, отдающим по две страницы на работодателя."""
+    hh_api = mocker.Mock()
+    hh_api.PER_PAGE = 100
+    hh_api.get_currency_rates.return_value = {}
+    hh_api.get_employers.return_value = [
+        {"id": "1740", "name": "Яндекс", "alternate_url": "https://hh.ru/employer/1740"},
+        {"id": "80", "name": "Альфа-Банк", "alternate_url": "https://hh.ru/employer/80"}
+    ]
+    hh_api.iter_vacancy_pages.side_effect = lambda emp_id, all_pages, records: iter(
+        [make_page(emp_id, 0, 3, 5, records), make_page(emp_id, 1, 2, 5, records)]
+    )
+    return hh_api
+
+
+def test_run_pipeline(mocker, tmp_path, mock_db_params, mock_conn, mock_cursor, mock_hh_api):
+    """Тест потоковой загрузки в снапшот и в БД пачками."""
+    copied_rows = []
+    mock_cursor.copy_expert.side_effect = lambda sql, buffer: copied_rows.append(buffer.read().count("\n"))
+    companies_path = tmp_path / "companies.json"
+    vacancies_path = tmp_path / "vacancies.json"
+
+    employers, counts, stats = run_pipeline(
+        mock_db_params, mock_hh_api, ["1740", "80"], str(companies_path), str(vacancies_path),
+        chunk_size=4, queue_size=1
+    )
+
+    assert [emp["id"] for emp in employers] == ["1740", "80"]
+    assert counts == {"1740": 5, "80": 5}
+    assert stats["vacancies"] == 10
+    assert stats["employers"] == 2
+
+    # Снапшот — корректный JSON-массив из всех вакансий в порядке поступления
+    with open(vacancies_path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert len(snapshot) == 10
+    assert snapshot[0]["id"] == "1740-0-0"
+    assert snapshot[-1]["id"] == "80-1-1"
+    with open(companies_path, encoding="utf-8") as f:
+        assert json.load(f) == employers
+
+    # Работодатели одной пачкой, вакансии пачками не больше chunk_size + страница
+    assert copied_rows[0] == 2
+    assert sum(copied_rows[1:]) == 10
+    assert all(rows <= 4 + 3 for rows in copied_rows[1:])
+    mock_conn.commit.assert_called_once()
+
+
+def test_run_pipeline_compact_snapshot(mocker, tmp_path, mock_db_params, mock_cursor, mock_hh_api):
+    """Тест записи компактных снапшотов: только сохраняемые поля, построчно."""
+    companies_path = str(tmp_path / "companies.ndjson.gz")
+    vacancies_path = str(tmp_path / "vacancies.ndjson.gz")
+
+    run_pipeline(mock_db_params, mock_hh_api, ["1740", "80"], companies_path, vacancies_path, chunk_size=4)
+
+    assert list(read_snapshot(companies_path, kind="employers"))[0] == ("1740", "Яндекс", "https://hh.ru/employer/1740")
+    with SnapshotReader(vacancies_path) as reader:
+        rows = list(reader)
+    assert len(rows) == 10
+    assert rows[0] == ("1740-0-0", "1740", "Программист", None, None, "https://hh.ru/vacancy/1740-0-0", None, None)
+    # Для компактных снапшотов API сразу отдаёт записи вместо исходных ответов
+    mock_hh_api.get_employers.assert_called_once_with(["1740", "80"], records=True)
+    mock_hh_api.iter_vacancy_pages.assert_any_call("1740", all_pages=True, records=True)
+
+
+def test_run_pipeline_with_discovered_employers(tmp_path, mock_db_params, mock_cursor, mock_hh_api):
+    """Тест: переданные данные работодателей (выдача поиска) загружаются без запросов /employers/{id}."""
+    companies_path = str(tmp_path / "companies.ndjson")
+    discovered = [{"id": "1740", "name": "Яндекс", "alternate_url": "https://hh.ru/employer/1740", "open_vacancies": 5}]
+
+    employers, counts, _ = run_pipeline(mock_db_params, mock_hh_api, ["1740"], companies_path,
+                                        str(tmp_path / "vacancies.ndjson"), employers=discovered)
+
+    mock_hh_api.get_employers.assert_not_called()
+    assert employers == [Employer("1740", "Яндекс", "https://hh.ru/employer/1740")]
+    assert list(read_snapshot(companies_path, kind="employers")) == [("1740", "Яндекс", "https://hh.ru/employer/1740")]
+    assert counts == {"1740": 5}
+
+
+def test_run_pipeline_producer_error(mocker, tmp_path, mock_db_params, mock_conn, mock_hh_api):
+    """Тест, что ошибка загрузки страниц откатывает транзакцию, пробрасывается и не портит снапшоты."""
+    mock_hh_api.iter_vacancy_pages.side_effect = RuntimeError("Сбой API")
+    (tmp_path / "c.json").write_text("[1]", encoding="utf-8")
+    (tmp_path / "v.json").write_text("[2]", encoding="utf-8")
+
+    with pytest.raises(RuntimeError, match="Сбой API"):
+        run_pipeline(mock_db_params, mock_hh_api, ["1740"], str(tmp_path / "c.json"), str(tmp_path / "v.json"))
+
+    mock_conn.rollback.assert_called()
+    mock_conn.commit.assert_not_called()
+    # Прежние снапшоты на месте, временные файлы удалены
+    assert (tmp_path / "c.json").read_text(encoding="utf-8") == "[1]"
+    assert (tmp_path / "v.json").read_text(encoding="utf-8") == "[2]"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["c.json", "v.json"]
+
+
+def test_run_pipeline_empty(mocker, tmp_path, mock_db_params, mock_conn, mock_hh_api):
+    """Тест, что без вакансий снапшот остаётся корректным пустым массивом."""
+    mock_hh_api.iter_vacancy_pages.side_effect = lambda emp_id, all_pages, records: iter([])
+    vacancies_path = tmp_path / "vacancies.json"
+
+    _, counts, stats = run_pipeline(mock_db_params, mock_hh_api, ["1740"], str(tmp_path / "c.json"),
+                                    str(vacancies_path))
+
+    with open(vacancies_path, encoding="utf-8") as f:
+        assert json.load(f) == []
+    assert counts == {}
+    assert stats["vacancies"] == 0
+
+
+def test_run_pipeline_incremental(mocker, tmp_path, mock_db_params, mock_cursor, mock_hh_api):
+    """Тест архивации пропавших вакансий только у полностью загруженных работодателей."""
+    mock_cursor.rowcount = 1
+    # У работодателя 80 вторая страница не загрузилась — его вакансии архивировать нельзя
+    mock_hh_api.iter_vacancy_pages.side_effect = lambda emp_id, all_pages, records: iter(
+        [make_page(emp_id, 0, 3, 5), make_page(emp_id, 1, 2, 5)] if emp_id == "1740" else [make_page(emp_id, 0, 3, 5)]
+    )
+
+    _, _, stats = run_pipeline(mock_db_params, mock_hh_api, ["1740", "80"], str(tmp_path / "c.json"),
+                               str(tmp_path / "v.json"), incremental=True)
+
+    executed = [call.args for call in mock_cursor.execute.call_args_list]
+    assert any("CREATE TEMP TABLE vacancies_seen" in args[0] for args in executed)
+    archive = [args for args in executed if "SET archived = TRUE" in args[0]]
+    assert len(archive) == 1
+    assert archive[0][1] == (["1740"],)
+    assert stats["archived"] == 1
+    # Сводка пересчитывается по всем работодателям с found из API
+    summary = [args for args in executed if "INSERT INTO employer_summary" in args[0]]
+    assert summary[0][1] == (["1740", "80"], [5, 5], ["1740", "80"])
+
+
+def test_run_pipeline_partitioned(mocker, tmp_path, mock_db_params, mock_cursor, mock_hh_api):
+    """Тест загрузки по срезам: полнота работодателя определяется покрытием краулера."""
+    mock_cursor.rowcount = 0
+
+    def iter_pages(emp_id, records, coverage):
+        yield {"found": 2500, "items": make_page(emp_id, 0, 3, 2500)["items"]}
+        coverage["complete"] = emp_id == "1740"  # у работодателя 80 срез не поместился в выдачу
+
+    crawler = mocker.patch("src.pipeline.PartitionedCrawler")
+    crawler.return_value.iter_pages.side_effect = iter_pages
+
+    _, counts, stats = run_pipeline(mock_db_params, mock_hh_api, ["1740", "80"], str(tmp_path / "c.json"),
+                                    str(tmp_path / "v.json"), incremental=True, partition=True)
+
+    crawler.assert_called_once_with(mock_hh_api)
+    mock_hh_api.iter_vacancy_pages.assert_not_called()
+    assert counts == {"1740": 2500, "80": 2500}
+    assert stats["vacancies"] == 6
+    archive = [call.args for call in mock_cursor.execute.call_args_list if "SET archived = TRUE" in call.args[0]]
+    assert archive[0][1] == (["1740"],)
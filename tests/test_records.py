@@ -0,0 +1,29 @@
+from src.records import Employer, Vacancy, employer_row, vacancy_row
+
+
+def test_employer_row():
+    """Тест извлечения записи работодателя из ответа API."""
+    emp = employer_row({"id": "1740", "name": "Яндекс", "alternate_url": "https://hh.ru/employer/1740",
+                        "description": "<p>...</p>", "logo_urls": {"90": "https://hh.ru/logo.png"}})
+
+    assert emp == Employer("1740", "Яндекс", "https://hh.ru/employer/1740")
+    assert emp.employer_id == "1740"
+
+
+def test_vacancy_row_fields():
+    """Тест извлечения записи вакансии: лишние поля ответа отбрасываются, нулевая зарплата — None."""
+    vac = vacancy_row({"id": "1", "employer": {"id": "1740", "name": "Яндекс"}, "name": "Программист",
+                       "salary": {"from": 0, "to": 150000, "currency": "RUR", "gross": False},
+                       "alternate_url": "https://hh.ru/vacancy/1", "snippet": {"requirement": "..."}})
+
+    assert vac == Vacancy("1", "1740", "Программист", None, 150000, "https://hh.ru/vacancy/1", "RUR", False)
+    assert vac.salary_to == 150000
+
+
+def test_rows_pass_records_through():
+    """Тест: готовые записи возвращаются без изменений."""
+    vac = Vacancy("1", "1740", "Программист", None, None, "https://hh.ru/vacancy/1", None, None)
+    emp = Employer("1740", "Яндекс", "https://hh.ru/employer/1740")
+
+    assert vacancy_row(vac) is vac
+    assert employer_row(emp) is emp
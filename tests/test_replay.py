@@ -0,0 +1,107 @@
+import pytest
+from src.data_processor import EMPLOYER_COLUMNS, JsonArrayWriter, VACANCY_COLUMNS, save_to_json
+from src.replay import replay_snapshots
+from src.snapshot import write_snapshot
+
+
+def copied_rows(mock_cursor):
+    """Собирает строки CSV, переданные командой COPY, по промежуточным таблицам."""
+    copied = {}
+    mock_cursor.copy_expert.side_effect = lambda sql, buffer: copied.setdefault(sql.split()[1], []).extend(
+        buffer.read().splitlines()
+    )
+    return copied
+
+
+def test_replay_compact_snapshots(tmp_path, mock_db_params, mock_conn, mock_cursor):
+    """Тест восстановления БД из компактных снапшотов."""
+    copied = copied_rows(mock_cursor)
+    companies = str(tmp_path / "companies.ndjson.gz")
+    vacancies = str(tmp_path / "vacancies.ndjson.gz")
+    write_snapshot(companies, "employers", EMPLOYER_COLUMNS, [("1740", "Яндекс", "https://hh.ru/employer/1740")])
+    write_snapshot(vacancies, "vacancies", VACANCY_COLUMNS, [
+        ("1", "1740", "Программист", 100000, None, "https://hh.ru/vacancy/1", "RUR", False),
+        ("2", "1740", "Аналитик", None, None, "https://hh.ru/vacancy/2", None, None)
+    ])
+
+    counts, stats = replay_snapshots(mock_db_params, companies, vacancies)
+
+    # Прежние данные удаляются в транзакции загрузки
+    assert mock_cursor.execute.call_args_list[0].args[0] == "TRUNCATE employer_summary, vacancies, employers"
+    assert counts == {"1740": 2}
+    assert stats["employers"] == 1
+    assert stats["vacancies"] == 2
+    assert copied["employers_stage"] == ["1740,Яндекс,https://hh.ru/employer/1740"]
+    assert copied["vacancies_stage"][1] == "2,1740,Аналитик,\\N,\\N,https://hh.ru/vacancy/2,\\N,\\N"
+    summary = [call.args for call in mock_cursor.execute.call_args_list
+               if "INSERT INTO employer_summary" in call.args[0]]
+    assert summary[0][1] == (["1740"], [2], ["1740"])  # found — число вакансий в снапшоте
+    # Поколение данных увеличивается в той же транзакции, что и загрузка
+    assert mock_cursor.execute.call_args.args[0].startswith("UPDATE sync_state SET generation = generation + 1")
+    mock_conn.commit.assert_called_once()
+
+
+def test_replay_json_snapshots(tmp_path, mock_db_params, mock_cursor):
+    """Тест восстановления БД из JSON-массивов исходных ответов API."""
+    copied = copied_rows(mock_cursor)
+    companies = str(tmp_path / "companies.json")
+    vacancies = str(tmp_path / "vacancies.json")
+    save_to_json([{"id": "80", "name": "Альфа-Банк", "alternate_url": "https://hh.ru/employer/80"}], companies)
+    with JsonArrayWriter(vacancies) as writer:
+        writer.write({"id": "3", "employer": {"id": "80"}, "name": "Тестировщик",
+                      "salary": {"from": None, "to": 90000}, "alternate_url": "https://hh.ru/vacancy/3"})
+
+    counts, stats = replay_snapshots(mock_db_params, companies, vacancies)
+
+    assert counts == {"80": 1}
+    assert copied["vacancies_stage"] == ["3,80,Тестировщик,\\N,90000,https://hh.ru/vacancy/3,\\N,\\N"]
+
+
+def test_replay_missing_snapshot(tmp_path, mock_db_params, mock_conn):
+    """Тест, что при отсутствии снапшота транзакция откатывается."""
+    with pytest.raises(FileNotFoundError):
+        replay_snapshots(mock_db_params, str(tmp_path / "c.ndjson"), str(tmp_path / "v.ndjson"))
+
+    mock_conn.commit.assert_not_called()
+
+
+@pytest.mark.parametrize("content", [b"", b"not a snapshot\n"])
+def test_replay_invalid_snapshot_keeps_data(tmp_path, mock_db_params, mock_conn, content):
+    """Тест, что неверный снапшот обнаруживается до обращения к БД и прежние данные не удаляются."""
+    companies = str(tmp_path / "companies.ndjson")
+    write_snapshot(companies, "employers", EMPLOYER_COLUMNS, [("1740", "Яндекс", "https://hh.ru/employer/1740")])
+    vacancies = tmp_path / "vacancies.ndjson"
+    vacancies.write_bytes(content)
+
+    with pytest.raises(ValueError, match="не является снапшотом"):
+        replay_snapshots(mock_db_params, companies, str(vacancies))
+
+    mock_conn.cursor.assert_not_called()
+
+
+def test_replay_wrong_kind(tmp_path, mock_db_params, mock_conn):
+    """Тест, что перепутанные снапшоты работодателей и вакансий не загружаются."""
+    companies = str(tmp_path / "companies.ndjson")
+    write_snapshot(companies, "employers", EMPLOYER_COLUMNS, [])
+
+    with pytest.raises(ValueError, match="ожидались vacancies"):
+        replay_snapshots(mock_db_params, companies, companies)
+
+    mock_conn.cursor.assert_not_called()
+
+
+def test_replay_truncated_snapshot_rolls_back(tmp_path, mock_db_params, mock_conn, mock_cursor):
+    """Тест, что при обрезанном снапшоте очистка таблиц откатывается вместе с загрузкой."""
+    companies = str(tmp_path / "companies.ndjson.gz")
+    vacancies = tmp_path / "vacancies.ndjson.gz"
+    write_snapshot(companies, "employers", EMPLOYER_COLUMNS, [("1740", "Яндекс", "https://hh.ru/employer/1740")])
+    write_snapshot(str(vacancies), "vacancies", VACANCY_COLUMNS,
+                   [(str(i), "1740", "Программист", i, None, f"https://hh.ru/vacancy/{i}", "RUR", False)
+                    for i in range(5000)])
+    vacancies.write_bytes(vacancies.read_bytes()[:-200])
+
+    with pytest.raises(EOFError):
+        replay_snapshots(mock_db_params, companies, str(vacancies))
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called()
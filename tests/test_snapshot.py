@@ -0,0 +1,127 @@
+import gzip
+import json
+
+import pytest
+from src import snapshot
+from src.data_processor import VACANCY_COLUMNS, save_to_json
+from src.snapshot import (SnapshotReader, SnapshotWriter, is_compact_snapshot, iter_json_array, read_snapshot,
+                          write_snapshot)
+
+ROWS = [
+    ("1", "1740", "Программист", 100000, None, "https://hh.ru/vacancy/1", "RUR", True),
+    ("2", "80", "Аналитик", None, None, "https://hh.ru/vacancy/2", None, None)
+]
+
+
+@pytest.mark.parametrize("name", ["vacancies.ndjson", "vacancies.ndjson.gz"])
+def test_write_and_read_snapshot(tmp_path, name):
+    """Тест записи и чтения компактного снапшота без сжатия и с gzip."""
+    path = str(tmp_path / name)
+
+    assert write_snapshot(path, "vacancies", VACANCY_COLUMNS, iter(ROWS)) == 2
+
+    with SnapshotReader(path) as reader:
+        assert reader.kind == "vacancies"
+        assert reader.columns == VACANCY_COLUMNS
+        assert list(reader) == ROWS
+    assert next(read_snapshot(path, kind="vacancies"))[2] == "Программист"
+
+
+def test_snapshot_layout(tmp_path):
+    """Тест формата: заголовок и по одной компактной строке на запись."""
+    path = str(tmp_path / "vacancies.ndjson.gz")
+    with SnapshotWriter(path, "vacancies", VACANCY_COLUMNS) as writer:
+        writer.write(ROWS[0])
+        assert writer.count == 1
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert json.loads(lines[0]) == {"format": "hh-snapshot", "version": 1, "kind": "vacancies",
+                                    "columns": list(VACANCY_COLUMNS)}
+    assert lines[1] == '["1","1740","Программист",100000,null,"https://hh.ru/vacancy/1","RUR",true]'
+
+
+def test_read_snapshot_is_lazy(tmp_path, mocker):
+    """Тест, что файл не читается целиком: строки разбираются по мере итерации."""
+    path = str(tmp_path / "vacancies.ndjson")
+    write_snapshot(path, "vacancies", VACANCY_COLUMNS, ROWS)
+    loads = mocker.spy(snapshot.json, "loads")
+
+    rows = read_snapshot(path)
+    assert loads.call_count == 0
+    next(rows)
+    assert loads.call_count == 2  # заголовок и первая строка
+    rows.close()
+
+
+def test_reader_dicts(tmp_path):
+    """Тест чтения строк в виде словарей."""
+    path = str(tmp_path / "vacancies.ndjson")
+    write_snapshot(path, "vacancies", VACANCY_COLUMNS, ROWS[:1])
+
+    with SnapshotReader(path) as reader:
+        assert list(reader.dicts()) == [dict(zip(VACANCY_COLUMNS, ROWS[0]))]
+
+
+def test_read_snapshot_maps_columns(tmp_path):
+    """Тест чтения снапшота с другим набором столбцов: недостающие столбцы заполняются None."""
+    path = str(tmp_path / "vacancies.ndjson")
+    old_columns = VACANCY_COLUMNS[:6]  # снапшот до появления currency и gross
+    write_snapshot(path, "vacancies", old_columns, [row[:6] for row in ROWS])
+
+    rows = list(read_snapshot(path, kind="vacancies", columns=VACANCY_COLUMNS))
+
+    assert rows[0] == ROWS[0][:6] + (None, None)
+    assert list(read_snapshot(path, columns=("url", "vacancy_id")))[1] == ("https://hh.ru/vacancy/2", "2")
+
+
+def test_read_snapshot_wrong_kind(tmp_path):
+    """Тест ошибки при чтении снапшота другого типа."""
+    path = str(tmp_path / "companies.ndjson")
+    write_snapshot(path, "employers", ("employer_id", "name", "url"), [])
+
+    with pytest.raises(ValueError, match="ожидались vacancies"):
+        list(read_snapshot(path, kind="vacancies"))
+
+
+def test_reader_rejects_json_array(tmp_path):
+    """Тест ошибки при чтении файла, который не является компактным снапшотом."""
+    path = tmp_path / "vacancies.ndjson"
+    path.write_text("[\n]\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="не является снапшотом"):
+        SnapshotReader(str(path))
+
+
+def test_zstd_requires_package(tmp_path, mocker):
+    """Тест понятной ошибки, если пакет zstandard не установлен."""
+    mocker.patch.object(snapshot, "zstandard", None)
+
+    with pytest.raises(ImportError, match="zstandard"):
+        write_snapshot(str(tmp_path / "vacancies.ndjson.zst"), "vacancies", VACANCY_COLUMNS, ROWS)
+
+
+def test_is_compact_snapshot():
+    """Тест определения формата снапшота по расширению."""
+    assert is_compact_snapshot("data/vacancies.ndjson.gz")
+    assert is_compact_snapshot("data/vacancies.ndjson.zst")
+    assert not is_compact_snapshot("data/vacancies.json")
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 16])
+def test_iter_json_array(tmp_path, chunk_size):
+    """Тест потокового чтения JSON-массива, в том числе при элементах больше блока."""
+    path = str(tmp_path / "vacancies.json")
+    items = [{"id": str(i), "name": "Программист ]", "salary": {"from": i}} for i in range(20)]
+    save_to_json(items, path)
+
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == items
+
+
+def test_iter_json_array_invalid(tmp_path):
+    """Тест ошибки для файла, не являющегося JSON-массивом."""
+    path = tmp_path / "broken.json"
+    path.write_text('[{"id": "1"}, {"id"', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="JSON-массивом"):
+        list(iter_json_array(str(path)))